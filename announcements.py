@@ -6,11 +6,11 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from logging import getLogger
 import requests
-import json
 import os
 
 # Импорт путей из центрального модуля
 import paths
+import json_codec
 
 if TYPE_CHECKING:
     from tgbot.telegrambot import TelegramBot
@@ -96,7 +96,7 @@ def get_announcement(ignore_last_tag: bool = False) -> dict | None:
             return None
         
         first_file = list(files.values())[0]
-        content = json.loads(first_file.get("content", "{}"))
+        content = json_codec.loads(first_file.get("content", "{}"))
         
         # Проверяем тег
         if content.get("tag") == LAST_TAG and not ignore_last_tag:
@@ -0,0 +1,196 @@
+"""
+Планировщик автоподнятия товаров для Seal Playerok Bot.
+
+Время последнего поднятия (`auto_raise_items_times.json`) читается один раз при старте,
+каждый товар ставится в очередь сроков на `последнее поднятие + interval_hours + разброс`,
+и задача просыпается ровно тогда, когда подходит срок ближайшего товара.
+Времена поднятий сохраняются одной записью на каждый пакет наступивших товаров.
+"""
+import random
+import threading
+import time
+from logging import getLogger
+
+from data import Data, AUTO_RAISE_ITEMS_TIMES
+from settings import Settings as sett
+from scheduler import DeadlineQueue
+
+
+logger = getLogger("seal.auto_raise")
+
+JITTER_SECONDS = 300   # Максимальный разброс срока поднятия, чтобы товары не поднимались разом
+RETRY_SECONDS = 600    # Через сколько повторить неудачное поднятие
+
+
+class AutoRaiseScheduler:
+    """
+    Планировщик поднятия товаров по сроку.
+
+    :param interval_hours: Интервал между поднятиями одного товара в часах.
+    :type interval_hours: `float`
+
+    :param jitter_seconds: Максимальный случайный разброс срока в секундах
+        (не больше 10% интервала).
+    :type jitter_seconds: `float`
+    """
+
+    def __init__(self, interval_hours: float = 24.0, jitter_seconds: float = JITTER_SECONDS):
+        self.queue = DeadlineQueue()
+        self.interval = float(interval_hours) * 3600
+        self.jitter = float(jitter_seconds)
+        self.raised = 0
+        self.failed = 0
+        self._times: dict[str, float] = {
+            str(item_id): float(timestamp)
+            for item_id, timestamp in (Data.get(AUTO_RAISE_ITEMS_TIMES.name) or {}).items()
+        }
+        self._running = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def last_raised(self, item_id: str) -> float | None:
+        """
+        Возвращает время последнего поднятия товара.
+
+        :param item_id: ID товара.
+        :type item_id: `str`
+
+        :return: Время или `None`, если товар ещё не поднимался.
+        :rtype: `float` or `None`
+        """
+        return self._times.get(str(item_id))
+
+    def sync(self, item_ids: list[str]):
+        """
+        Приводит очередь к списку товаров, которые нужно поднимать:
+        новые товары ставятся в очередь, отсутствующие в списке - убираются.
+
+        :param item_ids: ID товаров.
+        :type item_ids: `list[str]`
+        """
+        item_ids = {str(item_id) for item_id in item_ids}
+        with self._lock:
+            for item_id in self.queue.keys():
+                if item_id not in item_ids:
+                    self.queue.remove(item_id)
+            for item_id in item_ids:
+                if item_id not in self.queue:
+                    self.queue.push(item_id, self._next_due(item_id))
+
+    def set_interval(self, interval_hours: float):
+        """
+        Меняет интервал поднятия и пересчитывает сроки всех товаров в очереди.
+
+        :param interval_hours: Интервал в часах.
+        :type interval_hours: `float`
+        """
+        with self._lock:
+            self.interval = float(interval_hours) * 3600
+            for item_id in self.queue.keys():
+                self.queue.push(item_id, self._next_due(item_id))
+
+    def mark_raised(self, item_id: str, timestamp: float | None = None):
+        """
+        Запоминает поднятие товара и ставит его следующий срок.
+
+        :param item_id: ID товара.
+        :type item_id: `str`
+
+        :param timestamp: Время поднятия, по умолчанию - сейчас.
+        :type timestamp: `float` or `None`
+        """
+        self._mark(str(item_id), time.time() if timestamp is None else float(timestamp))
+        self._save()
+
+    async def run(self, raise_item: callable):
+        """
+        Поднимает товары по мере наступления сроков, пока не вызван `stop`.
+        Корутина `raise_item(item_id)` поднимает товар; если она вернула False
+        или выбросила исключение, поднятие повторяется через `RETRY_SECONDS`.
+
+        :param raise_item: Корутина поднятия товара.
+        :type raise_item: `callable`
+        """
+        self._running = True
+        while self._running:
+            changed = False
+            for item_id in await self.queue.wait():
+                if not self._running:
+                    break
+                try:
+                    result = await raise_item(item_id)
+                except Exception as e:
+                    logger.error(f"Ошибка при поднятии товара {item_id}: {e}")
+                    result = False
+                if result is False:
+                    self.failed += 1
+                    self.queue.push(item_id, time.time() + RETRY_SECONDS)
+                else:
+                    self.raised += 1
+                    self._mark(item_id, time.time())
+                    changed = True
+            # Времена поднятых товаров сохраняются одной записью на весь пакет
+            if changed:
+                self._save()
+
+    def stop(self):
+        """Останавливает `run` после текущего товара."""
+        self._running = False
+        self.queue.wake()
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает статистику планировщика.
+
+        :return: Словарь с количеством товаров в очереди, поднятых и неудачных поднятий
+            и ближайшим сроком.
+        :rtype: `dict`
+        """
+        return {"queued": len(self.queue), "raised": self.raised, "failed": self.failed,
+                "next_due": self.queue.next_due()}
+
+    def _mark(self, item_id: str, timestamp: float):
+        with self._lock:
+            self._times[item_id] = timestamp
+            self.queue.push(item_id, self._next_due(item_id))
+
+    def _save(self):
+        # Снимок берётся под блокировкой сохранения, поэтому последним
+        # в очередь записи всегда попадает самое свежее состояние
+        with self._save_lock:
+            with self._lock:
+                times = dict(self._times)
+            Data.set(AUTO_RAISE_ITEMS_TIMES.name, times)
+
+    def _next_due(self, item_id: str) -> float:
+        now = time.time()
+        jitter = random.uniform(0, min(self.jitter, self.interval * 0.1))
+        last = self._times.get(item_id)
+        # Новые и просроченные товары (например, после простоя бота) разносятся от текущего
+        # момента, а не от давно прошедшего срока - иначе все они поднимались бы разом
+        if last is None or last + self.interval <= now:
+            return now + jitter
+        return last + self.interval + jitter
+
+
+_scheduler: AutoRaiseScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_auto_raise_scheduler() -> AutoRaiseScheduler:
+    """
+    Возвращает общий планировщик автоподнятия.
+    Интервал берётся из `playerok.auto_raise_items.interval_hours` и обновляется при его изменении.
+
+    :return: Планировщик.
+    :rtype: `auto_raise.AutoRaiseScheduler`
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                config = sett.get("config")
+                _scheduler = AutoRaiseScheduler(config["playerok"]["auto_raise_items"]["interval_hours"])
+                sett.subscribe("config", "playerok.auto_raise_items.interval_hours",
+                               lambda change: _scheduler.set_interval(change.new or 24.0))
+    return _scheduler
@@ -0,0 +1,56 @@
+"""
+Бенчмарк кодека JSON на файлах реального размера:
+стандартный json с отступами (как раньше) против json_codec в компактном режиме.
+
+Запуск: python benchmarks/bench_json_codec.py
+"""
+import os
+import sys
+import json
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+from settings import CONFIG, MESSAGES
+from file_writer import copy_json
+
+
+def make_samples() -> dict:
+    """Собирает файлы размера, типичного для большого магазина."""
+    config = copy_json(CONFIG.default)
+    config["telegram"]["bot"]["signed_users"] = list(range(50))
+    now = int(time.time())
+    return {
+        "config.json": config,
+        "messages.json": copy_json(MESSAGES.default),
+        "auto_deliveries.json": [
+            {"keyphrases": [f"Товар {i}", f"Ключ {i}"], "message": [f"Ваш ключ: XXXX-{i:05d}"] * 3}
+            for i in range(3000)
+        ],
+        "initialized_users.json": {str(10_000_000 + i): now - i * 37 for i in range(30_000)},
+    }
+
+
+def bench(func, number: int) -> float:
+    return timeit.timeit(func, number=number) / number * 1000
+
+
+def main():
+    print(f"Кодировщик: {json_codec.BACKEND}")
+    print(f"{'файл':<24}{'json indent=4':>16}{'json_codec':>14}{'разбор json':>14}{'разбор codec':>14}{'размер':>20}")
+    for name, obj in make_samples().items():
+        number = 200 if len(json.dumps(obj)) < 100_000 else 20
+        old_raw = json.dumps(obj, indent=4, ensure_ascii=False).encode("utf-8")
+        new_raw = json_codec.dumps(obj)
+        old_enc = bench(lambda: json.dumps(obj, indent=4, ensure_ascii=False).encode("utf-8"), number)
+        new_enc = bench(lambda: json_codec.dumps(obj), number)
+        old_dec = bench(lambda: json.loads(old_raw), number)
+        new_dec = bench(lambda: json_codec.loads(new_raw), number)
+        size = f"{len(old_raw) // 1024} → {len(new_raw) // 1024} КБ"
+        print(f"{name:<24}{old_enc:>13.3f} мс{new_enc:>11.3f} мс{old_dec:>11.3f} мс{new_dec:>11.3f} мс{size:>20}")
+
+
+if __name__ == "__main__":
+    main()
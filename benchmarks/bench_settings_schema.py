@@ -0,0 +1,61 @@
+"""
+Бенчмарк загрузки и восстановления config.json:
+старый рекурсивный обход (restore_config + сравнение) против скомпилированной схемы,
+а также стоимость доступа к вложенному параметру через словари и через представление.
+
+Запуск: python benchmarks/bench_settings_schema.py
+"""
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings import CONFIG, SCHEMAS, restore_config
+from file_writer import copy_json
+
+
+def make_large_config() -> str:
+    """Собирает большой config.json: стандартный шаблон, тысячи пользователей и лишние секции."""
+    config = copy_json(CONFIG.default)
+    config["telegram"]["bot"]["signed_users"] = list(range(5000))
+    config["playerok"]["legacy"] = {f"key_{i}": {"enabled": True, "value": i} for i in range(2000)}
+    del config["playerok"]["review_monitoring"]
+    return json.dumps(config, indent=4, ensure_ascii=False)
+
+
+def old_load(raw: str) -> dict:
+    config = json.loads(raw)
+    new_config = restore_config(config, CONFIG.default)
+    if config != new_config:
+        config = new_config
+    return config
+
+
+def new_load(raw: str) -> dict:
+    config, _ = SCHEMAS["config"].repair(json.loads(raw))
+    return config
+
+
+def main():
+    raw = make_large_config()
+    number = 50
+    old = timeit.timeit(lambda: old_load(raw), number=number) / number
+    new = timeit.timeit(lambda: new_load(raw), number=number) / number
+    print(f"Загрузка + восстановление ({len(raw) // 1024} КБ):")
+    print(f"  restore_config:      {old * 1000:8.3f} мс")
+    print(f"  скомпилированная:    {new * 1000:8.3f} мс  (x{old / new:.2f})")
+
+    config = new_load(raw)
+    view = SCHEMAS["config"].view(config)
+    number = 1_000_000
+    by_dict = timeit.timeit(lambda: config["playerok"]["auto_raise_items"]["interval_hours"], number=number)
+    by_view = timeit.timeit(lambda: view.playerok.auto_raise_items.interval_hours, number=number)
+    print("Доступ к playerok.auto_raise_items.interval_hours:")
+    print(f"  словари:             {by_dict / number * 1e9:8.1f} нс")
+    print(f"  представление:       {by_view / number * 1e9:8.1f} нс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк запросов к истории сделок:
+перебор словарей событий на Python против колонок NumPy в stats_query.
+
+Запуск: python benchmarks/bench_stats_query.py [количество сделок]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+from stats_query import DealHistory
+
+
+def make_events(count: int) -> list[dict]:
+    """Генерирует историю сделок за два года по 500 товарам."""
+    rnd = random.Random(1)
+    now = time.time()
+    return [
+        {
+            "seq": i + 1,
+            "ts": now - (count - i) * (2 * 365 * 86400 / count),
+            "deal": f"deal-{i}",
+            "item": f"Товар {rnd.randrange(500)}",
+            "amount": round(rnd.lognormvariate(5, 1), 2),
+            "status": "refunded" if rnd.random() < 0.03 else "completed"
+        }
+        for i in range(count)
+    ]
+
+
+def python_sum_by_item(events: list[dict], since: float) -> dict:
+    sums = {}
+    for event in events:
+        if event["ts"] >= since and event["status"] == "completed":
+            sums[event["item"]] = sums.get(event["item"], 0) + event["amount"]
+    return sums
+
+
+def python_percentiles(events: list[dict], since: float) -> list[float]:
+    amounts = sorted(e["amount"] for e in events if e["ts"] >= since and e["status"] == "completed")
+    return [amounts[int(len(amounts) * q / 100)] for q in (50, 90, 99)]
+
+
+def python_series(events: list[dict], since: float) -> dict:
+    series = {}
+    for event in events:
+        if event["ts"] >= since and event["status"] == "completed":
+            key = time.strftime("%Y-%m-%d", time.localtime(event["ts"]))
+            count, total = series.get(key, (0, 0.0))
+            series[key] = (count + 1, total + event["amount"])
+    return series
+
+
+def bench(func, number: int = 5) -> float:
+    return timeit.timeit(func, number=number) / number * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    events = make_events(count)
+    since = time.time() - 90 * 86400
+    with tempfile.TemporaryDirectory() as folder:
+        history_path = os.path.join(folder, "stats_history.log")
+        with open(history_path, "wb") as f:
+            f.write(b"".join(json_codec.dumps(e) + b"\n" for e in events))
+        history = DealHistory(history_path, os.path.join(folder, "stats_journal.log"))
+        start = time.perf_counter()
+        history.refresh()
+        print(f"Сделок: {count}, загрузка колонок: {(time.perf_counter() - start) * 1000:.0f} мс")
+        print(f"{'запрос (90 дней)':<28}{'Python':>12}{'NumPy':>12}")
+        for name, old, new in (
+            ("сумма по товарам", lambda: python_sum_by_item(events, since), lambda: history.sum_by_item(since)),
+            ("перцентили суммы", lambda: python_percentiles(events, since), lambda: history.percentiles(since=since)),
+            ("ряд по дням", lambda: python_series(events, since), lambda: history.series("day", since)),
+        ):
+            print(f"{name:<28}{bench(old):>9.1f} мс{bench(new):>9.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
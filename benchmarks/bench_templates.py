@@ -0,0 +1,48 @@
+"""
+Бенчмарк сборки сообщения на каждое событие:
+чтение messages.json, склейка строк, format и водяной знак (как раньше) против templates.render.
+Настройки создаются во временной папке, настройки бота не затрагиваются.
+
+Запуск: python benchmarks/bench_templates.py
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Пути берутся из окружения при импорте paths, поэтому папка задаётся до импорта настроек
+_folder = tempfile.TemporaryDirectory()
+os.environ["SEAL_DURABLE_DIR"] = _folder.name
+os.environ["SEAL_HOT_DIR"] = os.path.join(_folder.name, "storage")
+
+import templates
+from settings import Settings as sett
+
+
+def old_render(name: str, **values) -> str | None:
+    message = sett.get("messages")[name]
+    if not message["enabled"]:
+        return None
+    text = "\n".join(message["text"]).format(**values)
+    watermark = sett.get("config")["playerok"]["watermark"]
+    if watermark["enabled"] and watermark["value"]:
+        text += f"\n{watermark['value']}"
+    return text
+
+
+def main():
+    number = 20_000
+    values = {"username": "buyer", "deal_item_name": "Steam ключ", "deal_amount": 2}
+    messages = sett.get("messages")
+    messages["new_deal"]["enabled"] = True
+    sett.set("messages", messages)
+    assert old_render("new_deal", **values) == templates.render("new_deal", **values)
+    old = timeit.timeit(lambda: old_render("new_deal", **values), number=number) / number * 1e6
+    new = timeit.timeit(lambda: templates.render("new_deal", **values), number=number) / number * 1e6
+    print(f"Сообщение new_deal: {old:.1f} мкс → {new:.1f} мкс ({old / new:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -199,19 +199,24 @@ from playerokapi.exceptions import CloudflareDetectedException
 
 from __init__ import ACCENT_COLOR, VERSION, SECONDARY_COLOR, HIGHLIGHT_COLOR, SUCCESS_COLOR
 from settings import Settings as sett
+import file_writer
+import json_codec
+import stats
 from core.utils import (
     set_title, 
     setup_logger, 
     patch_requests, 
     init_main_loop, 
-    run_async_in_thread
+    run_async_in_thread,
+    start_checkpointing
 )
 from core.plugins import (
     load_plugins, 
     set_plugins, 
     connect_plugins
 )
-from core.handlers import call_bot_event
+from core.handlers import call_bot_event, configure_playerok_dispatch, configure_handler_pool
+from core.event_dispatcher import get_event_dispatcher
 from core.proxy_utils import normalize_proxy, validate_proxy
 from updater import check_for_updates
 
@@ -247,7 +252,7 @@ def check_permissions():
     from pathlib import Path
     from colorama import Fore
     
-    settings_dir = Path("bot_settings").resolve()
+    settings_dir = Path(paths.BOT_SETTINGS_DIR).resolve()
     current_user = pwd.getpwuid(os.getuid()).pw_name
     
     if not settings_dir.exists():
@@ -679,6 +684,18 @@ if __name__ == "__main__":
         
         check_and_configure_config()
         
+        storage_config = sett.get("config")["storage"]
+        json_codec.configure(storage_config["json"]["pretty_settings"], storage_config["json"]["pretty_data"])
+        file_writer.configure(storage_config["write_behind"]["enabled"], storage_config["write_behind"]["debounce_seconds"])
+        handlers_config = sett.get("config")["playerok"]["event_handlers"]
+        configure_playerok_dispatch(handlers_config["concurrent"], handlers_config["max_concurrency"], handlers_config["handler_timeout"])
+        configure_handler_pool(max_workers=handlers_config["blocking_workers"])
+        get_event_dispatcher(handlers_config["shard_workers"]).configure(
+            handlers_config["max_queue"], handlers_config["shed_latency"], handlers_config["drop_latency"],
+            handlers_config["coalesce_window"], handlers_config["journal"])
+        stats.start_compactor()
+        start_checkpointing()
+        
         # Загружаем плагины
         plugins = load_plugins()
         set_plugins(plugins)
@@ -695,6 +712,12 @@ if __name__ == "__main__":
         # print(f"\n{Fore.CYAN}Запуск Telegram бота...{Fore.RESET}")
         main_loop.run_until_complete(start_telegram_bot())
         
+        # Повторяем ивенты, не обработанные до перезапуска, до приёма новых
+        try:
+            main_loop.run_until_complete(get_event_dispatcher().replay_journal())
+        except Exception as e:
+            logger.error(f"{Fore.LIGHTRED_EX}Ошибка при повторе ивентов из журнала: {e}")
+        
         # Запускаем PlayerOk бота
         # print(f"{Fore.CYAN}Инициализация аккаунта PlayerOk...{Fore.RESET}")
         try:
@@ -0,0 +1,166 @@
+"""
+Разбор команд из сообщений чата для Seal Playerok Bot.
+
+Таблица команд (встроенные `!команды`/`!продавец`, пользовательские из
+`custom_commands.json` и псевдонимы) собирается один раз и пересобирается при изменении
+файла. Почти все сообщения в чате - не команды, поэтому они отсекаются по первому символу
+за O(1), не обращаясь к настройкам (новый первый символ из файла, изменённого вручную,
+учитывается после ближайшего чтения настроек).
+"""
+import threading
+from dataclasses import dataclass
+from logging import getLogger
+
+from settings import Settings as sett
+
+
+logger = getLogger("seal.commands")
+
+BUILTIN_COMMANDS = {
+    "!команды": "cmd_commands",
+    "!продавец": "cmd_seller",
+}
+
+
+@dataclass(frozen=True)
+class CommandMatch:
+    name: str                 # Команда, как она записана в таблице
+    kind: str                 # "builtin" или "custom"
+    args: tuple = ()          # Аргументы через пробел
+    raw_args: str = ""        # Аргументы одной строкой
+    message: str | None = None              # Ключ сообщения в messages.json (для встроенных)
+    response: list | None = None            # Строки ответа (для пользовательских)
+
+
+class CommandDispatcher:
+    """Таблица команд с пересборкой при изменении `custom_commands.json`."""
+
+    def __init__(self):
+        self._aliases: dict[str, str] = {}
+        self._table: dict[str, tuple[str, str, object]] = {}
+        self._first_chars: frozenset[str] = frozenset()
+        self._max_words = 1
+        self._version = None
+        self._dirty = True
+        self._lock = threading.Lock()
+        self.builds = 0
+        sett.subscribe("custom_commands", "", self._on_changed)
+
+    def resolve(self, text: str) -> CommandMatch | None:
+        """
+        Находит команду в начале сообщения.
+        Из нескольких подходящих команд выбирается самая длинная (по словам).
+
+        :param text: Текст сообщения.
+        :type text: `str`
+
+        :return: Найденная команда или `None`, если сообщение - не команда.
+        :rtype: `commands.CommandMatch` or `None`
+        """
+        if text and text[0].isspace():
+            text = text.lstrip()
+        if not text or (text[0] not in self._first_chars and not self._dirty):
+            return None
+        self._ensure_built()
+        if text[0] not in self._first_chars:
+            return None
+        text = text.rstrip()
+        words = text.split()
+        for count in range(min(self._max_words, len(words)), 0, -1):
+            key = " ".join(words[:count]).casefold()
+            entry = self._table.get(key)
+            if entry is None:
+                continue
+            name, kind, target = entry
+            raw_args = text.split(None, count)[count] if len(words) > count else ""
+            if kind == "builtin":
+                return CommandMatch(name, kind, tuple(words[count:]), raw_args, message=target)
+            return CommandMatch(name, kind, tuple(words[count:]), raw_args, response=list(target))
+        return None
+
+    def add_alias(self, alias: str, command: str):
+        """
+        Добавляет псевдоним команды.
+
+        :param alias: Псевдоним, например `!позвать`.
+        :type alias: `str`
+
+        :param command: Существующая команда, например `!продавец`.
+        :type command: `str`
+        """
+        with self._lock:
+            self._aliases[" ".join(alias.split()).casefold()] = " ".join(command.split()).casefold()
+            self._dirty = True
+
+    def remove_alias(self, alias: str) -> bool:
+        """
+        Удаляет псевдоним команды.
+
+        :param alias: Псевдоним.
+        :type alias: `str`
+
+        :return: True, если псевдоним был.
+        :rtype: `bool`
+        """
+        with self._lock:
+            removed = self._aliases.pop(" ".join(alias.split()).casefold(), None) is not None
+            self._dirty = self._dirty or removed
+            return removed
+
+    def get_commands(self) -> list[str]:
+        """
+        Возвращает все команды таблицы, включая псевдонимы.
+
+        :rtype: `list[str]`
+        """
+        self._ensure_built()
+        return sorted(self._table)
+
+    def _on_changed(self, change):
+        self._dirty = True
+
+    def _ensure_built(self):
+        version = sett.version("custom_commands")
+        if not self._dirty and version == self._version:
+            return
+        with self._lock:
+            version = sett.version("custom_commands")
+            if not self._dirty and version == self._version:
+                return
+            table: dict[str, tuple[str, str, object]] = {}
+            for name, message in BUILTIN_COMMANDS.items():
+                table[name.casefold()] = (name, "builtin", message)
+            for name, response in (sett.get("custom_commands") or {}).items():
+                key = " ".join(str(name).split()).casefold()
+                if key:
+                    table[key] = (name, "custom", response if isinstance(response, list) else [str(response)])
+            for alias, command in self._aliases.items():
+                if command in table:
+                    table[alias] = table[command]
+                else:
+                    logger.warning(f"Псевдоним {alias} ссылается на неизвестную команду {command}")
+            self._table = table
+            self._first_chars = frozenset(key[0] for key in table) | frozenset(key[0].upper() for key in table)
+            self._max_words = max((len(key.split()) for key in table), default=1)
+            self._version = version
+            self._dirty = False
+            self.builds += 1
+
+
+_dispatcher: CommandDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_command_dispatcher() -> CommandDispatcher:
+    """
+    Возвращает общую таблицу команд.
+
+    :return: Таблица команд.
+    :rtype: `commands.CommandDispatcher`
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = CommandDispatcher()
+    return _dispatcher
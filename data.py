@@ -1,9 +1,12 @@
-import json
 import os
 from dataclasses import dataclass
 
 # Импорт путей из центрального модуля
 import paths
+import file_writer
+import json_codec
+import sqlite_storage
+from file_writer import copy_json
 
 
 @dataclass
@@ -19,7 +22,19 @@ INITIALIZED_USERS = DataFile(
     default={}  # {user_id: timestamp} - время последнего приветствия
 )
 
-DATA = [INITIALIZED_USERS]
+AUTO_RAISE_ITEMS_TIMES = DataFile(
+    name="auto_raise_items_times",
+    path=paths.AUTO_RAISE_ITEMS_TIMES_FILE,
+    default={}  # {item_id: timestamp} - время последнего поднятия товара
+)
+
+DEALS_TO_MONITOR = DataFile(
+    name="deals_to_monitor",
+    path=paths.DEALS_MONITOR_FILE,
+    default={}  # {deal_id: timestamp} - время постановки сделки на ожидание отзыва
+)
+
+DATA = [INITIALIZED_USERS, AUTO_RAISE_ITEMS_TIMES, DEALS_TO_MONITOR]
 
 
 def get_json(path: str, default: dict | list) -> dict:
@@ -37,12 +52,10 @@ def get_json(path: str, default: dict | list) -> dict:
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = json_codec.load_file(path)
     except:
         config = default
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        file_writer.write_file(path, json_codec.dumps(config, json_codec.PRETTY_DATA))
     finally:
         return config
     
@@ -57,8 +70,7 @@ def set_json(path: str, new: dict):
     :param new: Новые данные.
     :type new: `dict`
     """
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(new, f, indent=4, ensure_ascii=False)
+    file_writer.write_file(path, json_codec.dumps(new, json_codec.PRETTY_DATA))
 
 
 class Data:
@@ -67,6 +79,16 @@ class Data:
     def get(name: str, data: list[DataFile] = DATA) -> dict | None:
         try: 
             file = [file for file in data if file.name == name][0]
+            storage = sqlite_storage.get_storage()
+            if storage is not None:
+                value = storage.load(file.name)
+                if value is None:
+                    value = copy_json(file.default)
+                    storage.save(file.name, value)
+                return value
+            pending = file_writer.get_pending(file.path)
+            if pending is not None:
+                return copy_json(pending)
             return get_json(file.path, file.default)
         except: return None
 
@@ -74,5 +96,78 @@ class Data:
     def set(name: str, new: list | dict, data: list[DataFile] = DATA):
         try: 
             file = [file for file in data if file.name == name][0]
-            set_json(file.path, new)
-        except: pass
\ No newline at end of file
+            storage = sqlite_storage.get_storage()
+            if storage is not None:
+                storage.save(file.name, new)
+                return
+            file_writer.submit(file.path, copy_json(new), set_json)
+        except: pass
+
+    @staticmethod
+    def get_item(name: str, key: str, default=None, data: list[DataFile] = DATA):
+        """
+        Получает одну запись файла данных.
+        При хранении в SQLite читается только эта запись.
+
+        :param name: Название файла данных.
+        :type name: `str`
+
+        :param key: Ключ записи.
+        :type key: `str`
+
+        :param default: Значение, если записи нет.
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            storage = sqlite_storage.get_storage()
+            if storage is not None:
+                return storage.get_item(file.name, key, default)
+            return Data.get(name, data).get(str(key), default)
+        except: return default
+
+    @staticmethod
+    def set_item(name: str, key: str, value, data: list[DataFile] = DATA):
+        """
+        Добавляет или заменяет одну запись файла данных.
+        При хранении в SQLite перезаписывается только эта запись.
+
+        :param name: Название файла данных.
+        :type name: `str`
+
+        :param key: Ключ записи.
+        :type key: `str`
+
+        :param value: Значение записи.
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            storage = sqlite_storage.get_storage()
+            if storage is not None:
+                storage.set_item(file.name, key, value)
+                return
+            current = Data.get(name, data)
+            current[str(key)] = value
+            Data.set(name, current, data)
+        except: pass
+
+    @staticmethod
+    def delete_item(name: str, key: str, data: list[DataFile] = DATA):
+        """
+        Удаляет одну запись файла данных.
+
+        :param name: Название файла данных.
+        :type name: `str`
+
+        :param key: Ключ записи.
+        :type key: `str`
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            storage = sqlite_storage.get_storage()
+            if storage is not None:
+                storage.delete_item(file.name, key)
+                return
+            current = Data.get(name, data)
+            if current.pop(str(key), None) is not None:
+                Data.set(name, current, data)
+        except: pass
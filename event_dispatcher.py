@@ -0,0 +1,675 @@
+"""
+Очереди ивентов Playerok для Seal Playerok Bot.
+
+Ивент сначала попадает в ограниченную входную очередь с классами приоритета
+(сделки и оплаты, затем остальные ивенты сделок, сообщения, инициализация чатов),
+а из неё - в очереди по ключу (ID чата, иначе ID сделки), которые обрабатывает пул
+воркеров: внутри одного чата или сделки порядок сохраняется, а разные чаты
+обрабатываются параллельно. Класс приоритета выбирается для ключа, а не для ивента:
+ивенты ключа во входной очереди стоят в одном классе (самом важном из их классов).
+В очереди одного ключа держится не больше `SHARD_BACKLOG` ивентов, поэтому занятый чат
+не мешает новым чатам попасть к воркерам. Опустевшие очереди удаляются,
+статистика по ним хранится ещё `IDLE_TTL` секунд.
+
+При перегрузке:
+- переполненная входная очередь вытесняет последний ивент самого низкого класса;
+- ивент, прождавший дольше `shed_latency`, обрабатывается без хендлеров,
+  помеченных `core.handlers.sheddable`;
+- ивент низшего класса, прождавший дольше `drop_latency`, отбрасывается целиком.
+
+Ивенты сделки из `COALESCE_EVENTS` объединяются: хендлеры без пометки
+`core.handlers.coalesced` получают каждый ивент сразу, а помеченные - один
+`CoalescedDealEvent` через `coalesce_window` секунд после первого ивента сделки
+с итоговым состоянием и списком переходов.
+
+Если включён журнал (`event_journal`), ивент записывается на диск до обработки,
+хендлеры подтверждают его после успешной обработки, а после перезапуска
+незавершённые ивенты обрабатываются повторно (`replay_journal`).
+
+    dispatcher = get_event_dispatcher()
+    dispatcher.submit(event.type, [event])
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from logging import getLogger
+
+from playerokapi.listener.events import EventTypes
+
+import event_journal
+from core.handlers import call_playerok_event, has_coalesced_handlers
+
+
+logger = getLogger("seal.event_dispatcher")
+
+IDLE_TTL = 300  # Сколько секунд хранить статистику опустевшей очереди
+DEFAULT_KEY = "_"  # Очередь для ивентов без чата и сделки
+
+# Классы приоритета (меньше - важнее)
+PRIORITY_CRITICAL = 0  # Новые сделки, оплаты и проблемы - никогда не вытесняются
+PRIORITY_DEAL = 1
+PRIORITY_MESSAGE = 2
+PRIORITY_LOW = 3
+EVENT_PRIORITIES = {
+    EventTypes.NEW_DEAL: PRIORITY_CRITICAL,
+    EventTypes.ITEM_PAID: PRIORITY_CRITICAL,
+    EventTypes.DEAL_HAS_PROBLEM: PRIORITY_CRITICAL,
+    EventTypes.NEW_MESSAGE: PRIORITY_MESSAGE,
+    EventTypes.CHAT_INITIALIZED: PRIORITY_LOW,
+}
+COALESCE_EVENTS = frozenset({
+    EventTypes.DEAL_STATUS_CHANGED,
+    EventTypes.ITEM_PAID,
+    EventTypes.ITEM_SENT,
+    EventTypes.DEAL_CONFIRMED,
+})
+SHARD_BACKLOG = 2  # Сколько ивентов на воркера (и на один чат) держать в очередях чатов, остальные ждут во входной
+
+
+@dataclass
+class ShardStats:
+    depth: int = 0            # Ивентов в очереди
+    processed: int = 0        # Обработано ивентов
+    last_wait: float = 0.0    # Ожидание последнего ивента в очереди, сек
+    max_wait: float = 0.0     # Максимальное ожидание, сек
+    total_wait: float = 0.0   # Суммарное ожидание, сек
+    last_active: float = 0.0  # Время последней активности (monotonic)
+
+
+@dataclass
+class IngressStats:
+    depth: int = 0              # Ивентов во входной очереди
+    max_wait: float = 0.0       # Максимальное ожидание ивента до обработки, сек
+    last_wait: float = 0.0      # Ожидание последнего ивента, сек
+    shed_events: int = 0        # Отброшено ивентов целиком
+    shed_handlers: int = 0      # Пропущено хендлеров sheddable
+    overloaded: bool = False    # Последний ивент ждал дольше shed_latency
+
+
+@dataclass(slots=True)
+class _QueuedEvent:
+    event: EventTypes
+    args: list
+    enqueued_at: float
+    future: asyncio.Future | None
+    priority: int
+    delivery: str | None = None                 # "coalesced" - объединённый ивент
+    seq: int | None = None                      # Номер в журнале
+    key: str | None = None                      # Ключ очереди
+    skip: frozenset[str] = frozenset()          # Хендлеры, уже обработавшие ивент
+    sources: list | None = None                 # Для объединённого ивента: [(seq, ok)] исходных ивентов
+
+
+def get_event_key(event: EventTypes, args: list) -> str:
+    """
+    Определяет ключ очереди ивента: ID чата, иначе ID сделки.
+
+    :param event: Тип ивента.
+    :type event: `playerokapi.listener.events.EventTypes`
+
+    :param args: Аргументы ивента.
+    :type args: `list`
+
+    :return: Ключ очереди.
+    :rtype: `str`
+    """
+    obj = args[0] if args else None
+    for attr in ("chat", "deal"):
+        value = getattr(obj, attr, None)
+        value_id = getattr(value, "id", None)
+        if value_id is not None:
+            return f"{attr}:{value_id}"
+    for attr in ("chat_id", "deal_id"):
+        value_id = getattr(obj, attr, None)
+        if value_id is not None:
+            return f"{attr[:-3]}:{value_id}"
+    return DEFAULT_KEY
+
+
+def get_deal_id(args: list) -> str | None:
+    """
+    Возвращает ID сделки из аргументов ивента.
+
+    :param args: Аргументы ивента.
+    :type args: `list`
+
+    :return: ID сделки или `None`.
+    :rtype: `str` or `None`
+    """
+    obj = args[0] if args else None
+    deal_id = getattr(getattr(obj, "deal", None), "id", None)
+    return deal_id if deal_id is not None else getattr(obj, "deal_id", None)
+
+
+class CoalescedDealEvent:
+    """
+    Объединённые ивенты одной сделки.
+    Атрибуты, которых нет у объединённого ивента (например, `deal` и `chat`),
+    берутся из последнего ивента.
+
+    :param deal_id: ID сделки.
+    :type deal_id: `str` or `None`
+
+    :param events: Ивенты в порядке поступления: список (тип, объект ивента).
+    :type events: `list[tuple[playerokapi.listener.events.EventTypes, object]]`
+    """
+
+    def __init__(self, deal_id: str | None, events: list[tuple[EventTypes, object]]):
+        self.deal_id = deal_id
+        self.events = events
+
+    @property
+    def type(self) -> EventTypes:
+        """Тип последнего ивента."""
+        return self.events[-1][0]
+
+    @property
+    def event(self):
+        """Последний ивент (итоговое состояние сделки)."""
+        return self.events[-1][1]
+
+    @property
+    def transitions(self) -> list[EventTypes]:
+        """Типы всех объединённых ивентов по порядку."""
+        return [event_type for event_type, _ in self.events]
+
+    @property
+    def statuses(self) -> list:
+        """Статусы сделки во всех объединённых ивентах (где они есть), без повторов подряд."""
+        statuses = []
+        for _, event in self.events:
+            status = getattr(getattr(event, "deal", None), "status", None)
+            if status is not None and (not statuses or statuses[-1] != status):
+                statuses.append(status)
+        return statuses
+
+    def __getattr__(self, name: str):
+        if name == "events":
+            raise AttributeError(name)
+        return getattr(self.event, name)
+
+
+def get_event_priority(event: EventTypes) -> int:
+    """
+    Возвращает класс приоритета ивента.
+
+    :param event: Тип ивента.
+    :type event: `playerokapi.listener.events.EventTypes`
+
+    :return: Класс приоритета (`PRIORITY_*`, меньше - важнее).
+    :rtype: `int`
+    """
+    return EVENT_PRIORITIES.get(event, PRIORITY_DEAL)
+
+
+class IngressQueue:
+    """
+    Ограниченная очередь с классами приоритета и ключами.
+    Элементы одного ключа выдаются строго по порядку и стоят в одном классе: если приходит
+    более важный элемент, весь ключ переходит в его класс. Выдаётся элемент самого важного
+    класса, ключи внутри класса чередуются. При переполнении вытесняется последний элемент
+    самого низкого класса. Элементы `PRIORITY_CRITICAL` не вытесняются и принимаются сверх лимита.
+
+    :param max_size: Максимальное количество элементов.
+    :type max_size: `int`
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max(int(max_size), 1)
+        self._classes: list[deque] = [deque() for _ in range(PRIORITY_LOW + 1)]  # Ключи
+        self._counts = [0] * (PRIORITY_LOW + 1)
+        self._waiting: dict[object, deque] = {}
+        self._key_class: dict[object, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def put(self, item, priority: int, key=DEFAULT_KEY):
+        """
+        Добавляет элемент.
+
+        :param item: Элемент.
+
+        :param priority: Класс приоритета.
+        :type priority: `int`
+
+        :param key: Ключ (порядок сохраняется внутри ключа).
+
+        :return: Вытесненный элемент (возможно, сам `item`) или `None`.
+        """
+        priority = min(max(priority, PRIORITY_CRITICAL), PRIORITY_LOW)
+        current = self._key_class.get(key)
+        if current is not None and current > priority:
+            self._move(key, current, priority)
+        elif current is not None:
+            priority = current
+        evicted = None
+        if self._size >= self.max_size and priority != PRIORITY_CRITICAL:
+            lowest = next((p for p in range(PRIORITY_LOW, PRIORITY_CRITICAL, -1) if self._classes[p]), None)
+            if lowest is None or lowest <= priority:
+                return item
+            evicted = self._pop_last(lowest)
+        items = self._waiting.get(key)
+        if items is None:
+            items = self._waiting[key] = deque()
+            self._key_class[key] = priority
+            self._classes[priority].append(key)
+        items.append(item)
+        self._counts[priority] += 1
+        self._size += 1
+        return evicted
+
+    def get(self, blocked: set | frozenset = frozenset()):
+        """
+        Забирает следующий элемент самого важного класса.
+
+        :param blocked: Ключи, элементы которых сейчас выдавать нельзя.
+        :type blocked: `set`
+
+        :return: Элемент или `None`, если выдать нечего.
+        """
+        for priority, keys in enumerate(self._classes):
+            for position, key in enumerate(keys):
+                if key in blocked:
+                    continue
+                items = self._waiting[key]
+                item = items.popleft()
+                del keys[position]
+                if items:
+                    keys.append(key)
+                else:
+                    del self._waiting[key]
+                    del self._key_class[key]
+                self._counts[priority] -= 1
+                self._size -= 1
+                return item
+        return None
+
+    def depths(self) -> list[int]:
+        """
+        Возвращает количество элементов в каждом классе приоритета.
+
+        :rtype: `list[int]`
+        """
+        return list(self._counts)
+
+    def _move(self, key, current: int, priority: int):
+        count = len(self._waiting[key])
+        self._classes[current].remove(key)
+        self._classes[priority].append(key)
+        self._counts[current] -= count
+        self._counts[priority] += count
+        self._key_class[key] = priority
+
+    def _pop_last(self, priority: int):
+        key = self._classes[priority][-1]
+        items = self._waiting[key]
+        item = items.pop()
+        if not items:
+            self._classes[priority].pop()
+            del self._waiting[key]
+            del self._key_class[key]
+        self._counts[priority] -= 1
+        self._size -= 1
+        return item
+
+
+class EventDispatcher:
+    """
+    Пул воркеров над очередями ивентов по ключам.
+
+    :param workers: Количество воркеров (сколько чатов обрабатывается одновременно).
+    :type workers: `int`
+
+    :param key_func: Функция `key_func(event, args)`, возвращающая ключ очереди.
+    :type key_func: `callable`
+    """
+
+    def __init__(self, workers: int = 4, key_func: callable = get_event_key):
+        self.workers = max(int(workers), 1)
+        self.key_func = key_func
+        self.shed_latency = 5.0
+        self.drop_latency = 30.0
+        self.coalesce_window = 2.0
+        self._ingress = IngressQueue()
+        self._ingress_stats = IngressStats()
+        self.journal: event_journal.EventJournal | None = None
+        self._bursts: dict[str, tuple[list, asyncio.TimerHandle, list]] = {}
+        self._coalesce_stats = {"events": 0, "deliveries": 0}
+        self._shed_by_event: dict[str, int] = {}
+        self._shards: dict[str, deque] = {}
+        self._full: set[str] = set()  # Ключи, в очередях которых уже SHARD_BACKLOG ивентов
+        self._sharded = 0
+        self._stats: dict[str, ShardStats] = {}
+        self._ready: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def configure(self, max_queue: int = 1000, shed_latency: float = 5.0, drop_latency: float = 30.0,
+                  coalesce_window: float = 2.0, journal: bool = False):
+        """
+        Задаёт пороги перегрузки.
+
+        :param max_queue: Размер входной очереди.
+        :type max_queue: `int`
+
+        :param shed_latency: После скольких секунд ожидания пропускать хендлеры `sheddable` (0 - никогда).
+        :type shed_latency: `float`
+
+        :param drop_latency: После скольких секунд ожидания отбрасывать ивенты низшего класса (0 - никогда).
+        :type drop_latency: `float`
+
+        :param coalesce_window: Сколько секунд собирать ивенты сделки для хендлеров `coalesced`
+            (0 - передавать каждый ивент отдельно).
+        :type coalesce_window: `float`
+
+        :param journal: Записывать ивенты в журнал для восстановления после сбоя.
+        :type journal: `bool`
+        """
+        self._ingress.max_size = max(int(max_queue), 1)
+        self.shed_latency = max(float(shed_latency), 0)
+        self.drop_latency = max(float(drop_latency), 0)
+        self.coalesce_window = max(float(coalesce_window), 0)
+        self.journal = event_journal.get_event_journal() if journal else None
+
+    def start(self):
+        """Запускает воркеров в текущем event loop (вызывается автоматически при первом ивенте)."""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"seal-events-{i}") for i in range(self.workers)]
+        # Очереди, накопленные до запуска
+        for key in self._shards:
+            self._ready.put_nowait(key)
+
+    async def stop(self):
+        """Останавливает воркеров. Необработанные ивенты остаются в очередях, несобранные объединения теряются."""
+        for _, handle, _ in self._bursts.values():
+            handle.cancel()
+        self._bursts.clear()
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, event: EventTypes, args: list = []) -> asyncio.Future:
+        """
+        Ставит ивент во входную очередь.
+
+        :param event: Тип ивента.
+        :type event: `playerokapi.listener.events.EventTypes`
+
+        :param args: Аргументы ивента.
+        :type args: `list`
+
+        :return: Future с результатами хендлеров (`list[core.handlers.HandlerOutcome]`);
+            для отброшенного ивента - пустой список.
+        :rtype: `asyncio.Future`
+        """
+        seq = self.journal.append(event, args) if self.journal is not None else None
+        if seq is not None and args:
+            event_journal.mark_event(args[0], seq)
+        return self._submit(event, args, seq)
+
+    async def replay_journal(self) -> int:
+        """
+        Повторно обрабатывает незавершённые ивенты прошлого запуска из журнала
+        (без хендлеров, уже подтвердивших их) и дожидается обработки.
+
+        :return: Количество повторённых ивентов.
+        :rtype: `int`
+        """
+        if self.journal is None:
+            return 0
+        recovered = self.journal.take_recovered()
+        futures = []
+        for seq, event, args, acked in recovered:
+            if args:
+                event_journal.mark_event(args[0], seq, replay=True)
+            futures.append(self._submit(event, args, seq, acked))
+        await asyncio.gather(*futures, return_exceptions=True)
+        if recovered:
+            logger.info(f"Повторно обработано ивентов из журнала: {len(recovered)}")
+        return len(recovered)
+
+    def _submit(self, event: EventTypes, args: list, seq: int | None,
+                skip: frozenset[str] = frozenset()) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        priority = get_event_priority(event)
+        key = self.key_func(event, args)
+        item = _QueuedEvent(event, args, time.monotonic(), future, priority, seq=seq, key=key, skip=skip)
+        evicted = self._ingress.put(item, priority, key)
+        if evicted is not None:
+            self._shed(evicted)
+        self._pump()
+        return future
+
+    def get_stats(self) -> dict[str, ShardStats]:
+        """
+        Возвращает статистику очередей: глубину и время ожидания по каждому ключу.
+        Заодно удаляет статистику очередей, простаивающих дольше `IDLE_TTL`.
+
+        :return: Словарь {ключ: статистика}.
+        :rtype: `dict[str, event_dispatcher.ShardStats]`
+        """
+        now = time.monotonic()
+        for key in [key for key, stats in self._stats.items()
+                    if key not in self._shards and now - stats.last_active > IDLE_TTL]:
+            del self._stats[key]
+        return dict(self._stats)
+
+    def get_ingress_stats(self) -> dict:
+        """
+        Возвращает статистику входной очереди.
+
+        :return: Словарь с глубиной (всего и по классам приоритета), ожиданием,
+            количеством отброшенных ивентов и пропущенных хендлеров.
+        :rtype: `dict`
+        """
+        stats = self._ingress_stats
+        stats.depth = len(self._ingress)
+        return {
+            "depth": stats.depth,
+            "depth_by_priority": self._ingress.depths(),
+            "max_wait": stats.max_wait,
+            "last_wait": stats.last_wait,
+            "shed_events": stats.shed_events,
+            "shed_handlers": stats.shed_handlers,
+            "shed_by_event": dict(self._shed_by_event),
+            "overloaded": stats.overloaded,
+        }
+
+    def get_coalesce_stats(self) -> dict:
+        """
+        Возвращает статистику объединения ивентов сделок.
+
+        :return: Словарь: events - объединено ивентов, deliveries - передано объединений,
+            open - сделок, по которым ивенты ещё собираются.
+        :rtype: `dict`
+        """
+        return {**self._coalesce_stats, "open": len(self._bursts)}
+
+    @property
+    def pending(self) -> int:
+        """Количество ивентов во всех очередях."""
+        return len(self._ingress) + self._sharded
+
+    def _shed(self, item: _QueuedEvent):
+        self._ingress_stats.shed_events += 1
+        self._shed_by_event[item.event.name] = self._shed_by_event.get(item.event.name, 0) + 1
+        if item.seq is not None:
+            # Отброшенный при перегрузке ивент не повторяется после перезапуска
+            self.journal.done(item.seq)
+        if item.future is not None and not item.future.done():
+            item.future.set_result([])
+
+    def _pump(self):
+        # Переносим ивенты в очереди чатов, пока у воркеров есть запас работы;
+        # ивенты чатов с заполненной очередью ждут во входной и не задерживают остальные
+        while self._sharded < self.workers * SHARD_BACKLOG:
+            item = self._ingress.get(self._full)
+            if item is None:
+                return
+            self._enqueue(item)
+
+    def _enqueue(self, item: _QueuedEvent):
+        key = item.key if item.key is not None else self.key_func(item.event, item.args)
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = self._shards[key] = deque()
+            self._ready.put_nowait(key)
+        shard.append(item)
+        self._sharded += 1
+        if len(shard) >= SHARD_BACKLOG:
+            self._full.add(key)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ShardStats()
+        stats.depth = len(shard)
+        stats.last_active = time.monotonic()
+
+    def _coalesce(self, item: _QueuedEvent, ok: bool):
+        deal_id = get_deal_id(item.args)
+        source = (item.event, item.args[0] if item.args else None)
+        if not self.coalesce_window or deal_id is None:
+            self._deliver_coalesced(deal_id, [source], [(item.seq, ok, item.skip)])
+            return
+        burst = self._bursts.get(deal_id)
+        if burst is None:
+            handle = asyncio.get_running_loop().call_later(self.coalesce_window, self._flush_burst, deal_id)
+            burst = self._bursts[deal_id] = ([], handle, [])
+        burst[0].append(source)
+        burst[2].append((item.seq, ok, item.skip))
+
+    def _flush_burst(self, deal_id: str):
+        burst = self._bursts.pop(deal_id, None)
+        if burst is not None:
+            self._deliver_coalesced(deal_id, burst[0], burst[2])
+
+    def _deliver_coalesced(self, deal_id: str | None, events: list, sources: list):
+        # Объединение встаёт в очередь чата сделки, минуя входную очередь (ивенты уже приняты)
+        merged = CoalescedDealEvent(deal_id, events)
+        self._coalesce_stats["events"] += len(events)
+        self._coalesce_stats["deliveries"] += 1
+        # Хендлер пропускается, только если он уже обработал все объединённые ивенты
+        skip = frozenset.intersection(*(s for _, _, s in sources)) if sources else frozenset()
+        self._enqueue(_QueuedEvent(merged.type, [merged], time.monotonic(), None, PRIORITY_DEAL, "coalesced",
+                                   skip=skip, sources=[(seq, ok) for seq, ok, _ in sources]))
+
+    def _journal_seqs(self, item: _QueuedEvent) -> list[int]:
+        if self.journal is None:
+            return []
+        if item.sources is not None:
+            return [seq for seq, _ in item.sources if seq is not None]
+        return [item.seq] if item.seq is not None else []
+
+    def _ack_callback(self, item: _QueuedEvent) -> callable:
+        # Подтверждаем каждый хендлер сразу после успешного завершения
+        seqs = self._journal_seqs(item)
+        if not seqs:
+            return None
+
+        def on_outcome(outcome):
+            if outcome.ok:
+                for seq in seqs:
+                    self.journal.ack(seq, [outcome.key])
+        return on_outcome
+
+    def _complete(self, item: _QueuedEvent, result: list, coalescing: bool):
+        # Ивент с ошибками хендлеров остаётся в журнале и повторяется после перезапуска
+        ok = all(outcome.ok for outcome in result)
+        if item.sources is not None:
+            for seq, source_ok in item.sources:
+                if seq is None or self.journal is None:
+                    continue
+                if source_ok and ok:
+                    self.journal.done(seq)
+                else:
+                    self.journal.fail(seq)
+        elif item.seq is not None and not coalescing:
+            # Ивент сделки завершается после передачи объединённого ивента
+            if ok:
+                self.journal.done(item.seq)
+            else:
+                self.journal.fail(item.seq)
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            shard = self._shards.get(key)
+            if not shard:
+                self._shards.pop(key, None)
+                continue
+            item = shard.popleft()
+            self._sharded -= 1
+            if len(shard) < SHARD_BACKLOG:
+                self._full.discard(key)
+            event, args, future = item.event, item.args, item.future
+            stats = self._stats.setdefault(key, ShardStats())
+            wait = time.monotonic() - item.enqueued_at
+            stats.depth = len(shard)
+            stats.last_wait = wait
+            stats.max_wait = max(stats.max_wait, wait)
+            stats.total_wait += wait
+            ingress = self._ingress_stats
+            ingress.last_wait = wait
+            ingress.max_wait = max(ingress.max_wait, wait)
+            ingress.overloaded = bool(self.shed_latency) and wait > self.shed_latency
+            try:
+                if self.drop_latency and wait > self.drop_latency and item.priority == PRIORITY_LOW:
+                    self._shed(item)
+                else:
+                    if item.seq is not None:
+                        await self.journal.sync()
+                    # Объединённый ивент собирается, только если есть кому его передать
+                    coalescing = (item.delivery is None and event in COALESCE_EVENTS
+                                  and has_coalesced_handlers(COALESCE_EVENTS))
+                    delivery = "raw" if coalescing else item.delivery
+                    events = args[0].transitions if item.delivery == "coalesced" else None
+                    result = await call_playerok_event(event, args, ingress.overloaded, delivery, item.skip,
+                                                       self._ack_callback(item), events)
+                    ingress.shed_handlers += sum(1 for outcome in result if outcome.shed)
+                    self._complete(item, result, coalescing)
+                    if coalescing:
+                        self._coalesce(item, all(outcome.ok for outcome in result))
+                    if future is not None and not future.done():
+                        future.set_result(result)
+            except asyncio.CancelledError:
+                shard.appendleft(item)
+                self._sharded += 1
+                if len(shard) >= SHARD_BACKLOG:
+                    self._full.add(key)
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при обработке ивента {event.name} в очереди {key}: {e}")
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            stats.processed += 1
+            stats.last_active = time.monotonic()
+            # Очередь снова встаёт в конец, чтобы другие чаты не ждали
+            if shard:
+                self._ready.put_nowait(key)
+            else:
+                del self._shards[key]
+            self._pump()
+
+
+_dispatcher: EventDispatcher | None = None
+
+
+def get_event_dispatcher(workers: int = 4) -> EventDispatcher:
+    """
+    Возвращает общий диспетчер ивентов Playerok.
+
+    :param workers: Количество воркеров при первом создании.
+    :type workers: `int`
+
+    :return: Диспетчер ивентов.
+    :rtype: `event_dispatcher.EventDispatcher`
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = EventDispatcher(workers)
+    return _dispatcher
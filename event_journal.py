@@ -0,0 +1,459 @@
+"""
+Журнал ивентов Playerok для восстановления после сбоя (Seal Playerok Bot).
+
+Каждый принятый ивент дописывается в журнал `storage/event_journal/` до обработки,
+а после обработки в журнал пишутся подтверждения хендлеров (ack) и отметка
+о завершении (done). Запись на диск (fsync) выполняется пачками: все ивенты,
+пришедшие за `FSYNC_DELAY`, фиксируются одним вызовом.
+
+Журнал разбит на сегменты `{первый seq}.log` по `SEGMENT_SIZE` байт новых записей.
+При смене сегмента (в фоновом потоке) и при запуске старые сегменты удаляются,
+а незавершённые ивенты из них переносятся в текущий. После перезапуска незавершённые
+ивенты повторно обрабатываются (`core.event_dispatcher.EventDispatcher.replay_journal`)
+без уже подтвердивших их хендлеров; хендлеры могут узнать повтор через `is_replay`
+и ключ идемпотентности через `get_event_seq`.
+
+Каждая неудачная обработка (с ошибкой хендлера) и каждый повтор считаются попыткой;
+после `MAX_REPLAYS` попыток ивент больше не повторяется. Если ивентов с ошибками
+накопилось больше `MAX_FAILED`, самые старые откладываются в `parked.jsonl`
+и не переносятся между сегментами.
+"""
+import asyncio
+import base64
+import os
+import pickle
+import threading
+import time
+from logging import getLogger
+
+from playerokapi.listener.events import EventTypes
+
+# Импорт путей из центрального модуля
+import paths
+import json_codec
+
+
+logger = getLogger("seal.event_journal")
+
+SEGMENT_SIZE = 4 * 1024 * 1024  # Размер сегмента журнала (байт)
+FSYNC_DELAY = 0.005             # Сколько секунд собирать ивенты в одну запись на диск
+MAX_REPLAYS = 3                 # Сколько попыток обработать ивент до отказа от него
+MAX_FAILED = 1000               # Сколько ивентов с ошибками хранить в журнале до откладывания
+PARKED_FILE = "parked.jsonl"    # Отложенные ивенты с ошибками (для ручного разбора)
+
+
+class _Entry:
+    __slots__ = ("seq", "event", "payload", "ts", "acked", "segment", "replays")
+
+    def __init__(self, seq: int, event: str, payload: str, ts: float, segment: str, replays: int = 0):
+        self.seq = seq
+        self.event = event
+        self.payload = payload
+        self.ts = ts
+        self.acked: set[str] = set()
+        self.segment = segment
+        self.replays = replays
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:012d}.log"
+
+
+def get_event_seq(event) -> int | None:
+    """
+    Возвращает номер ивента в журнале - ключ идемпотентности для хендлеров.
+
+    :param event: Объект ивента.
+
+    :return: Номер ивента или `None`, если ивент не записан в журнал.
+    :rtype: `int` or `None`
+    """
+    return getattr(event, "_seal_event_seq", None)
+
+
+def is_replay(event) -> bool:
+    """
+    Проверяет, обрабатывается ли ивент повторно после перезапуска.
+
+    :param event: Объект ивента.
+
+    :rtype: `bool`
+    """
+    return bool(getattr(event, "_seal_replay", False))
+
+
+def mark_event(event, seq: int, replay: bool = False):
+    """Отмечает объект ивента номером в журнале (и признаком повтора)."""
+    try:
+        event._seal_event_seq = seq
+        event._seal_replay = replay
+    except AttributeError:
+        pass
+
+
+class EventJournal:
+    """
+    Сегментированный журнал ивентов.
+
+    :param directory: Директория сегментов.
+    :type directory: `str`
+    """
+
+    def __init__(self, directory: str = paths.EVENT_JOURNAL_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._pending: dict[int, _Entry] = {}
+        self._failed: dict[int, None] = {}  # Ивенты с ошибками в порядке появления
+        self._recovered: list[int] = []
+        self._seq = 0
+        self._lsn = 0           # Номер последней записанной строки
+        self._synced_lsn = 0    # Номер последней строки, зафиксированной на диске
+        self._file = None
+        self._retired: list = []   # Файлы прошлых сегментов, ещё не записанные на диск
+        self._sync_lock = threading.Lock()
+        self._segment: str | None = None
+        self._size = 0
+        self._carried = 0          # Размер перенесённых в текущий сегмент записей
+        self._rotating = False
+        self._waiters: list[tuple[int, asyncio.Future]] = []
+        self._flushing = False
+        self.syncs = 0
+        self.synced_records = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def append(self, event: EventTypes, args: list) -> int | None:
+        """
+        Записывает ивент в журнал (без ожидания fsync, см. `sync`).
+
+        :param event: Тип ивента.
+        :type event: `playerokapi.listener.events.EventTypes`
+
+        :param args: Аргументы ивента.
+        :type args: `list`
+
+        :return: Номер ивента или `None`, если аргументы не удалось сохранить.
+        :rtype: `int` or `None`
+        """
+        try:
+            payload = base64.b64encode(pickle.dumps(list(args), pickle.HIGHEST_PROTOCOL)).decode()
+        except Exception as e:
+            logger.warning(f"Ивент {event.name} не записан в журнал: {e}")
+            return None
+        with self._lock:
+            if self._size - self._carried >= SEGMENT_SIZE and not self._rotating:
+                # Старый сегмент записывается на диск и удаляется в фоне, не задерживая event loop
+                self._rotating = True
+                self._open_segment(self._seq + 1)
+                threading.Thread(target=self._rotate, daemon=True, name="event-journal-rotate").start()
+            self._seq += 1
+            entry = self._pending[self._seq] = _Entry(self._seq, event.name, payload, time.time(), self._segment)
+            self._write_entry(entry)
+            return self._seq
+
+    def ack(self, seq: int, handlers: list[str]):
+        """
+        Подтверждает обработку ивента хендлерами.
+
+        :param seq: Номер ивента.
+        :type seq: `int`
+
+        :param handlers: Ключи хендлеров (`core.handlers.HandlerOutcome.key`), успешно обработавших ивент.
+        :type handlers: `list[str]`
+        """
+        with self._lock:
+            entry = self._pending.get(seq)
+            if entry is None:
+                return
+            for handler in handlers:
+                if handler not in entry.acked:
+                    entry.acked.add(handler)
+                    self._write({"op": "ack", "seq": seq, "handler": handler})
+
+    def done(self, seq: int):
+        """
+        Отмечает ивент обработанным - он больше не будет повторяться.
+
+        :param seq: Номер ивента.
+        :type seq: `int`
+        """
+        with self._lock:
+            self._failed.pop(seq, None)
+            if self._pending.pop(seq, None) is not None:
+                self._write({"op": "done", "seq": seq})
+
+    def fail(self, seq: int):
+        """
+        Отмечает неудачную обработку ивента (с ошибкой хендлера).
+        Ивент остаётся в журнале для повтора после перезапуска, пока не исчерпаны попытки.
+
+        :param seq: Номер ивента.
+        :type seq: `int`
+        """
+        with self._lock:
+            entry = self._pending.get(seq)
+            if entry is None:
+                return
+            entry.replays += 1
+            if entry.replays >= MAX_REPLAYS:
+                logger.warning(f"Ивент {entry.event} #{seq} не обработан за {MAX_REPLAYS} попытки, пропускаем")
+                self.done(seq)
+                return
+            self._write({"op": "fail", "seq": seq})
+            self._failed[seq] = None
+            while len(self._failed) > MAX_FAILED:
+                self._park(next(iter(self._failed)))
+
+    def take_recovered(self) -> list[tuple[int, EventTypes, list, frozenset[str]]]:
+        """
+        Возвращает незавершённые ивенты прошлого запуска (один раз) и отмечает их повтор.
+
+        :return: Список (номер, тип, аргументы, подтвердившие хендлеры).
+        :rtype: `list[tuple[int, playerokapi.listener.events.EventTypes, list, frozenset[str]]]`
+        """
+        with self._lock:
+            seqs, self._recovered = self._recovered, []
+            recovered = []
+            for seq in seqs:
+                entry = self._pending.get(seq)
+                if entry is None:
+                    continue
+                try:
+                    event = EventTypes[entry.event]
+                    args = pickle.loads(base64.b64decode(entry.payload))
+                except Exception as e:
+                    logger.error(f"Не удалось восстановить ивент {entry.event} #{seq} из журнала: {e}")
+                    self.done(seq)
+                    continue
+                entry.replays += 1
+                self._write({"op": "replay", "seq": seq})
+                recovered.append((seq, event, args, frozenset(entry.acked)))
+            return recovered
+
+    async def sync(self):
+        """
+        Дожидается записи на диск всего, что записано в журнал до вызова.
+        Одновременные вызовы объединяются в один fsync.
+        """
+        with self._lock:
+            target = self._lsn
+        if self._synced_lsn >= target:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append((target, future))
+        if not self._flushing:
+            self._flushing = True
+            loop.create_task(self._flush_waiters())
+        await future
+
+    def flush(self):
+        """Записывает журнал на диск (fsync)."""
+        with self._sync_lock:
+            with self._lock:
+                if self._file is None or (self._synced_lsn >= self._lsn and not self._retired):
+                    return
+                target = self._lsn
+                self._file.flush()
+                retired, self._retired = self._retired, []
+                fd = os.dup(self._file.fileno())
+            try:
+                for file in retired:
+                    os.fsync(file.fileno())
+                    file.close()
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self._lock:
+                self.syncs += 1
+                self.synced_records += target - self._synced_lsn
+                self._synced_lsn = max(self._synced_lsn, target)
+
+    def compact(self):
+        """Удаляет старые сегменты, перенося незавершённые ивенты из них в текущий сегмент."""
+        with self._lock:
+            old, moved = self._carry_forward()
+        if not old:
+            return
+        self.flush()
+        for name in old:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.warning(f"Не удалось удалить сегмент журнала {name}: {e}")
+        logger.debug(f"Журнал ивентов уплотнён: удалено сегментов {len(old)}, перенесено ивентов {moved}")
+
+    def close(self):
+        """Записывает журнал на диск и закрывает текущий сегмент."""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает состояние журнала.
+
+        :return: Словарь: pending - незавершённых ивентов, failed - из них с ошибками, segments - сегментов,
+            seq - последний номер ивента, syncs - вызовов fsync, avg_batch - записей на один fsync.
+        :rtype: `dict`
+        """
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "failed": len(self._failed),
+                "segments": len(self._segment_files()),
+                "seq": self._seq,
+                "syncs": self.syncs,
+                "avg_batch": self.synced_records / self.syncs if self.syncs else 0.0,
+            }
+
+    async def _flush_waiters(self):
+        try:
+            while self._waiters:
+                await asyncio.sleep(FSYNC_DELAY)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    # Не останавливаем обработку ивентов из-за ошибки диска
+                    logger.error(f"Ошибка записи журнала ивентов на диск: {e}")
+                    self._synced_lsn = self._lsn
+                ready = [future for lsn, future in self._waiters if lsn <= self._synced_lsn]
+                self._waiters = [(lsn, future) for lsn, future in self._waiters if lsn > self._synced_lsn]
+                for future in ready:
+                    if not future.done():
+                        future.set_result(None)
+        finally:
+            self._flushing = False
+
+    def _write(self, record: dict):
+        line = json_codec.dumps(record) + b"\n"
+        self._file.write(line)
+        self._file.flush()
+        self._size += len(line)
+        self._lsn += 1
+
+    def _write_entry(self, entry: _Entry):
+        record = {"op": "event", "seq": entry.seq, "ts": entry.ts, "event": entry.event, "args": entry.payload}
+        if entry.replays:
+            record["replays"] = entry.replays
+        self._write(record)
+        for handler in sorted(entry.acked):
+            self._write({"op": "ack", "seq": entry.seq, "handler": handler})
+        entry.segment = self._segment
+
+    def _park(self, seq: int):
+        # Ивент откладывается в отдельный файл и больше не переносится между сегментами
+        entry = self._pending.get(seq)
+        if entry is None:
+            self._failed.pop(seq, None)
+            return
+        record = {"seq": seq, "ts": entry.ts, "event": entry.event, "args": entry.payload,
+                  "acked": sorted(entry.acked), "attempts": entry.replays}
+        try:
+            with open(os.path.join(self.directory, PARKED_FILE), "ab") as f:
+                f.write(json_codec.dumps(record) + b"\n")
+        except OSError as e:
+            logger.error(f"Не удалось отложить ивент {entry.event} #{seq}: {e}")
+        logger.warning(f"Ивент {entry.event} #{seq} с ошибками отложен в {PARKED_FILE}")
+        self.done(seq)
+
+    def _rotate(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Ошибка смены сегмента журнала ивентов: {e}")
+        finally:
+            with self._lock:
+                self._rotating = False
+
+    def _segment_files(self) -> list[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".log"))
+
+    def _open_segment(self, seq: int):
+        if self._file is not None:
+            # Запись на диск - в flush(), вместе с текущим сегментом
+            self._file.flush()
+            self._retired.append(self._file)
+        self._segment = _segment_name(seq)
+        self._carried = 0
+        path = os.path.join(self.directory, self._segment)
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        if self._size:
+            # Сегмент мог остаться от прошлого запуска с оборванной последней строкой
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write(b"\n")
+                    self._size += 1
+
+    def _carry_forward(self) -> tuple[list[str], int]:
+        old = [name for name in self._segment_files() if name != self._segment]
+        if not old:
+            return [], 0
+        moved = 0
+        size = self._size
+        for entry in self._pending.values():
+            if entry.segment != self._segment:
+                self._write_entry(entry)
+                moved += 1
+        # Перенесённые записи не считаются в размер сегмента, иначе при большом числе
+        # незавершённых ивентов сегмент сменялся бы на каждом новом ивенте
+        self._carried += self._size - size
+        return old, moved
+
+    def _load(self):
+        for name in self._segment_files():
+            with open(os.path.join(self.directory, name), "rb") as f:
+                for line in f:
+                    try:
+                        record = json_codec.loads(line)
+                    except Exception:
+                        continue  # Оборванная строка после сбоя
+                    op, seq = record.get("op"), record.get("seq")
+                    if op == "event":
+                        self._seq = max(self._seq, seq)
+                        self._pending[seq] = _Entry(seq, record["event"], record["args"], record["ts"],
+                                                    name, record.get("replays", 0))
+                    elif op == "ack" and seq in self._pending:
+                        self._pending[seq].acked.add(record["handler"])
+                    elif op == "done":
+                        self._pending.pop(seq, None)
+                    elif op in ("replay", "fail") and seq in self._pending:
+                        self._pending[seq].replays += 1
+        self._open_segment(self._seq + 1)
+        for seq, entry in list(self._pending.items()):
+            if entry.replays >= MAX_REPLAYS:
+                logger.warning(f"Ивент {entry.event} #{seq} не обработан за {MAX_REPLAYS} попытки, пропускаем")
+                self.done(seq)
+        self.compact()
+        self._recovered = sorted(self._pending)
+        if self._recovered:
+            logger.info(f"В журнале ивентов {len(self._recovered)} необработанных ивентов с прошлого запуска")
+
+
+_journal: EventJournal | None = None
+_journal_lock = threading.Lock()
+
+
+def get_event_journal() -> EventJournal:
+    """
+    Возвращает общий журнал ивентов.
+
+    :return: Журнал ивентов.
+    :rtype: `event_journal.EventJournal`
+    """
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = EventJournal()
+    return _journal
+
+
+def flush():
+    """Записывает журнал ивентов на диск, если он открыт (перед выключением или перезапуском)."""
+    if _journal is not None:
+        _journal.flush()
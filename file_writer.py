@@ -0,0 +1,240 @@
+"""
+Запись файлов настроек и данных для Seal Playerok Bot.
+Атомарная запись через временный файл и отложенный (write-behind) режим,
+в котором частые записи одного файла склеиваются и выполняются в фоновом потоке.
+"""
+import os
+import stat
+import atexit
+import hashlib
+import threading
+import time
+from logging import getLogger
+
+
+logger = getLogger("seal.file_writer")
+
+DEBOUNCE_SECONDS = 1.0  # Окно склейки записей одного файла
+
+_enabled = False
+_debounce = DEBOUNCE_SECONDS
+_pending: dict[str, tuple] = {}  # {path: (value, write, deadline, seq)}
+_written_seq: dict[str, int] = {}
+_failed: dict[str, Exception] = {}  # {path: ошибка последней записи}
+_seq = 0
+_cond = threading.Condition()
+_write_lock = threading.Lock()
+_thread: threading.Thread | None = None
+_stats = {"submitted": 0, "coalesced": 0, "written": 0, "errors": 0}
+
+
+def copy_json(obj):
+    """
+    Делает глубокую копию JSON-совместимых данных.
+    Работает в разы быстрее `copy.deepcopy`, т.к. знает только о dict и list.
+    """
+    if isinstance(obj, dict):
+        return {key: copy_json(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [copy_json(value) for value in obj]
+    return obj
+
+
+def write_file(path: str, content: bytes) -> str:
+    """
+    Атомарно записывает файл: во временный файл рядом, fsync и переименование.
+    Перед переименованием сверяет размер временного файла с данными.
+
+    :param path: Путь к файлу.
+    :type path: `str`
+
+    :param content: Содержимое файла.
+    :type content: `bytes`
+
+    :return: SHA-256 записанного содержимого.
+    :rtype: `str`
+    """
+    folder_path = os.path.dirname(path)
+    if folder_path and not os.path.exists(folder_path):
+        os.makedirs(folder_path, exist_ok=True)
+    digest = hashlib.sha256(content).hexdigest()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+            if os.fstat(f.fileno()).st_size != len(content):
+                raise IOError(f"Размер {path} не совпал после записи")
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return digest
+
+
+def configure(enabled: bool, debounce: float = DEBOUNCE_SECONDS):
+    """
+    Включает или выключает отложенную запись.
+
+    :param enabled: Включить ли отложенную запись.
+    :type enabled: `bool`
+
+    :param debounce: Окно склейки записей в секундах.
+    :type debounce: `float`
+    """
+    global _enabled, _debounce
+    if not enabled:
+        flush()
+    with _cond:
+        _enabled = bool(enabled)
+        _debounce = max(0.0, float(debounce))
+        _cond.notify_all()
+
+
+def is_enabled() -> bool:
+    """Включена ли отложенная запись."""
+    return _enabled
+
+
+def submit(path: str, value, write: callable):
+    """
+    Ставит файл в очередь на запись.
+    Если файл уже ждёт записи - значение заменяется, а срок записи остаётся прежним,
+    поэтому даже при непрерывных изменениях файл пишется не реже раза в окно склейки.
+    Если отложенная запись выключена, файл записывается сразу.
+
+    :param path: Путь к файлу.
+    :type path: `str`
+
+    :param value: Данные, которые нужно записать (не должны изменяться после передачи).
+    :type value: `dict` or `list`
+
+    :param write: Функция записи `write(path, value)`.
+    :type write: `callable`
+    """
+    global _seq
+    if not _enabled:
+        flush(path)
+        with _write_lock:
+            write(path, value)
+            _written_seq[path] = _seq
+            _failed.pop(path, None)
+        return
+    _ensure_thread()
+    with _cond:
+        _seq += 1
+        _stats["submitted"] += 1
+        if path in _pending:
+            _stats["coalesced"] += 1
+            deadline = _pending[path][2]
+        else:
+            deadline = time.monotonic() + _debounce
+        _pending[path] = (value, write, deadline, _seq)
+        _cond.notify_all()
+
+
+def get_pending(path: str):
+    """
+    Возвращает данные, ожидающие записи в файл.
+
+    :param path: Путь к файлу.
+    :type path: `str`
+
+    :return: Данные или `None`, если файл не ждёт записи.
+    """
+    with _cond:
+        item = _pending.get(path)
+        return item[0] if item else None
+
+
+def flush(path: str | None = None, strict: bool = False):
+    """
+    Немедленно записывает файлы, ожидающие записи.
+    Вызывается при завершении работы и перезапуске бота.
+
+    :param path: Путь к файлу. Если не указан - записываются все файлы.
+    :type path: `str` or `None`
+
+    :param strict: Дождаться уже начатой фоновой записи и пробросить ошибку,
+        если последняя запись файла (или любого файла) не удалась.
+    :type strict: `bool`
+    """
+    with _cond:
+        if path is None:
+            items = list(_pending.items())
+            _pending.clear()
+        elif path in _pending:
+            items = [(path, _pending.pop(path))]
+        else:
+            items = []
+    for item_path, item in items:
+        _write(item_path, *item, strict=strict)
+    if strict:
+        with _write_lock:
+            error = _failed.get(path) if path is not None else next(iter(_failed.values()), None)
+        if error is not None:
+            raise error
+
+
+def get_stats() -> dict:
+    """
+    Возвращает статистику отложенной записи.
+
+    :return: Словарь со счётчиками и количеством файлов в очереди.
+    :rtype: `dict`
+    """
+    with _cond:
+        return {**_stats, "pending": len(_pending)}
+
+
+def _write(path: str, value, write: callable, deadline: float, seq: int, strict: bool = False):
+    error = None
+    with _write_lock:
+        # Эти или более свежие данные уже записаны через flush() - повторно не пишем
+        if _written_seq.get(path, -1) >= seq:
+            return
+        try:
+            write(path, value)
+            _written_seq[path] = seq
+            _failed.pop(path, None)
+        except Exception as e:
+            _failed[path] = error = e
+    # Счётчики меняются под тем же условием, под которым их читает get_stats()
+    with _cond:
+        _stats["errors" if error is not None else "written"] += 1
+    if error is not None:
+        logger.error(f"Ошибка отложенной записи {path}: {error}")
+        if strict:
+            raise error
+
+
+def _ensure_thread():
+    global _thread
+    with _cond:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(target=_run, name="seal-file-writer", daemon=True)
+        _thread.start()
+
+
+def _run():
+    while True:
+        with _cond:
+            while not _pending:
+                _cond.wait()
+            now = time.monotonic()
+            due = [path for path, item in _pending.items() if item[2] <= now]
+            if not due:
+                _cond.wait(min(item[2] for item in _pending.values()) - now)
+                continue
+            items = [(path, _pending.pop(path)) for path in due]
+        for path, item in items:
+            _write(path, *item)
+
+
+atexit.register(flush)
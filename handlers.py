@@ -1,39 +1,682 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from colorama import Fore
 from logging import getLogger
 
 from playerokapi.listener.events import EventTypes
 
+from keyword_matcher import PhraseSet
+
 
 logger = getLogger("seal.handlers")
 
-_bot_event_handlers: dict[str, list[callable]] = {
-    "INIT": [],          # Вызывается перед инициализацией Playerok аккаунта
-    "POST_INIT": []      # Вызывается после инициализации Playerok аккаунта
-}
-_playerok_event_handlers: dict[EventTypes, list[callable]] = {
-    EventTypes.CHAT_INITIALIZED: [],
-    EventTypes.NEW_MESSAGE: [],
-    EventTypes.NEW_DEAL: [],
-    EventTypes.NEW_REVIEW: [],
-    EventTypes.DEAL_CONFIRMED: [],
-    EventTypes.DEAL_CONFIRMED_AUTOMATICALLY: [],
-    EventTypes.DEAL_ROLLED_BACK: [],
-    EventTypes.DEAL_HAS_PROBLEM: [],
-    EventTypes.DEAL_PROBLEM_RESOLVED: [],
-    EventTypes.DEAL_STATUS_CHANGED: [],
-    EventTypes.ITEM_PAID: [],
-    EventTypes.ITEM_SENT: []
+# Режим вызова хендлеров ивентов Playerok (см. configure_playerok_dispatch)
+_dispatch = {
+    "concurrent": False,     # Запускать хендлеры одного ивента параллельно
+    "max_concurrency": 8,    # Сколько хендлеров одного ивента может выполняться одновременно
+    "handler_timeout": 0     # Таймаут хендлера в секундах (0 - без таймаута)
 }
+DEFAULT_POOL = "default"  # Пул потоков для блокирующих хендлеров по умолчанию
+
+
+class HandlerPool:
+    """
+    Ограниченный пул потоков для блокирующих хендлеров.
+
+    :param name: Название пула.
+    :type name: `str`
+
+    :param max_workers: Количество потоков.
+    :type max_workers: `int`
+    """
+
+    def __init__(self, name: str, max_workers: int = 4):
+        self.name = name
+        self.max_workers = max(int(max_workers), 1)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=f"seal-{name}")
+        self._lock = threading.Lock()
+        self.active = 0         # Выполняется сейчас
+        self.queued = 0         # Ждут свободного потока
+        self.completed = 0      # Выполнено
+        self.failed = 0         # Завершились ошибкой
+        self.saturated = 0      # Сколько раз хендлер встал в очередь, потому что все потоки заняты
+        self.total_wait = 0.0   # Суммарное ожидание потока, сек
+        self.max_wait = 0.0     # Максимальное ожидание потока, сек
+        self.total_run = 0.0    # Суммарное время выполнения, сек
+
+    async def run(self, func: callable, args: list, own_loop: bool = False):
+        """
+        Выполняет функцию в пуле и ждёт результат, не блокируя event loop.
+        Если функция вернула корутину, она выполняется в вызывающем event loop,
+        а с `own_loop` - в собственном event loop потока пула.
+
+        :param func: Функция.
+        :type func: `callable`
+
+        :param args: Аргументы.
+        :type args: `list`
+
+        :param own_loop: Выполнять возвращённую корутину в потоке пула.
+        :type own_loop: `bool`
+
+        :return: Результат функции.
+        """
+        submitted = time.perf_counter()
+        with self._lock:
+            if self.active + self.queued >= self.max_workers:
+                self.saturated += 1
+            self.queued += 1
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait += started - submitted
+                self.max_wait = max(self.max_wait, started - submitted)
+            ok = False
+            try:
+                result = func(*args)
+                if own_loop and inspect.isawaitable(result):
+                    # Асинхронный хендлер, помеченный blocking, - в собственном event loop потока
+                    result = asyncio.run(_await(result))
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.failed += not ok
+                    self.total_run += time.perf_counter() - started
+
+        result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        if inspect.isawaitable(result):
+            # Обычная функция вернула корутину (например, partial от async-функции):
+            # её объекты привязаны к event loop бота, поэтому ждём её здесь
+            result = await result
+        return result
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает загрузку пула.
+
+        :return: Словарь с количеством потоков, выполняющихся и ждущих хендлеров,
+            загрузкой (доля занятых потоков), временем ожидания и выполнения.
+        :rtype: `dict`
+        """
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "utilization": self.active / self.max_workers,
+                "completed": self.completed,
+                "failed": self.failed,
+                "saturated": self.saturated,
+                "avg_wait": self.total_wait / done,
+                "max_wait": self.max_wait,
+                "avg_run": self.total_run / done,
+            }
+
+    def shutdown(self):
+        """Останавливает пул, не дожидаясь выполняющихся хендлеров."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _await(awaitable):
+    return await awaitable
+
+
+_pools: dict[str, HandlerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_handler_pool(name: str = DEFAULT_POOL) -> HandlerPool:
+    """
+    Возвращает пул потоков для блокирующих хендлеров (создаёт с 4 потоками, если его нет).
+
+    :param name: Название пула.
+    :type name: `str`
+
+    :rtype: `core.handlers.HandlerPool`
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = HandlerPool(name)
+    return pool
+
+
+def configure_handler_pool(name: str = DEFAULT_POOL, max_workers: int = 4):
+    """
+    Задаёт количество потоков пула. Хендлеры, уже выполняющиеся в старом пуле, доработают в нём.
+
+    :param name: Название пула.
+    :type name: `str`
+
+    :param max_workers: Количество потоков.
+    :type max_workers: `int`
+    """
+    with _pools_lock:
+        old = _pools.get(name)
+        if old is not None and old.max_workers == max(int(max_workers), 1):
+            return
+        _pools[name] = HandlerPool(name, max_workers)
+    if old is not None:
+        old._executor.shutdown(wait=False)
+
+
+def get_handler_pools_stats() -> dict[str, dict]:
+    """
+    Возвращает загрузку всех пулов потоков.
+
+    :return: Словарь {пул: статистика}, см. `HandlerPool.get_stats`.
+    :rtype: `dict[str, dict]`
+    """
+    return {name: pool.get_stats() for name, pool in list(_pools.items())}
+
+
+def blocking(handler: callable = None, *, pool: str = DEFAULT_POOL) -> callable:
+    """
+    Помечает хендлер как блокирующий (запросы через `requests`, запись файлов, обработка
+    изображений): он будет выполняться в пуле потоков, не останавливая event loop.
+    Обычные (не async) функции выполняются в пуле автоматически и без пометки.
+    Асинхронный хендлер с пометкой выполняется в собственном event loop потока пула.
+
+        @blocking
+        def save_report(event): ...
+
+        @blocking(pool="images")
+        def render_banner(event): ...
+
+    :param handler: Хендлер.
+    :type handler: `callable`
+
+    :param pool: Название пула.
+    :type pool: `str`
+
+    :return: Тот же хендлер (или обёртка, если атрибут установить нельзя).
+    :rtype: `callable`
+    """
+    if handler is None:
+        return lambda func: blocking(func, pool=pool)
+    try:
+        handler.__seal_blocking__ = pool
+    except AttributeError:
+        # Например, связанный метод
+        original = handler
+
+        @functools.wraps(original)
+        def handler(*args):
+            return original(*args)
+        handler.__seal_blocking__ = pool
+    return handler
+
+
+def _handler_name(handler: callable) -> str:
+    name = getattr(handler, "__qualname__", None) or type(handler).__qualname__
+    return f"{getattr(handler, '__module__', None) or type(handler).__module__}.{name}"
+
+
+def _handler_key(handler_id: int | None, name: str) -> str:
+    # Имя различает лямбды и обёртки только вместе с ID регистрации, а имя в ключе
+    # не даёт пропустить другой хендлер, если ID сдвинулись после перезапуска
+    return f"{handler_id}:{name}"
+
+
+async def _invoke(handler: callable, args: list):
+    pool = getattr(handler, "__seal_blocking__", None)
+    if pool is None:
+        if inspect.iscoroutinefunction(handler) or inspect.iscoroutinefunction(getattr(handler, "__call__", None)):
+            return await handler(*args)
+        return await get_handler_pool(DEFAULT_POOL).run(handler, args)
+    return await get_handler_pool(pool).run(handler, args, own_loop=True)
+
+
+@dataclass
+class HandlerOutcome:
+    handler: str            # Модуль и имя хендлера
+    ok: bool                # Хендлер завершился без ошибки
+    latency: float          # Время выполнения в секундах
+    error: str | None = None
+    timed_out: bool = False
+    shed: bool = False      # Хендлер пропущен из-за перегрузки (см. sheddable)
+    handler_id: int | None = None  # ID регистрации хендлера
+
+    @property
+    def key(self) -> str:
+        """Ключ хендлера в журнале ивентов: ID регистрации и имя."""
+        return _handler_key(self.handler_id, self.handler)
+
+
+@dataclass(frozen=True)
+class HandlerFilter:
+    """
+    Условия, при которых вызывается хендлер ивента Playerok.
+    Каждое условие - значение или список значений (подходит любое); `None` - без условия.
+    Хендлер вызывается, только если выполнены все заданные условия.
+    """
+    chat_id: object = None      # ID чата
+    item_id: object = None      # ID товара сделки
+    item_name: object = None    # Фраза в названии товара (без учёта регистра)
+    system: bool | None = None  # True - только системные сообщения, False - только от пользователей
+    deal_status: object = None  # Статус сделки (название или значение перечисления)
+
+    def __post_init__(self):
+        for name in ("chat_id", "item_id", "deal_status"):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, frozenset(map(_filter_key, _as_list(value))))
+        if self.item_name is not None:
+            object.__setattr__(self, "item_name", tuple(map(str, _as_list(self.item_name))))
+
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+
+def _filter_key(value) -> str:
+    return str(getattr(value, "name", value))
+
+
+def is_system_message(message) -> bool:
+    """
+    Проверяет, является ли сообщение чата системным (оплата, подтверждение сделки и т.п.).
+
+    :param message: Сообщение чата Playerok.
+
+    :rtype: `bool`
+    """
+    if getattr(message, "user", True) is None:
+        return True
+    text = getattr(message, "text", None) or ""
+    return text.startswith("{{") and text.endswith("}}")
+
+
+@dataclass(frozen=True)
+class HandlerRegistration:
+    id: int                 # ID регистрации
+    event: object           # Ивент (название ивента бота или EventTypes)
+    handler: callable       # Хендлер
+    priority: int = 0       # Приоритет (меньше - раньше)
+    owner: str | None = None  # Владелец (например, UUID плагина)
+    order: float = 0.0      # Порядок среди хендлеров с одинаковым приоритетом
+    filter: HandlerFilter | None = None  # Условия вызова
+
+
+class _FilterIndex:
+    # Индекс условий хендлеров одного ивента: вместо проверки каждого хендлера
+    # по значениям ивента находятся хендлеры, у которых совпали все условия
+    def __init__(self, filters: list[HandlerFilter | None]):
+        self.unfiltered: list[int] = []
+        self.required: dict[int, int] = {}
+        self.by_value: dict[str, dict[str, list[int]]] = {"chat_id": {}, "item_id": {}, "deal_status": {}, "system": {}}
+        names, owners = [], []
+        for position, handler_filter in enumerate(filters):
+            if handler_filter is None:
+                self.unfiltered.append(position)
+                continue
+            required = 0
+            for name in ("chat_id", "item_id", "deal_status"):
+                values = getattr(handler_filter, name)
+                if values is not None:
+                    required += 1
+                    for value in values:
+                        self.by_value[name].setdefault(value, []).append(position)
+            if handler_filter.system is not None:
+                required += 1
+                self.by_value["system"].setdefault(_filter_key(bool(handler_filter.system)), []).append(position)
+            if handler_filter.item_name is not None:
+                required += 1
+                names.extend(handler_filter.item_name)
+                owners.extend([position] * len(handler_filter.item_name))
+            if required:
+                self.required[position] = required
+            else:
+                self.unfiltered.append(position)
+        self.item_names = PhraseSet(names, owners) if names else None
+
+    def match(self, args: list) -> list[int]:
+        facts = _event_facts(args)
+        hits: dict[int, int] = {}
+        for name, index in self.by_value.items():
+            value = facts[name]
+            if index and value is not None:
+                for position in index.get(value, ()):
+                    hits[position] = hits.get(position, 0) + 1
+        if self.item_names is not None and facts["item_name"]:
+            for position in set(self.item_names.match(facts["item_name"])):
+                hits[position] = hits.get(position, 0) + 1
+        matched = [position for position, count in hits.items() if count == self.required[position]]
+        return sorted(self.unfiltered + matched) if matched else self.unfiltered
+
+
+def _event_facts(args: list) -> dict:
+    obj = args[0] if args else None
+    message = getattr(obj, "message", None)
+    deal = getattr(obj, "deal", None) or getattr(message, "deal", None)
+    item = getattr(deal, "item", None) or getattr(obj, "item", None)
+    chat_id = getattr(getattr(obj, "chat", None), "id", None) or getattr(obj, "chat_id", None)
+    item_id = getattr(item, "id", None)
+    status = getattr(deal, "status", None)
+    return {
+        "chat_id": _filter_key(chat_id) if chat_id is not None else None,
+        "item_id": _filter_key(item_id) if item_id is not None else None,
+        "item_name": getattr(item, "name", None),
+        "deal_status": _filter_key(status) if status is not None else None,
+        "system": _filter_key(is_system_message(message)) if message is not None else None,
+    }
+
+
+class _Snapshot:
+    __slots__ = ("handlers", "registrations", "index", "coalesced")
+
+    def __init__(self, registrations: tuple = (), index: _FilterIndex | None = None):
+        self.handlers = tuple(r.handler for r in registrations)
+        self.registrations = registrations
+        self.index = index
+        self.coalesced = any(getattr(handler, "__seal_coalesced__", False) for handler in self.handlers)
+
+
+_EMPTY = _Snapshot()
+
+
+class HandlerRegistry:
+    """
+    Реестр хендлеров ивентов.
+
+    Для каждого ивента хранится готовый неизменяемый кортеж хендлеров, который
+    заменяется целиком при изменении реестра, поэтому вызов ивента не берёт блокировку
+    и не видит частично изменённый список, даже если хендлеры регистрируются из потока
+    Telegram бота. Удаление по ID, владельцу или самому хендлеру не перебирает списки.
+
+    :param events: Ивенты, известные заранее.
+    :type events: `list`
+    """
+
+    def __init__(self, events: list = []):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._orders = itertools.count(1)
+        self._registrations: dict[object, dict[int, HandlerRegistration]] = {event: {} for event in events}
+        self._by_id: dict[int, HandlerRegistration] = {}
+        self._by_owner: dict[str, set[int]] = {}
+        self._by_handler: dict[tuple[object, callable], list[int]] = {}
+        self._snapshots: dict[object, _Snapshot] = {event: _EMPTY for event in events}
+
+    def handlers(self, event) -> tuple[callable, ...]:
+        """
+        Возвращает хендлеры ивента в порядке вызова.
+
+        :param event: Ивент.
+
+        :return: Неизменяемый кортеж хендлеров.
+        :rtype: `tuple[callable, ...]`
+        """
+        return self._snapshots.get(event, _EMPTY).handlers
+
+    def select(self, event, args: list) -> tuple[callable, ...]:
+        """
+        Возвращает хендлеры ивента, условия которых (`HandlerFilter`) подходят к аргументам.
+
+        :param event: Ивент.
+
+        :param args: Аргументы ивента.
+        :type args: `list`
+
+        :return: Хендлеры в порядке вызова.
+        :rtype: `tuple[callable, ...]`
+        """
+        snapshot = self._snapshots.get(event, _EMPTY)
+        if snapshot.index is None:
+            return snapshot.handlers
+        handlers = snapshot.handlers
+        return tuple(handlers[position] for position in snapshot.index.match(args))
+
+    def select_registrations(self, event, args: list) -> tuple[HandlerRegistration, ...]:
+        """
+        Как `select`, но возвращает регистрации (с ID) вместо хендлеров.
+
+        :param event: Ивент.
+
+        :param args: Аргументы ивента.
+        :type args: `list`
+
+        :return: Регистрации в порядке вызова.
+        :rtype: `tuple[core.handlers.HandlerRegistration, ...]`
+        """
+        snapshot = self._snapshots.get(event, _EMPTY)
+        if snapshot.index is None:
+            return snapshot.registrations
+        registrations = snapshot.registrations
+        return tuple(registrations[position] for position in snapshot.index.match(args))
+
+    def has_coalesced(self, events) -> bool:
+        """
+        Проверяет, есть ли у ивентов хендлеры с пометкой `coalesced`.
+
+        :param events: Ивенты.
+
+        :rtype: `bool`
+        """
+        return any(self._snapshots.get(event, _EMPTY).coalesced for event in events)
+
+    def events(self) -> list:
+        """Возвращает все ивенты реестра."""
+        return list(self._snapshots)
+
+    def registrations(self, event=None) -> list[HandlerRegistration]:
+        """
+        Возвращает регистрации в порядке вызова.
+
+        :param event: Ивент (`None` - все ивенты).
+
+        :rtype: `list[core.handlers.HandlerRegistration]`
+        """
+        with self._lock:
+            events = self._registrations if event is None else [event]
+            return [r for e in events for r in _sorted(self._registrations.get(e, {}).values())]
+
+    def get(self, handler_id: int) -> HandlerRegistration | None:
+        """Возвращает регистрацию по ID."""
+        return self._by_id.get(handler_id)
+
+    def add(self, event, handler: callable, priority: int | None = None,
+            owner: str | None = None, index: int | None = None,
+            handler_filter: HandlerFilter | None = None) -> int:
+        """
+        Регистрирует хендлер.
+
+        :param event: Ивент.
+
+        :param handler: Хендлер.
+        :type handler: `callable`
+
+        :param priority: Приоритет (меньше - раньше), по умолчанию 0
+            или приоритет хендлера, на место которого встаёт новый (при `index`).
+        :type priority: `int` or `None`
+
+        :param owner: Владелец, _опционально_.
+        :type owner: `str` or `None`
+
+        :param index: Позиция среди текущих хендлеров ивента, _опционально_.
+        :type index: `int` or `None`
+
+        :param handler_filter: Условия вызова, по умолчанию - заданные декоратором `filtered`.
+        :type handler_filter: `core.handlers.HandlerFilter` or `None`
+
+        :return: ID регистрации.
+        :rtype: `int`
+        """
+        if handler_filter is None:
+            handler_filter = getattr(handler, "__seal_filter__", None)
+        with self._lock:
+            current = self._registrations.setdefault(event, {})
+            order = float(next(self._orders))
+            if index is not None:
+                ordered = _sorted(current.values())
+                if index < 0:
+                    index = max(len(ordered) + index, 0)
+                if index < len(ordered):
+                    target = ordered[index]
+                    if priority is None:
+                        priority = target.priority
+                    if priority == target.priority:
+                        before = ordered[index - 1] if index else None
+                        low = before.order if before is not None and before.priority == priority else target.order - 1
+                        order = (low + target.order) / 2
+            registration = HandlerRegistration(next(self._ids), event, handler, priority or 0, owner, order, handler_filter)
+            current[registration.id] = registration
+            self._by_id[registration.id] = registration
+            if owner is not None:
+                self._by_owner.setdefault(owner, set()).add(registration.id)
+            self._by_handler.setdefault((event, handler), []).append(registration.id)
+            self._rebuild(event)
+            return registration.id
+
+    def remove(self, handler_id: int) -> bool:
+        """
+        Удаляет регистрацию по ID.
+
+        :param handler_id: ID регистрации.
+        :type handler_id: `int`
+
+        :return: True, если регистрация была.
+        :rtype: `bool`
+        """
+        with self._lock:
+            if not self._discard(handler_id):
+                return False
+            self._rebuild(self._by_id.pop(handler_id).event)
+            return True
+
+    def remove_owner(self, owner: str) -> int:
+        """
+        Удаляет все хендлеры владельца.
+
+        :param owner: Владелец.
+        :type owner: `str`
+
+        :return: Количество удалённых хендлеров.
+        :rtype: `int`
+        """
+        with self._lock:
+            events = set()
+            ids = self._by_owner.pop(owner, set())
+            for handler_id in ids:
+                self._discard(handler_id)
+                events.add(self._by_id.pop(handler_id).event)
+            for event in events:
+                self._rebuild(event)
+            return len(ids)
+
+    def remove_handler(self, event, handler: callable) -> bool:
+        """
+        Удаляет самую раннюю регистрацию хендлера для ивента.
+
+        :param event: Ивент.
+
+        :param handler: Хендлер.
+        :type handler: `callable`
+
+        :return: True, если хендлер был.
+        :rtype: `bool`
+        """
+        with self._lock:
+            ids = self._by_handler.get((event, handler))
+            return self.remove(ids[0]) if ids else False
+
+    def clear(self):
+        """Удаляет все хендлеры (ивенты остаются)."""
+        with self._lock:
+            for event in self._registrations:
+                self._registrations[event] = {}
+                self._snapshots[event] = _EMPTY
+            self._by_id.clear()
+            self._by_owner.clear()
+            self._by_handler.clear()
+
+    def _discard(self, handler_id: int) -> bool:
+        registration = self._by_id.get(handler_id)
+        if registration is None:
+            return False
+        del self._registrations[registration.event][handler_id]
+        if registration.owner is not None and registration.owner in self._by_owner:
+            self._by_owner[registration.owner].discard(handler_id)
+            if not self._by_owner[registration.owner]:
+                del self._by_owner[registration.owner]
+        key = (registration.event, registration.handler)
+        self._by_handler[key].remove(handler_id)
+        if not self._by_handler[key]:
+            del self._by_handler[key]
+        return True
+
+    def _rebuild(self, event):
+        registrations = _sorted(self._registrations[event].values())
+        filters = [r.filter for r in registrations]
+        index = _FilterIndex(filters) if any(f is not None for f in filters) else None
+        self._snapshots[event] = _Snapshot(tuple(registrations), index)
+
+
+def _sorted(registrations) -> list[HandlerRegistration]:
+    return sorted(registrations, key=lambda r: (r.priority, r.order))
+
+
+_bot_registry = HandlerRegistry([
+    "INIT",          # Вызывается перед инициализацией Playerok аккаунта
+    "POST_INIT"      # Вызывается после инициализации Playerok аккаунта
+])
+_playerok_registry = HandlerRegistry([
+    EventTypes.CHAT_INITIALIZED,
+    EventTypes.NEW_MESSAGE,
+    EventTypes.NEW_DEAL,
+    EventTypes.NEW_REVIEW,
+    EventTypes.DEAL_CONFIRMED,
+    EventTypes.DEAL_CONFIRMED_AUTOMATICALLY,
+    EventTypes.DEAL_ROLLED_BACK,
+    EventTypes.DEAL_HAS_PROBLEM,
+    EventTypes.DEAL_PROBLEM_RESOLVED,
+    EventTypes.DEAL_STATUS_CHANGED,
+    EventTypes.ITEM_PAID,
+    EventTypes.ITEM_SENT
+])
+
+
+def get_bot_handler_registry() -> HandlerRegistry:
+    """
+    Возвращает реестр хендлеров ивентов бота.
+
+    :rtype: `core.handlers.HandlerRegistry`
+    """
+    return _bot_registry
+
+
+def get_playerok_handler_registry() -> HandlerRegistry:
+    """
+    Возвращает реестр хендлеров ивентов Playerok.
+
+    :rtype: `core.handlers.HandlerRegistry`
+    """
+    return _playerok_registry
 
 
 def get_bot_event_handlers() -> dict[str, list[callable]]:
     """
-    Возвращает хендлеры ивентов бота.
+    Возвращает хендлеры ивентов бота (копию; для изменения используйте функции модуля).
 
     :return: Словарь с событиями и списками хендлеров.
     :rtype: `dict[str, list[callable]]`
     """
-    return _bot_event_handlers
+    return {event: list(_bot_registry.handlers(event)) for event in _bot_registry.events()}
 
 
 def set_bot_event_handlers(data: dict[str, list[callable]]):
@@ -43,11 +686,12 @@ def set_bot_event_handlers(data: dict[str, list[callable]]):
     :param data: Словарь с названиями событий и списками хендлеров.
     :type data: `dict[str, list[callable]]`
     """
-    global _bot_event_handlers
-    _bot_event_handlers = data
+    _bot_registry.clear()
+    register_bot_event_handlers(data)
 
 
-def add_bot_event_handler(event: str, handler: callable, index: int | None = None):
+def add_bot_event_handler(event: str, handler: callable, index: int | None = None,
+                          priority: int | None = None, owner: str | None = None) -> int:
     """
     Добавляет новый хендлер в ивенты бота.
 
@@ -59,24 +703,34 @@ def add_bot_event_handler(event: str, handler: callable, index: int | None = Non
 
     :param index: Индекс в массиве хендлеров, _опционально_.
     :type index: `int` or `None`
+
+    :param priority: Приоритет (меньше - раньше), _опционально_.
+    :type priority: `int` or `None`
+
+    :param owner: Владелец (например, UUID плагина), _опционально_.
+    :type owner: `str` or `None`
+
+    :return: ID регистрации.
+    :rtype: `int`
     """
-    global _bot_event_handlers
-    if not index: _bot_event_handlers[event].append(handler)
-    else: _bot_event_handlers[event].insert(index, handler)
+    return _bot_registry.add(event, handler, priority, owner, index)
 
 
-def register_bot_event_handlers(handlers: dict[str, list[callable]]):
+def register_bot_event_handlers(handlers: dict[str, list[callable]], owner: str | None = None) -> list[int]:
     """
-    Регистрирует хендлеры ивентов бота (добавляет переданные хендлеры, если их нету). 
+    Регистрирует хендлеры ивентов бота.
 
     :param data: Словарь с названиями событий и списками хендлеров.
     :type data: `dict[str, list[callable]]`
+
+    :param owner: Владелец (например, UUID плагина), _опционально_.
+    :type owner: `str` or `None`
+
+    :return: ID регистраций.
+    :rtype: `list[int]`
     """
-    global _bot_event_handlers
-    for event_type, funcs in handlers.items():
-        if event_type not in _bot_event_handlers:
-            _bot_event_handlers[event_type] = []
-        _bot_event_handlers[event_type].extend(funcs)
+    return [_bot_registry.add(event_type, func, owner=owner)
+            for event_type, funcs in handlers.items() for func in funcs]
 
 
 def remove_bot_event_handlers(handlers: dict[str, list[callable]]):
@@ -87,20 +741,18 @@ def remove_bot_event_handlers(handlers: dict[str, list[callable]]):
     :type handlers: `dict[str, list[callable]]`
     """
     for event, funcs in handlers.items():
-        if event in _bot_event_handlers:
-            for func in funcs:
-                if func in _bot_event_handlers[event]:
-                    _bot_event_handlers[event].remove(func)
+        for func in funcs:
+            _bot_registry.remove_handler(event, func)
 
 
 def get_playerok_event_handlers() -> dict[EventTypes, list]:
     """
-    Возвращает хендлеры ивентов Playerok.
+    Возвращает хендлеры ивентов Playerok (копию; для изменения используйте функции модуля).
 
     :return: Словарь с событиями и списками хендлеров.
     :rtype: `dict[playerokapi.listener.events.EventTypes, list[callable]]`
     """
-    return _playerok_event_handlers
+    return {event: list(_playerok_registry.handlers(event)) for event in _playerok_registry.events()}
 
 
 def set_playerok_event_handlers(data: dict[EventTypes, list[callable]]):
@@ -110,11 +762,13 @@ def set_playerok_event_handlers(data: dict[EventTypes, list[callable]]):
     :param data: Словарь с событиями и списками хендлеров.
     :type data: `dict[playerokapi.listener.events.EventTypes, list[callable]]`
     """
-    global _playerok_event_handlers
-    _playerok_event_handlers = data
+    _playerok_registry.clear()
+    register_playerok_event_handlers(data)
 
 
-def add_playerok_event_handler(event: EventTypes, handler: callable, index: int | None = None):
+def add_playerok_event_handler(event: EventTypes, handler: callable, index: int | None = None,
+                               priority: int | None = None, owner: str | None = None,
+                               handler_filter: HandlerFilter | None = None) -> int:
     """
     Добавляет новый хендлер в ивенты Playerok.
 
@@ -126,24 +780,37 @@ def add_playerok_event_handler(event: EventTypes, handler: callable, index: int
 
     :param index: Индекс в массиве хендлеров, _опционально_.
     :type index: `int` or `None`
+
+    :param priority: Приоритет (меньше - раньше), _опционально_.
+    :type priority: `int` or `None`
+
+    :param owner: Владелец (например, UUID плагина), _опционально_.
+    :type owner: `str` or `None`
+
+    :param handler_filter: Условия вызова, _опционально_ (см. `filtered`).
+    :type handler_filter: `core.handlers.HandlerFilter` or `None`
+
+    :return: ID регистрации.
+    :rtype: `int`
     """
-    global _playerok_event_handlers
-    if not index: _playerok_event_handlers[event].append(handler)
-    else: _playerok_event_handlers[event].insert(index, handler)
+    return _playerok_registry.add(event, handler, priority, owner, index, handler_filter)
 
 
-def register_playerok_event_handlers(handlers: dict[EventTypes, list[callable]]):
+def register_playerok_event_handlers(handlers: dict[EventTypes, list[callable]], owner: str | None = None) -> list[int]:
     """
-    Регистрирует хендлеры ивентов Playerok (добавляет переданные хендлеры, если их нету). 
+    Регистрирует хендлеры ивентов Playerok.
 
     :param data: Словарь с событиями и списками хендлеров.
     :type data: `dict[playerokapi.listener.events.EventTypes, list[callable]]`
+
+    :param owner: Владелец (например, UUID плагина), _опционально_.
+    :type owner: `str` or `None`
+
+    :return: ID регистраций.
+    :rtype: `list[int]`
     """
-    global _playerok_event_handlers
-    for event_type, funcs in handlers.items():
-        if event_type not in _playerok_event_handlers:
-            _playerok_event_handlers[event_type] = []
-        _playerok_event_handlers[event_type].extend(funcs)
+    return [_playerok_registry.add(event_type, func, owner=owner)
+            for event_type, funcs in handlers.items() for func in funcs]
 
 
 def remove_playerok_event_handlers(handlers: dict[EventTypes, list[callable]]):
@@ -153,12 +820,9 @@ def remove_playerok_event_handlers(handlers: dict[EventTypes, list[callable]]):
     :param handlers: Словарь с событиями и списками хендлеров Playerok.
     :type handlers: `dict[playerokapi.listener.events.EventTypes, list[callable]]`
     """
-    global _playerok_event_handlers
     for event, funcs in handlers.items():
-        if event in _playerok_event_handlers:
-            for func in funcs:
-                if func in _playerok_event_handlers[event]:
-                    _playerok_event_handlers[event].remove(func)
+        for func in funcs:
+            _playerok_registry.remove_handler(event, func)
 
 
 async def call_bot_event(event: str, args: list = [], func = None):
@@ -175,7 +839,7 @@ async def call_bot_event(event: str, args: list = [], func = None):
     :type func: `callable` or `None`
     """
     if not func: 
-        handlers = get_bot_event_handlers().get(event, [])
+        handlers = _bot_registry.handlers(event)
     else:
         handlers = [func]
     # try:
@@ -186,10 +850,10 @@ async def call_bot_event(event: str, args: list = [], func = None):
     executed = 0
     for handler in handlers:
         try:
-            await handler(*args)
+            await _invoke(handler, args)
             executed += 1
         except Exception as e:
-            logger.error(f"{Fore.LIGHTRED_EX}Ошибка при обработке хендлера «{handler.__module__}.{handler.__qualname__}» для ивента бота «{event}»: {Fore.WHITE}{e}")
+            logger.error(f"{Fore.LIGHTRED_EX}Ошибка при обработке хендлера «{_handler_name(handler)}» для ивента бота «{event}»: {Fore.WHITE}{e}")
     # try:
     #     if not func and event in ("INIT", "POST_INIT"):
     #         logger.info(f"BOT_EVENT {event}: executed={executed}/{len(handlers)}")
@@ -197,19 +861,211 @@ async def call_bot_event(event: str, args: list = [], func = None):
     #     pass
 
 
-async def call_playerok_event(event: EventTypes, args: list = []):
+def filtered(chat_id=None, item_id=None, item_name=None, system: bool | None = None, deal_status=None) -> callable:
+    """
+    Задаёт условия вызова хендлера ивента Playerok (см. `HandlerFilter`).
+    Хендлеры с условиями не вызываются для неподходящих ивентов, причём подходящие
+    находятся по индексу, а не проверкой каждого хендлера. Работает и для
+    `PLAYEROK_EVENT_HANDLERS` плагинов.
+
+        @filtered(system=False, item_name=["steam", "ключ"])
+        async def on_message(event): ...
+
+    :return: Декоратор.
+    :rtype: `callable`
+    """
+    handler_filter = HandlerFilter(chat_id, item_id, item_name, system, deal_status)
+
+    def decorator(handler: callable) -> callable:
+        handler.__seal_filter__ = handler_filter
+        return handler
+    return decorator
+
+
+def ordered(handler: callable) -> callable:
+    """
+    Помечает хендлер ивента Playerok как зависящий от предыдущих.
+    В параллельном режиме такой хендлер запускается только после завершения всех
+    хендлеров перед ним, а хендлеры после него - только после его завершения.
+
+        @ordered
+        async def on_new_deal(event): ...
+
+    :param handler: Хендлер.
+    :type handler: `callable`
+
+    :return: Тот же хендлер.
+    :rtype: `callable`
+    """
+    handler.__seal_ordered__ = True
+    return handler
+
+
+def sheddable(handler: callable) -> callable:
+    """
+    Помечает хендлер ивента Playerok как необязательный (приветствия, авто-поднятие,
+    логи в Telegram). При перегрузке очереди ивентов такой хендлер пропускается.
+
+        @sheddable
+        async def send_greeting(event): ...
+
+    :param handler: Хендлер.
+    :type handler: `callable`
+
+    :return: Тот же хендлер.
+    :rtype: `callable`
+    """
+    handler.__seal_sheddable__ = True
+    return handler
+
+
+def coalesced(handler: callable) -> callable:
+    """
+    Помечает хендлер ивента Playerok как получающий объединённые ивенты сделки.
+    Вместо каждого промежуточного `DEAL_STATUS_CHANGED`, `ITEM_PAID`, `ITEM_SENT`, `DEAL_CONFIRMED`
+    такой хендлер получает один `core.event_dispatcher.CoalescedDealEvent` с итоговым
+    состоянием и списком переходов (только при обработке через `core.event_dispatcher`).
+    Объединённый ивент передаётся хендлерам всех типов из его переходов, каждому один раз.
+
+        @coalesced
+        async def notify_deal(event): ...
+
+    :param handler: Хендлер.
+    :type handler: `callable`
+
+    :return: Тот же хендлер.
+    :rtype: `callable`
+    """
+    handler.__seal_coalesced__ = True
+    return handler
+
+
+def configure_playerok_dispatch(concurrent: bool = False, max_concurrency: int = 8, handler_timeout: float = 0):
+    """
+    Задаёт режим вызова хендлеров ивентов Playerok.
+
+    :param concurrent: Запускать хендлеры одного ивента параллельно.
+    :type concurrent: `bool`
+
+    :param max_concurrency: Сколько хендлеров одного ивента может выполняться одновременно.
+    :type max_concurrency: `int`
+
+    :param handler_timeout: Таймаут хендлера в секундах (0 - без таймаута).
+    :type handler_timeout: `float`
+    """
+    _dispatch["concurrent"] = bool(concurrent)
+    _dispatch["max_concurrency"] = max(int(max_concurrency), 1)
+    _dispatch["handler_timeout"] = max(float(handler_timeout), 0)
+
+
+async def _run_playerok_handler(event: EventTypes, registration: HandlerRegistration, args: list,
+                                semaphore: asyncio.Semaphore | None = None,
+                                on_outcome: callable = None) -> HandlerOutcome:
+    handler, handler_id = registration.handler, registration.id
+    name = _handler_name(handler)
+    timeout = _dispatch["handler_timeout"] or None
+    start = time.perf_counter()
+    try:
+        if semaphore is None:
+            await _invoke(handler, args)
+        else:
+            async with semaphore:
+                start = time.perf_counter()
+                await asyncio.wait_for(_invoke(handler, args), timeout)
+        outcome = HandlerOutcome(name, True, time.perf_counter() - start, handler_id=handler_id)
+    except asyncio.TimeoutError:
+        logger.error(f"{Fore.LIGHTRED_EX}Хендлер «{name}» для ивента Playerok «{event.name}» не уложился в {timeout} сек.")
+        outcome = HandlerOutcome(name, False, time.perf_counter() - start, "timeout", True, handler_id=handler_id)
+    except Exception as e:
+        logger.error(f"{Fore.LIGHTRED_EX}Ошибка при обработке хендлера «{name}» для ивента Playerok «{event.name}»: {Fore.WHITE}{e}")
+        outcome = HandlerOutcome(name, False, time.perf_counter() - start, str(e), handler_id=handler_id)
+    if on_outcome is not None:
+        on_outcome(outcome)
+    return outcome
+
+
+def has_coalesced_handlers(events) -> bool:
+    """
+    Проверяет, зарегистрированы ли для ивентов Playerok хендлеры с пометкой `coalesced`.
+
+    :param events: Типы ивентов.
+    :type events: `Iterable[playerokapi.listener.events.EventTypes]`
+
+    :rtype: `bool`
+    """
+    return _playerok_registry.has_coalesced(events)
+
+
+async def call_playerok_event(event: EventTypes, args: list = [], shed: bool = False,
+                              delivery: str | None = None, skip_handlers: frozenset[str] = frozenset(),
+                              on_outcome: callable = None, events: list | None = None) -> list[HandlerOutcome]:
     """
     Вызывает ивент бота.
+    По умолчанию хендлеры вызываются по очереди; в параллельном режиме
+    (`configure_playerok_dispatch(concurrent=True)`) - одновременно, с ограничением
+    количества и таймаутом, а хендлеры, помеченные `ordered`, сохраняют порядок.
 
     :param event: Тип ивента.
     :type event: `playerokapi.enums.EventTypes`
 
     :param args: Аргументы.
     :type args: `list`
+
+    :param shed: Пропустить хендлеры, помеченные `sheddable` (при перегрузке).
+    :type shed: `bool`
+
+    :param delivery: Какие хендлеры вызывать: "raw" - без пометки `coalesced`,
+        "coalesced" - только с ней, `None` - все.
+    :type delivery: `str` or `None`
+
+    :param skip_handlers: Ключи хендлеров (`core.handlers.HandlerOutcome.key`), которые не нужно
+        вызывать, например уже обработавшие ивент до перезапуска.
+    :type skip_handlers: `frozenset[str]`
+
+    :param on_outcome: Функция `on_outcome(outcome)`, вызываемая сразу после завершения
+        каждого хендлера (например, для подтверждения в журнале), _опционально_.
+    :type on_outcome: `callable` or `None`
+
+    :param events: Типы, хендлеры которых нужно вызвать вместо хендлеров `event`
+        (для объединённого ивента - все его переходы); хендлер, зарегистрированный
+        на несколько из них, вызывается один раз, _опционально_.
+    :type events: `list[playerokapi.listener.events.EventTypes]` or `None`
+
+    :return: Результаты хендлеров в порядке регистрации.
+    :rtype: `list[core.handlers.HandlerOutcome]`
     """
-    handlers = get_playerok_event_handlers().get(event, [])
-    for handler in handlers:
-        try:
-            await handler(*args)
-        except Exception as e:
-            logger.error(f"{Fore.LIGHTRED_EX}Ошибка при обработке хендлера «{handler.__module__}.{handler.__qualname__}» для ивента Playerok «{event.name}»: {Fore.WHITE}{e}")
\ No newline at end of file
+    if events is None:
+        registrations = _playerok_registry.select_registrations(event, args)
+    else:
+        registrations, seen = [], set()
+        for event_type in dict.fromkeys(events):
+            for registration in _playerok_registry.select_registrations(event_type, args):
+                if registration.handler not in seen:
+                    seen.add(registration.handler)
+                    registrations.append(registration)
+    if delivery is not None:
+        wanted = delivery == "coalesced"
+        registrations = [r for r in registrations if getattr(r.handler, "__seal_coalesced__", False) == wanted]
+    if skip_handlers:
+        registrations = [r for r in registrations
+                         if _handler_key(r.id, _handler_name(r.handler)) not in skip_handlers]
+    skipped = []
+    if shed:
+        skipped = [HandlerOutcome(_handler_name(r.handler), True, 0.0, shed=True, handler_id=r.id)
+                   for r in registrations if getattr(r.handler, "__seal_sheddable__", False)]
+        if skipped:
+            registrations = [r for r in registrations if not getattr(r.handler, "__seal_sheddable__", False)]
+    if not _dispatch["concurrent"] or len(registrations) < 2:
+        return [await _run_playerok_handler(event, r, args, None, on_outcome) for r in registrations] + skipped
+    semaphore = asyncio.Semaphore(_dispatch["max_concurrency"])
+    outcomes = []
+    batch = []
+    for registration in registrations:
+        if getattr(registration.handler, "__seal_ordered__", False):
+            outcomes.extend(await asyncio.gather(*batch))
+            batch = []
+            outcomes.append(await _run_playerok_handler(event, registration, args, semaphore, on_outcome))
+        else:
+            batch.append(_run_playerok_handler(event, registration, args, semaphore, on_outcome))
+    outcomes.extend(await asyncio.gather(*batch))
+    return outcomes + skipped
\ No newline at end of file
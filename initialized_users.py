@@ -0,0 +1,223 @@
+"""
+Хранилище поприветствованных пользователей для Seal Playerok Bot.
+Заменяет ручную работу со словарём `data.INITIALIZED_USERS` ({user_id: timestamp}).
+
+- проверка «приветствовали ли пользователя» выполняется за O(1);
+- записи старше `messages.first_message.cooldown_days` вытесняются по куче сроков;
+- изменения дописываются в журнал `initialized_users.log` (или по одной записи в SQLite),
+  а снимок `initialized_users.json` перезаписывается только при уплотнении журнала.
+"""
+import os
+import heapq
+import threading
+import time
+from logging import getLogger
+
+# Импорт путей из центрального модуля
+import paths
+import file_writer
+import sqlite_storage
+from data import Data, INITIALIZED_USERS, set_json
+from settings import Settings as sett
+
+
+logger = getLogger("seal.initialized_users")
+
+COMPACT_THRESHOLD = 5000  # Уплотнять журнал, когда в нём столько записей
+
+
+class InitializedUsers:
+    """
+    Хранилище времени последнего приветствия пользователей с автоматическим истечением.
+
+    :param cooldown_days: Через сколько дней приветствие можно отправить снова.
+    :type cooldown_days: `float`
+
+    :param log_path: Путь к журналу изменений.
+    :type log_path: `str`
+    """
+
+    def __init__(self, cooldown_days: float = 7, log_path: str = paths.INITIALIZED_USERS_LOG_FILE):
+        self.log_path = log_path
+        self.cooldown = float(cooldown_days) * 86400
+        self.evicted = 0
+        self._times: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._log_lines = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    @property
+    def size(self) -> int:
+        """Количество пользователей в хранилище."""
+        return len(self._times)
+
+    def set_cooldown(self, cooldown_days: float):
+        """
+        Меняет срок, после которого приветствие можно отправить снова.
+
+        :param cooldown_days: Срок в днях.
+        :type cooldown_days: `float`
+        """
+        with self._lock:
+            self.cooldown = float(cooldown_days) * 86400
+            self.evict_expired()
+
+    def is_initialized(self, user_id: int | str) -> bool:
+        """
+        Проверяет, приветствовали ли пользователя в пределах срока.
+
+        :param user_id: ID пользователя.
+        :type user_id: `int` or `str`
+
+        :return: True, если приветствие отправлять не нужно.
+        :rtype: `bool`
+        """
+        with self._lock:
+            timestamp = self._times.get(str(user_id))
+            if timestamp is None:
+                return False
+            if timestamp + self.cooldown <= time.time():
+                self.evict_expired()
+                return False
+            return True
+
+    def mark(self, user_id: int | str, timestamp: float | None = None):
+        """
+        Запоминает время приветствия пользователя.
+
+        :param user_id: ID пользователя.
+        :type user_id: `int` or `str`
+
+        :param timestamp: Время приветствия, по умолчанию - сейчас.
+        :type timestamp: `float` or `None`
+        """
+        user_id = str(user_id)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._lock:
+            self._times[user_id] = timestamp
+            heapq.heappush(self._heap, (timestamp, user_id))
+            self._persist(user_id, timestamp)
+
+    def evict_expired(self, now: float | None = None) -> int:
+        """
+        Удаляет записи старше срока приветствия.
+
+        :param now: Текущее время, по умолчанию - сейчас.
+        :type now: `float` or `None`
+
+        :return: Количество удалённых записей.
+        :rtype: `int`
+        """
+        now = time.time() if now is None else now
+        evicted = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] + self.cooldown <= now:
+                timestamp, user_id = heapq.heappop(self._heap)
+                # В куче могут остаться устаревшие сроки повторно поприветствованных пользователей
+                if self._times.get(user_id) == timestamp:
+                    del self._times[user_id]
+                    self._persist(user_id, None)
+                    evicted += 1
+            self.evicted += evicted
+        return evicted
+
+    def compact(self) -> bool:
+        """
+        Записывает снимок всех записей и очищает журнал.
+        Журнал очищается, только если снимок записан: иначе при сбое пропали бы изменения.
+
+        :return: True, если журнал уплотнён.
+        :rtype: `bool`
+        """
+        with self._lock:
+            self.evict_expired()
+            if sqlite_storage.get_storage() is not None:
+                return False
+            try:
+                # Ранее поставленный в очередь снимок не должен записаться поверх нового
+                file_writer.flush(INITIALIZED_USERS.path)
+                set_json(INITIALIZED_USERS.path, dict(self._times))
+            except Exception as e:
+                logger.error(f"Не удалось записать снимок приветствий, журнал сохранён: {e}")
+                return False
+            with open(self.log_path, "w", encoding="utf-8"):
+                pass
+            self._log_lines = 0
+            return True
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает статистику хранилища.
+
+        :return: Словарь с размером, количеством вытесненных записей и длиной журнала.
+        :rtype: `dict`
+        """
+        with self._lock:
+            return {"size": len(self._times), "evicted": self.evicted, "log_lines": self._log_lines}
+
+    def _persist(self, user_id: str, timestamp: float | None):
+        if sqlite_storage.get_storage() is not None:
+            if timestamp is None:
+                Data.delete_item(INITIALIZED_USERS.name, user_id)
+            else:
+                Data.set_item(INITIALIZED_USERS.name, user_id, timestamp)
+            return
+        line = f"{user_id} -\n" if timestamp is None else f"{user_id} {timestamp}\n"
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._log_lines += 1
+        except OSError as e:
+            logger.error(f"Не удалось записать журнал приветствий: {e}")
+        if self._log_lines >= max(COMPACT_THRESHOLD, len(self._times)):
+            self.compact()
+
+    def _load(self):
+        snapshot = Data.get(INITIALIZED_USERS.name) or {}
+        for user_id, timestamp in snapshot.items():
+            try:
+                self._times[str(user_id)] = float(timestamp)
+            except (TypeError, ValueError):
+                continue
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 2:
+                        continue
+                    self._log_lines += 1
+                    if parts[1] == "-":
+                        self._times.pop(parts[0], None)
+                    else:
+                        try:
+                            self._times[parts[0]] = float(parts[1])
+                        except ValueError:
+                            continue
+        self._heap = [(timestamp, user_id) for user_id, timestamp in self._times.items()]
+        heapq.heapify(self._heap)
+        self.evict_expired()
+
+
+_store: InitializedUsers | None = None
+_store_lock = threading.Lock()
+
+
+def get_initialized_users() -> InitializedUsers:
+    """
+    Возвращает общее хранилище поприветствованных пользователей.
+    Срок приветствия берётся из `messages.first_message.cooldown_days` и обновляется при его изменении.
+
+    :return: Хранилище.
+    :rtype: `initialized_users.InitializedUsers`
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                messages = sett.get("messages") or {}
+                cooldown = messages.get("first_message", {}).get("cooldown_days", 7)
+                _store = InitializedUsers(cooldown)
+                sett.subscribe("messages", "first_message.cooldown_days",
+                               lambda change: _store.set_cooldown(change.new or 0))
+    return _store
@@ -0,0 +1,105 @@
+"""
+Кодек JSON для файлов настроек, данных и кэшей Seal Playerok Bot.
+Использует самый быстрый доступный кодировщик: orjson, msgspec или стандартный json.
+
+Два режима записи на диск:
+- компактный - без отступов, самый быстрый и маленький (по умолчанию для bot_data);
+- читаемый - с отступом в 4 пробела для ручного редактирования (по умолчанию для bot_settings).
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+PRETTY_SETTINGS = True   # Файлы bot_settings пишутся в читаемом виде
+PRETTY_DATA = False      # Файлы bot_data пишутся компактно
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def configure(pretty_settings: bool = True, pretty_data: bool = False):
+    """
+    Задаёт режим записи файлов на диск.
+
+    :param pretty_settings: Писать файлы настроек в читаемом виде.
+    :type pretty_settings: `bool`
+
+    :param pretty_data: Писать файлы данных в читаемом виде.
+    :type pretty_data: `bool`
+    """
+    global PRETTY_SETTINGS, PRETTY_DATA
+    PRETTY_SETTINGS = bool(pretty_settings)
+    PRETTY_DATA = bool(pretty_data)
+
+
+def loads(data: bytes | str):
+    """
+    Разбирает JSON.
+
+    :param data: JSON в байтах или строкой.
+    :type data: `bytes` or `str`
+
+    :return: Разобранные данные.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return _msgspec_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+    return json.loads(data)
+
+
+def dumps(obj, pretty: bool = False) -> bytes:
+    """
+    Кодирует данные в JSON (UTF-8, без экранирования не-ASCII символов).
+    Читаемый режим всегда совпадает с форматом `json.dumps(obj, indent=4, ensure_ascii=False)`,
+    чтобы файлы, которые правят руками, не меняли вид в зависимости от установленных библиотек.
+
+    :param obj: Данные.
+
+    :param pretty: Читаемый режим с отступами.
+    :type pretty: `bool`
+
+    :return: JSON в байтах.
+    :rtype: `bytes`
+    """
+    if pretty:
+        return json.dumps(obj, indent=4, ensure_ascii=False).encode("utf-8")
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        if msgspec is not None:
+            return _msgspec_encoder.encode(obj)
+    except (TypeError, ValueError, OverflowError):
+        # Например, целые числа больше 64 бит - отдаём стандартному json
+        pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_file(path: str):
+    """
+    Читает и разбирает JSON файл.
+
+    :param path: Путь к файлу.
+    :type path: `str`
+
+    :return: Разобранные данные.
+    """
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -0,0 +1,258 @@
+"""
+Поиск ключевых фраз в названиях товаров для Seal Playerok Bot
+(авто-выдача, авто-поднятие, авто-восстановление).
+
+Все фразы файла настроек один раз нормализуются (NFKC + casefold) и собираются
+в автомат Ахо-Корасик, поэтому проверка названия стоит O(длины названия),
+а не O(количества фраз × длины названия). Автомат пересобирается только
+при изменении соответствующего файла настроек (по `Settings.version`).
+
+Запись в списке фраз - строка или список строк; список совпадает,
+только если в названии есть все его строки.
+"""
+import threading
+import unicodedata
+from logging import getLogger
+
+from settings import Settings as sett
+
+
+logger = getLogger("seal.keyword_matcher")
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит текст к виду для сравнения: NFKC и casefold.
+
+    :param text: Текст.
+    :type text: `str`
+
+    :return: Нормализованный текст.
+    :rtype: `str`
+    """
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+class AhoCorasick:
+    """Автомат Ахо-Корасик для поиска множества подстрок за один проход."""
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = patterns
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        for index, pattern in enumerate(patterns):
+            self._add(pattern, index)
+        self._build()
+
+    def find(self, text: str) -> set[int]:
+        """
+        Находит фразы, встречающиеся в тексте.
+
+        :param text: Нормализованный текст.
+        :type text: `str`
+
+        :return: Индексы найденных фраз.
+        :rtype: `set[int]`
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def _add(self, pattern: str, index: int):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] += (index,)
+
+    def _build(self):
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._out[next_state] += self._out[fail]
+
+
+class PhraseSet:
+    """
+    Набор записей (строк или списков строк), проверяемых одним автоматом.
+
+    :param entries: Записи.
+    :type entries: `list[str | list[str]]`
+
+    :param owners: Кому принадлежит каждая запись (например, индекс правила),
+        по умолчанию - индекс самой записи.
+    :type owners: `list[int]` or `None`
+    """
+
+    def __init__(self, entries: list, owners: list[int] | None = None):
+        patterns: dict[str, int] = {}
+        self._entries: list[frozenset[int]] = []
+        self._owners: list[int] = []
+        self._by_pattern: dict[int, list[int]] = {}
+        for index, entry in enumerate(entries):
+            phrases = [entry] if isinstance(entry, str) else list(entry or [])
+            ids = frozenset(patterns.setdefault(p, len(patterns)) for p in map(normalize, map(str, phrases)) if p)
+            if not ids:
+                continue
+            for pattern_id in ids:
+                self._by_pattern.setdefault(pattern_id, []).append(len(self._entries))
+            self._entries.append(ids)
+            self._owners.append(owners[index] if owners is not None else index)
+        self._automaton = AhoCorasick(list(patterns))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def match(self, text: str, normalized: bool = False) -> list[int]:
+        """
+        Находит записи, совпавшие с текстом.
+
+        :param text: Текст.
+        :type text: `str`
+
+        :param normalized: Текст уже нормализован через `normalize`.
+        :type normalized: `bool`
+
+        :return: Индексы (или владельцы) совпавших записей по возрастанию.
+        :rtype: `list[int]`
+        """
+        found = self._automaton.find(text if normalized else normalize(text))
+        if not found:
+            return []
+        candidates = {entry for pattern_id in found for entry in self._by_pattern[pattern_id]}
+        return sorted({self._owners[entry] for entry in candidates if self._entries[entry] <= found})
+
+    def any(self, text: str, normalized: bool = False) -> bool:
+        """Проверяет, совпала ли с текстом хотя бы одна запись."""
+        return bool(self.match(text, normalized))
+
+
+class _Compiled:
+    def __init__(self, version: int, value):
+        self.version = version
+        self.value = value
+
+
+class KeywordMatcher:
+    """Скомпилированные наборы фраз файлов настроек с пересборкой при их изменении."""
+
+    def __init__(self):
+        self._compiled: dict[str, _Compiled] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def auto_deliveries(self, item_name: str) -> list[int]:
+        """
+        Находит правила авто-выдачи, ключевые фразы которых есть в названии товара.
+
+        :param item_name: Название товара.
+        :type item_name: `str`
+
+        :return: Индексы правил в `auto_deliveries.json` по возрастанию.
+        :rtype: `list[int]`
+        """
+        return self._get("auto_deliveries", _compile_auto_deliveries).match(item_name)
+
+    def auto_raise(self, item_name: str) -> bool:
+        """
+        Проверяет, нужно ли автоматически поднимать товар
+        (с учётом `playerok.auto_raise_items.all`, included и excluded).
+
+        :param item_name: Название товара.
+        :type item_name: `str`
+
+        :rtype: `bool`
+        """
+        return self._selected("auto_raise_items", item_name)
+
+    def auto_restore(self, item_name: str) -> bool:
+        """
+        Проверяет, нужно ли автоматически восстанавливать товар
+        (с учётом `playerok.auto_restore_items.all`, included и excluded).
+
+        :param item_name: Название товара.
+        :type item_name: `str`
+
+        :rtype: `bool`
+        """
+        return self._selected("auto_restore_items", item_name)
+
+    def included(self, name: str, item_name: str) -> bool:
+        """Проверяет, есть ли в названии товара фраза из списка `included` файла настроек."""
+        return self._get(name, _compile_lists)[0].any(item_name)
+
+    def excluded(self, name: str, item_name: str) -> bool:
+        """Проверяет, есть ли в названии товара фраза из списка `excluded` файла настроек."""
+        return self._get(name, _compile_lists)[1].any(item_name)
+
+    def _selected(self, name: str, item_name: str) -> bool:
+        included, excluded = self._get(name, _compile_lists)
+        text = normalize(item_name)
+        if excluded.any(text, normalized=True):
+            return False
+        if sett.view("config").playerok[name].all:
+            return True
+        return included.any(text, normalized=True)
+
+    def _get(self, name: str, compile_func: callable):
+        version = sett.version(name)
+        compiled = self._compiled.get(name)
+        if compiled is not None and compiled.version == version:
+            return compiled.value
+        with self._lock:
+            compiled = self._compiled.get(name)
+            if compiled is None or compiled.version != version:
+                compiled = self._compiled[name] = _Compiled(version, compile_func(sett.get(name)))
+                self.builds += 1
+                logger.debug(f"Пересобраны ключевые фразы {name}")
+            return compiled.value
+
+
+def _compile_auto_deliveries(rules: list) -> PhraseSet:
+    # Правило совпадает, если совпала любая его ключевая фраза
+    entries, owners = [], []
+    for index, rule in enumerate(rules or []):
+        if not isinstance(rule, dict):
+            continue
+        for phrase in rule.get("keyphrases") or []:
+            entries.append(phrase)
+            owners.append(index)
+    return PhraseSet(entries, owners)
+
+
+def _compile_lists(value: dict) -> tuple[PhraseSet, PhraseSet]:
+    value = value or {}
+    return PhraseSet(value.get("included") or []), PhraseSet(value.get("excluded") or [])
+
+
+_matcher = KeywordMatcher()
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """
+    Возвращает общий поиск ключевых фраз.
+
+    :return: Поиск ключевых фраз.
+    :rtype: `keyword_matcher.KeywordMatcher`
+    """
+    return _matcher
@@ -2,31 +2,46 @@
 Центральный модуль для всех путей в проекте.
 Все пути вычисляются относительно расположения этого файла,
 что гарантирует правильную работу независимо от текущей рабочей директории.
+
+Данные разделены на два уровня хранения:
+- надёжный (SEAL_DURABLE_DIR, по умолчанию - папка проекта) - настройки, данные, логи;
+- быстрый (SEAL_HOT_DIR, например /dev/shm/seal) - кэш и временные очереди.
+Файлы из HOT_CHECKPOINT_FILES периодически копируются в надёжный уровень
+и восстанавливаются из него, если быстрый уровень очистился (tmpfs после перезагрузки).
 """
 import os
+import shutil
 
 # Корневая директория проекта (где лежит этот файл)
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Уровни хранения (переменные окружения SEAL_DURABLE_DIR и SEAL_HOT_DIR)
+DURABLE_DIR = os.path.abspath(os.path.expanduser(os.environ.get("SEAL_DURABLE_DIR") or ROOT_DIR))
+HOT_DIR = os.path.abspath(os.path.expanduser(os.environ.get("SEAL_HOT_DIR") or os.path.join(DURABLE_DIR, "storage")))
+# Период копирования файлов быстрого уровня в надёжный (сек)
+CHECKPOINT_INTERVAL = float(os.environ.get("SEAL_CHECKPOINT_INTERVAL") or 60)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # ДИРЕКТОРИИ
 # ═══════════════════════════════════════════════════════════════════════════════
 
 # Директория настроек бота
-BOT_SETTINGS_DIR = os.path.join(ROOT_DIR, "bot_settings")
+BOT_SETTINGS_DIR = os.path.join(DURABLE_DIR, "bot_settings")
 
 # Директория данных бота
-BOT_DATA_DIR = os.path.join(ROOT_DIR, "bot_data")
+BOT_DATA_DIR = os.path.join(DURABLE_DIR, "bot_data")
 
 # Директория логов
-LOGS_DIR = os.path.join(ROOT_DIR, "logs")
+LOGS_DIR = os.path.join(DURABLE_DIR, "logs")
 
 # Директория плагинов
 PLUGINS_DIR = os.path.join(ROOT_DIR, "plugins")
 
 # Директория хранилища (кэш и т.д.)
-STORAGE_DIR = os.path.join(ROOT_DIR, "storage")
-CACHE_DIR = os.path.join(STORAGE_DIR, "cache")
+STORAGE_DIR = os.path.join(DURABLE_DIR, "storage")
+CACHE_DIR = os.path.join(HOT_DIR, "cache")
+CHECKPOINTS_DIR = os.path.join(STORAGE_DIR, "checkpoints")  # Копии файлов быстрого уровня
+EVENT_JOURNAL_DIR = os.path.join(STORAGE_DIR, "event_journal")  # Журнал ивентов Playerok для восстановления после сбоя
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ФАЙЛЫ НАСТРОЕК (bot_settings/)
@@ -47,9 +62,15 @@ PROXY_LIST_FILE = os.path.join(BOT_SETTINGS_DIR, "proxy_list.json")
 
 SALT_FILE = os.path.join(BOT_DATA_DIR, ".salt")
 STATS_FILE = os.path.join(BOT_DATA_DIR, "stats.json")
+STATS_ROLLUPS_FILE = os.path.join(BOT_DATA_DIR, "stats_rollups.json")  # Агрегаты статистики по часам/дням/месяцам
+STATS_JOURNAL_FILE = os.path.join(BOT_DATA_DIR, "stats_journal.log")  # События сделок с последнего уплотнения
+STATS_HISTORY_FILE = os.path.join(BOT_DATA_DIR, "stats_history.log")  # Архив событий сделок (старше срока хранения удаляются)
 DEALS_MONITOR_FILE = os.path.join(BOT_DATA_DIR, "deals_to_monitor.json")
 INITIALIZED_USERS_FILE = os.path.join(BOT_DATA_DIR, "initialized_users.json")
+INITIALIZED_USERS_LOG_FILE = os.path.join(BOT_DATA_DIR, "initialized_users.log")  # Журнал изменений с последнего снимка
 AUTO_RAISE_ITEMS_TIMES_FILE = os.path.join(BOT_DATA_DIR, "auto_raise_items_times.json")
+STOCK_DIR = os.path.join(BOT_DATA_DIR, "stock")  # Товары авто-выдачи: {rule_id}.stock и {rule_id}.cursor
+STORAGE_DB_FILE = os.path.join(BOT_DATA_DIR, "storage.db")  # Хранилище SQLite (SEAL_STORAGE_BACKEND=sqlite)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ФАЙЛЫ ЛОГОВ (logs/)
@@ -63,6 +84,11 @@ LATEST_LOG_FILE = os.path.join(LOGS_DIR, "latest.log")
 
 ANNOUNCEMENT_TAG_FILE = os.path.join(CACHE_DIR, "announcement_tag.txt")
 
+# Файлы быстрого уровня, которые нужно сохранять в надёжный уровень
+HOT_CHECKPOINT_FILES = [
+    ANNOUNCEMENT_TAG_FILE,
+]
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
@@ -73,13 +99,72 @@ def ensure_dirs():
     dirs = [
         BOT_SETTINGS_DIR,
         BOT_DATA_DIR,
+        STOCK_DIR,
         LOGS_DIR,
         PLUGINS_DIR,
         STORAGE_DIR,
+        CHECKPOINTS_DIR,
+        EVENT_JOURNAL_DIR,
+        HOT_DIR,
         CACHE_DIR,
     ]
     for d in dirs:
         os.makedirs(d, exist_ok=True)
+    restore_checkpoints()
+
+
+def _checkpoint_path(path: str) -> str:
+    return os.path.join(CHECKPOINTS_DIR, os.path.relpath(path, HOT_DIR))
+
+
+def checkpoint_hot_files() -> int:
+    """
+    Копирует изменившиеся файлы быстрого уровня из HOT_CHECKPOINT_FILES в надёжный уровень.
+    Если быстрый уровень не вынесен отдельно (SEAL_HOT_DIR не задан), ничего не делает.
+
+    :return: Количество скопированных файлов.
+    :rtype: `int`
+    """
+    if HOT_DIR == STORAGE_DIR:
+        return 0
+    copied = 0
+    for path in HOT_CHECKPOINT_FILES:
+        target = _checkpoint_path(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        try:
+            target_stat = os.stat(target)
+            if target_stat.st_mtime_ns == stat.st_mtime_ns and target_stat.st_size == stat.st_size:
+                continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f"{target}.tmp"
+        shutil.copy2(path, tmp_path)
+        os.replace(tmp_path, target)
+        copied += 1
+    return copied
+
+
+def restore_checkpoints() -> int:
+    """
+    Восстанавливает отсутствующие файлы быстрого уровня из надёжного уровня.
+
+    :return: Количество восстановленных файлов.
+    :rtype: `int`
+    """
+    if HOT_DIR == STORAGE_DIR:
+        return 0
+    restored = 0
+    for path in HOT_CHECKPOINT_FILES:
+        source = _checkpoint_path(path)
+        if not os.path.exists(path) and os.path.exists(source):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copy2(source, path)
+            restored += 1
+    return restored
 
 
 def get_path(*parts) -> str:
@@ -14,7 +14,7 @@ import paths
 from __init__ import ACCENT_COLOR
 from core.handlers import (
     register_playerok_event_handlers, 
-    remove_playerok_event_handlers, 
+    get_playerok_handler_registry, 
     call_bot_event
 )
 from core.utils import install_requirements
@@ -98,7 +98,7 @@ async def _activate_plugin(plugin: Plugin) -> bool:
     global loaded_plugins
 
     # Регистрируем обработчики событий Playerok
-    register_playerok_event_handlers(plugin.playerok_event_handlers)
+    register_playerok_event_handlers(plugin.playerok_event_handlers, owner=str(plugin.uuid))
 
     try:
         playerok_events = len(plugin.playerok_event_handlers or {})
@@ -158,8 +158,8 @@ async def _deactivate_plugin(plugin: Plugin) -> bool:
     """
     global loaded_plugins
 
-    # Удаляем обработчики событий Playerok
-    remove_playerok_event_handlers(plugin.playerok_event_handlers)
+    # Удаляем обработчики событий Playerok (все, что были зарегистрированы от имени плагина)
+    get_playerok_handler_registry().remove_owner(str(plugin.uuid))
 
     # Помечаем плагин как неактивный
     # Роутеры остаются в диспетчере, но middleware будет их блокировать
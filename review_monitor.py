@@ -0,0 +1,239 @@
+"""
+Мониторинг отзывов по сделкам для Seal Playerok Bot.
+
+Сделки ждут отзыва в очереди сроков: задача просыпается, только когда наступил
+срок ближайшей проверки, и проверяет все наступившие сделки одним пакетом.
+Если отзыва нет, следующая проверка откладывается с экспоненциальным ростом
+интервала (от `check_interval` секунд), а сделки старше `wait_minutes`
+удаляются из `deals_to_monitor.json`.
+"""
+import threading
+import time
+from logging import getLogger
+
+from data import Data, DEALS_TO_MONITOR
+from settings import Settings as sett
+from scheduler import DeadlineQueue
+
+
+logger = getLogger("seal.review_monitor")
+
+BATCH_SIZE = 50         # Максимум сделок в одной пакетной проверке
+MAX_BACKOFF_FACTOR = 16 # Максимальный интервал проверки - столько `check_interval`
+
+
+class ReviewMonitor:
+    """
+    Очередь сделок, ожидающих отзыва.
+
+    :param wait_minutes: Сколько минут ждать отзыв по сделке.
+    :type wait_minutes: `float`
+
+    :param check_interval: Интервал первой проверки в секундах.
+    :type check_interval: `float`
+    """
+
+    def __init__(self, wait_minutes: float = 10, check_interval: float = 30):
+        self.queue = DeadlineQueue()
+        self.wait = float(wait_minutes) * 60
+        self.check_interval = max(float(check_interval), 1.0)
+        self.checked = 0
+        self.reviewed = 0
+        self.expired = 0
+        self._added: dict[str, float] = {}
+        self._attempts: dict[str, int] = {}
+        self._running = False
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        now = time.time()
+        stale = 0
+        for deal_id, added in (Data.get(DEALS_TO_MONITOR.name) or {}).items():
+            try:
+                added = float(added)
+            except (TypeError, ValueError):
+                continue
+            if now > added + self.wait + self.check_interval:
+                # Истекла, пока бот был выключен
+                stale += 1
+                continue
+            self._added[str(deal_id)] = added
+            self._schedule(str(deal_id))
+        if stale:
+            self.expired += stale
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._added)
+
+    def __contains__(self, deal_id: str) -> bool:
+        return str(deal_id) in self._added
+
+    def add(self, deal_id: str, timestamp: float | None = None):
+        """
+        Ставит сделку на ожидание отзыва.
+
+        :param deal_id: ID сделки.
+        :type deal_id: `str`
+
+        :param timestamp: Время постановки, по умолчанию - сейчас.
+        :type timestamp: `float` or `None`
+        """
+        deal_id = str(deal_id)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        with self._lock:
+            self._added[deal_id] = timestamp
+            self._attempts[deal_id] = 0
+            self._schedule(deal_id)
+        self._save()
+
+    def remove(self, deal_id: str) -> bool:
+        """
+        Снимает сделку с ожидания отзыва.
+
+        :param deal_id: ID сделки.
+        :type deal_id: `str`
+
+        :return: True, если сделка ожидала отзыва.
+        :rtype: `bool`
+        """
+        deal_id = str(deal_id)
+        with self._lock:
+            if not self._discard(deal_id):
+                return False
+        self._save()
+        return True
+
+    def configure(self, wait_minutes: float | None = None, check_interval: float | None = None):
+        """
+        Меняет параметры мониторинга и пересчитывает сроки проверок.
+
+        :param wait_minutes: Сколько минут ждать отзыв по сделке.
+        :type wait_minutes: `float` or `None`
+
+        :param check_interval: Интервал первой проверки в секундах.
+        :type check_interval: `float` or `None`
+        """
+        with self._lock:
+            if wait_minutes is not None:
+                self.wait = float(wait_minutes) * 60
+            if check_interval is not None:
+                self.check_interval = max(float(check_interval), 1.0)
+            for deal_id in self._added:
+                self._schedule(deal_id)
+
+    async def run(self, check_deals: callable):
+        """
+        Проверяет сделки по мере наступления сроков, пока не вызван `stop`.
+        Корутина `check_deals(deal_ids)` получает пакет ID сделок и возвращает
+        ID сделок, по которым уже есть отзыв; они снимаются с ожидания.
+
+        :param check_deals: Корутина пакетной проверки.
+        :type check_deals: `callable`
+        """
+        self._running = True
+        while self._running:
+            deal_ids = await self.queue.wait(BATCH_SIZE)
+            if not self._running:
+                break
+            now = time.time()
+            # Просроченные сделки тоже проверяются: это их последняя проверка,
+            # после неё они удаляются ниже
+            batch = [deal_id for deal_id in deal_ids if deal_id in self._added]
+            if not batch:
+                continue
+            try:
+                reviewed = set(map(str, await check_deals(batch) or []))
+            except Exception as e:
+                logger.error(f"Ошибка при проверке отзывов по сделкам: {e}")
+                reviewed = set()
+            self.checked += len(batch)
+            changed = False
+            with self._lock:
+                for deal_id in batch:
+                    if deal_id not in self._added:
+                        continue
+                    if deal_id in reviewed:
+                        self.reviewed += 1
+                        self._discard(deal_id)
+                        changed = True
+                    elif now >= self._added[deal_id] + self.wait:
+                        self.expired += 1
+                        self._discard(deal_id)
+                        changed = True
+                    else:
+                        self._attempts[deal_id] = self._attempts.get(deal_id, 0) + 1
+                        self._schedule(deal_id)
+            # Снятые сделки сохраняются одной записью на весь пакет
+            if changed:
+                self._save()
+
+    def stop(self):
+        """Останавливает `run` после текущей проверки."""
+        self._running = False
+        self.queue.wake()
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает статистику мониторинга.
+
+        :return: Словарь с количеством ожидающих, проверенных, получивших отзыв
+            и истёкших сделок и ближайшим сроком проверки.
+        :rtype: `dict`
+        """
+        return {"monitored": len(self._added), "checked": self.checked, "reviewed": self.reviewed,
+                "expired": self.expired, "next_due": self.queue.next_due()}
+
+    def _discard(self, deal_id: str) -> bool:
+        if self._added.pop(deal_id, None) is None:
+            return False
+        self._attempts.pop(deal_id, None)
+        self.queue.remove(deal_id)
+        return True
+
+    def _save(self):
+        # Снимок берётся под блокировкой сохранения, поэтому последним
+        # в очередь записи всегда попадает самое свежее состояние
+        with self._save_lock:
+            with self._lock:
+                added = dict(self._added)
+            Data.set(DEALS_TO_MONITOR.name, added)
+
+    def _schedule(self, deal_id: str):
+        added = self._added[deal_id]
+        attempts = self._attempts.get(deal_id, 0)
+        delay = self.check_interval * min(2 ** attempts, MAX_BACKOFF_FACTOR)
+        if attempts:
+            due = time.time() + delay
+        else:
+            due = added + delay
+        # Последняя проверка - в момент истечения ожидания, после неё сделка удаляется
+        self.queue.push(deal_id, min(due, added + self.wait))
+
+
+_monitor: ReviewMonitor | None = None
+_monitor_lock = threading.Lock()
+
+
+def get_review_monitor() -> ReviewMonitor:
+    """
+    Возвращает общий монитор отзывов.
+    Параметры берутся из `playerok.review_monitoring` и обновляются при их изменении.
+
+    :return: Монитор отзывов.
+    :rtype: `review_monitor.ReviewMonitor`
+    """
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                config = sett.get("config")["playerok"]["review_monitoring"]
+                _monitor = ReviewMonitor(config["wait_minutes"], config["check_interval"])
+                sett.subscribe("config", "playerok.review_monitoring", _on_config_changed)
+    return _monitor
+
+
+def _on_config_changed(change):
+    if change.path.endswith("wait_minutes"):
+        _monitor.configure(wait_minutes=change.new)
+    elif change.path.endswith("check_interval"):
+        _monitor.configure(check_interval=change.new)
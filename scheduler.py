@@ -0,0 +1,169 @@
+"""
+Очередь сроков для фоновых задач Seal Playerok Bot (автоподнятие, мониторинг отзывов).
+Вместо периодического перебора всех элементов задача спит до ближайшего срока
+и просыпается только тогда, когда есть что делать, или когда срок изменился.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Hashable
+
+
+class DeadlineQueue:
+    """
+    Очередь ключей, упорядоченная по сроку (timestamp).
+    Куча с ленивым удалением: устаревшие записи отбрасываются при извлечении.
+    Изменять очередь можно из любого потока, ждать - из одного event loop.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._due: dict[Hashable, tuple[float, int]] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._due
+
+    def keys(self) -> list:
+        """Возвращает ключи в очереди."""
+        with self._lock:
+            return list(self._due)
+
+    def due(self, key: Hashable) -> float | None:
+        """
+        Возвращает срок ключа.
+
+        :param key: Ключ.
+
+        :return: Срок или `None`, если ключа нет в очереди.
+        :rtype: `float` or `None`
+        """
+        entry = self._due.get(key)
+        return entry[0] if entry else None
+
+    def push(self, key: Hashable, due: float):
+        """
+        Ставит ключ в очередь или переносит его срок.
+
+        :param key: Ключ.
+
+        :param due: Срок (timestamp).
+        :type due: `float`
+        """
+        with self._lock:
+            entry = (due, next(self._counter))
+            self._due[key] = entry
+            heapq.heappush(self._heap, (entry[0], entry[1], key))
+            earliest = self._heap[0][1] == entry[1]
+        if earliest:
+            self.wake()
+
+    def remove(self, key: Hashable) -> bool:
+        """
+        Убирает ключ из очереди.
+
+        :param key: Ключ.
+
+        :return: True, если ключ был в очереди.
+        :rtype: `bool`
+        """
+        with self._lock:
+            return self._due.pop(key, None) is not None
+
+    def clear(self):
+        """Очищает очередь."""
+        with self._lock:
+            self._heap.clear()
+            self._due.clear()
+        self.wake()
+
+    def next_due(self) -> float | None:
+        """
+        Возвращает ближайший срок.
+
+        :return: Ближайший срок или `None`, если очередь пуста.
+        :rtype: `float` or `None`
+        """
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float | None = None, limit: int | None = None) -> list:
+        """
+        Извлекает ключи, срок которых наступил, от ранних к поздним.
+
+        :param now: Текущее время, по умолчанию - сейчас.
+        :type now: `float` or `None`
+
+        :param limit: Максимальное количество ключей.
+        :type limit: `int` or `None`
+
+        :return: Список ключей.
+        :rtype: `list`
+        """
+        now = time.time() if now is None else now
+        keys = []
+        with self._lock:
+            while self._heap and (limit is None or len(keys) < limit):
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                del self._due[key]
+                keys.append(key)
+        return keys
+
+    async def wait(self, limit: int | None = None) -> list:
+        """
+        Ждёт, пока наступит ближайший срок, и извлекает все наступившие ключи.
+        Если срок в очереди стал раньше, ожидание пересчитывается.
+
+        :param limit: Максимальное количество ключей.
+        :type limit: `int` or `None`
+
+        :return: Список ключей. Пустой, если ожидание прервано вызовом `wake`.
+        :rtype: `list`
+        """
+        if self._wakeup is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        while True:
+            keys = self.pop_due(limit=limit)
+            if keys:
+                return keys
+            self._wakeup.clear()
+            next_due = self.next_due()
+            timeout = None if next_due is None else max(next_due - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            return self.pop_due(limit=limit)
+
+    def wake(self):
+        """Прерывает ожидание `wait`, чтобы пересчитать ближайший срок."""
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _drop_stale(self):
+        while self._heap:
+            due, counter, key = self._heap[0]
+            if self._due.get(key) == (due, counter):
+                return
+            heapq.heappop(self._heap)
@@ -1,10 +1,18 @@
 import os
-import json
 import copy
+import asyncio
+import itertools
+import threading
+from functools import partial
 from dataclasses import dataclass
 
 # Импорт путей из центрального модуля
 import paths
+import file_writer
+import json_codec
+import sqlite_storage
+from file_writer import copy_json
+from settings_schema import SchemaNode, compile_schema, freeze
 
 
 @dataclass
@@ -42,7 +50,8 @@ CONFIG = SettingsFile(
                 "enabled": True
             },
             "auto_deliveries": {
-                "enabled": True
+                "enabled": True,
+                "low_stock_threshold": 5  # Уведомлять, когда товаров для выдачи осталось столько
             },
             "auto_restore_items": {
                 "enabled": False,
@@ -61,6 +70,18 @@ CONFIG = SettingsFile(
                 "wait_minutes": 10,
                 "check_interval": 30
             },
+            "event_handlers": {
+                "concurrent": False,  # Запускать хендлеры одного ивента параллельно
+                "max_concurrency": 8,  # Сколько хендлеров одного ивента выполняется одновременно
+                "handler_timeout": 0,  # Таймаут хендлера в параллельном режиме, сек (0 - без таймаута)
+                "shard_workers": 4,  # Сколько чатов/сделок обрабатывается одновременно (порядок внутри чата сохраняется)
+                "max_queue": 1000,  # Размер входной очереди ивентов (сделки и оплаты принимаются сверх лимита)
+                "shed_latency": 5,  # После скольких секунд в очереди пропускать необязательные хендлеры (0 - никогда)
+                "drop_latency": 30,  # После скольких секунд в очереди отбрасывать инициализацию чатов (0 - никогда)
+                "coalesce_window": 2,  # Сколько секунд собирать ивенты сделки для объединённой доставки (0 - без объединения)
+                "blocking_workers": 4,  # Потоков для блокирующих и синхронных хендлеров
+                "journal": True  # Записывать ивенты в журнал и повторять необработанные после перезапуска
+            },
             "tg_logging": {
                 "enabled": True,
                 "chat_id": "",
@@ -84,6 +105,16 @@ CONFIG = SettingsFile(
                 "password_auth_enabled": True,
                 "signed_users": []
             }
+        },
+        "storage": {
+            "write_behind": {
+                "enabled": False,  # Отложенная запись файлов настроек и данных
+                "debounce_seconds": 1.0  # Окно склейки записей одного файла
+            },
+            "json": {
+                "pretty_settings": True,  # Файлы bot_settings с отступами (удобно править руками)
+                "pretty_data": False  # Файлы bot_data компактно (быстрее и меньше)
+            }
         }
     }
 )
@@ -205,6 +236,414 @@ PROXY_LIST = SettingsFile(
 )
 DATA = [CONFIG, MESSAGES, CUSTOM_COMMANDS, AUTO_DELIVERIES, AUTO_RESTORE_ITEMS, AUTO_RAISE_ITEMS, QUICK_REPLIES, PROXY_LIST]
 
+# Схемы стандартных шаблонов компилируются один раз при импорте
+SCHEMAS: dict[str, SchemaNode] = {
+    file.name: compile_schema(file.default, "".join(part.title() for part in file.name.split("_")))
+    for file in DATA if file.need_restore
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# КЭШ НАСТРОЕК
+# ═══════════════════════════════════════════════════════════════════════════════
+# Разобранные файлы хранятся в памяти и перечитываются с диска только тогда,
+# когда у файла изменились mtime или размер (например, его отредактировали руками).
+# Наружу отдаются только копии, чтобы вызывающий код не мог испортить кэш.
+
+@dataclass
+class _CacheEntry:
+    stamp: tuple | None
+    value: list | dict
+    view: object = None
+    version: int = 0
+
+
+class SettingsConflictError(Exception):
+    """Параллельные изменения одного и того же параметра не удалось объединить."""
+
+
+class _CacheLock:
+    """
+    Блокировка кэша настроек (повторно входимая).
+    Уведомления подписчиков, возникшие под ней, откладываются до выхода из внешнего
+    `with`, чтобы колбэки не выполнялись под блокировкой: иначе подписчик, который
+    ждёт другой поток, обращающийся к настройкам, мог бы остановить обоих.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._local.depth -= 1
+        deferred = ()
+        if not self._local.depth:
+            deferred = getattr(self._local, "deferred", ())
+            self._local.deferred = []
+        self._lock.release()
+        for args in deferred:
+            _notify(*args)
+        return False
+
+    def defer(self, args: tuple) -> bool:
+        """Откладывает уведомление, если поток держит блокировку. Возвращает True, если отложено."""
+        if not getattr(self._local, "depth", 0):
+            return False
+        if not hasattr(self._local, "deferred"):
+            self._local.deferred = []
+        self._local.deferred.append(args)
+        return True
+
+
+_cache: dict[str, _CacheEntry] = {}
+_cache_lock = _CacheLock()
+_cache_stats = {"hits": 0, "misses": 0}
+_versions = itertools.count(1)  # Номер версии растёт при каждом изменении данных в кэше
+
+
+def _file_stamp(path: str) -> tuple | None:
+    """
+    Возвращает отпечаток файла (mtime в наносекундах и размер).
+
+    :param path: Путь к файлу.
+    :type path: `str`
+
+    :return: Кортеж `(mtime_ns, size)` или `None`, если файла нет.
+    :rtype: `tuple` or `None`
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _stamp(file: SettingsFile) -> tuple | int | None:
+    """
+    Возвращает отпечаток файла настроек: mtime и размер JSON файла
+    или номер версии документа в SQLite.
+    """
+    storage = sqlite_storage.get_storage()
+    if storage is not None:
+        return storage.version(file.name)
+    return _file_stamp(file.path)
+
+
+def _read(file: SettingsFile) -> list | dict:
+    """
+    Читает файл настроек из хранилища (JSON или SQLite) и восстанавливает его по шаблону.
+    """
+    storage = sqlite_storage.get_storage()
+    if storage is None:
+        return get_json(file.path, file.default, file.need_restore, SCHEMAS.get(file.name))
+    value = storage.load(file.name)
+    if value is None:
+        value = copy_json(file.default)
+        storage.save(file.name, value)
+    elif file.need_restore and isinstance(value, dict):
+        value, changed = (SCHEMAS.get(file.name) or compile_schema(file.default)).repair(value)
+        if changed:
+            storage.save(file.name, value)
+    return value
+
+
+def _load_cached(file: SettingsFile) -> list | dict:
+    """
+    Получает разобранный файл настроек из кэша.
+    Перечитывает файл, если он изменился на диске.
+
+    :param file: Файл настроек.
+    :type file: `settings.SettingsFile`
+
+    :return: Закэшированные данные (не изменять!).
+    :rtype: `dict` or `list`
+    """
+    stamp = _stamp(file)
+    with _cache_lock:
+        entry = _cache.get(file.path)
+        fresh = stamp is not None and entry is not None and entry.stamp == stamp
+        if entry is not None and (fresh or file_writer.get_pending(file.path) is not None):
+            _cache_stats["hits"] += 1
+            return entry.value
+        _cache_stats["misses"] += 1
+        value = _read(file)
+        _cache[file.path] = _CacheEntry(_stamp(file), copy_json(value), version=next(_versions))
+        value = _cache[file.path].value
+    if entry is not None:
+        # Файл изменили снаружи (например, руками) - сообщаем подписчикам
+        _notify(file.name, entry.value, value)
+    return value
+
+
+def _store_cached(file: SettingsFile, new: list | dict):
+    """
+    Кладёт новые данные в кэш и отправляет их на запись.
+    В режиме отложенной записи файл пишется в фоне, а кэш сразу отдаёт новые данные.
+    Если файл пишется сразу и запись не удалась, в кэше остаются прежние данные.
+
+    :param file: Файл настроек.
+    :type file: `settings.SettingsFile`
+
+    :param new: Новые данные.
+    :type new: `dict` or `list`
+    """
+    value = copy_json(new)
+    with _cache_lock:
+        entry = _cache.get(file.path)
+        stamp = entry.stamp if entry else _stamp(file)
+        stored = _cache[file.path] = _CacheEntry(stamp, value, version=next(_versions))
+    try:
+        file_writer.submit(file.path, value, partial(_write_cached, file))
+    except Exception:
+        with _cache_lock:
+            # Откатываем, только если кэш не успели изменить после нас
+            if _cache.get(file.path) is stored:
+                if entry is None:
+                    del _cache[file.path]
+                else:
+                    _cache[file.path] = entry
+        raise
+    if entry is not None:
+        _notify(file.name, entry.value, value)
+
+
+def _write_cached(file: SettingsFile, path: str, value: list | dict):
+    """
+    Записывает данные из кэша в хранилище и обновляет отпечаток файла в кэше,
+    чтобы собственная запись не считалась внешним изменением.
+    """
+    storage = sqlite_storage.get_storage()
+    if storage is not None:
+        storage.save(file.name, value)
+    else:
+        set_json(path, value)
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry.value is value:
+            entry.stamp = _stamp(file)
+
+
+def _store_item(file: SettingsFile, key: str | int, value, delete: bool = False):
+    """
+    Изменяет или удаляет одну запись файла настроек.
+    В SQLite пишется только эта запись, в JSON - файл целиком.
+    """
+    with _cache_lock:
+        current = _load_cached(file)
+        new = list(current) if isinstance(current, list) else dict(current)
+        if isinstance(new, list):
+            key = int(key)
+        old = {key: current[key]} if (key in current if isinstance(current, dict) else 0 <= key < len(current)) else {}
+        if delete:
+            if not old:
+                return False
+            del new[key]
+        else:
+            value = copy_json(value)
+            if isinstance(new, list) and key == len(new):
+                new.append(value)
+            else:
+                new[key] = value
+        storage = sqlite_storage.get_storage()
+        if storage is None or file_writer.get_pending(file.path) is not None:
+            _store_cached(file, new)
+            return True
+        if delete:
+            storage.delete_item(file.name, key)
+        else:
+            storage.set_item(file.name, key, value, "list" if isinstance(new, list) else "dict")
+        _cache[file.path] = _CacheEntry(storage.version(file.name), new, version=next(_versions))
+    _notify(file.name, old, {} if delete else {key: value})
+    return True
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ПОДПИСКИ НА ИЗМЕНЕНИЯ
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class SettingsChange:
+    name: str      # Название файла настроек
+    path: str      # Путь к изменённому параметру через точку, например "playerok.watermark.enabled"
+    old: object    # Старое значение (None, если параметра не было)
+    new: object    # Новое значение (None, если параметр удалён)
+
+
+@dataclass
+class Subscription:
+    name: str
+    path: tuple
+    callback: callable
+    loop: asyncio.AbstractEventLoop | None
+
+
+_subscribers: dict[str, list[Subscription]] = {}
+_subscribers_lock = threading.Lock()
+
+
+def _split_path(path: str | list | tuple) -> tuple:
+    if isinstance(path, (list, tuple)):
+        return tuple(path)
+    return tuple(part for part in path.split(".") if part)
+
+
+def _diff(old, new, prefix: tuple = (), missing=None) -> list[tuple]:
+    """
+    Находит изменённые параметры между двумя версиями данных.
+
+    :param missing: Значение, которым обозначается отсутствующий параметр.
+
+    :return: Список кортежей `(путь, старое значение, новое значение)`.
+    :rtype: `list[tuple]`
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in old.keys() | new.keys():
+            changes.extend(_diff(old.get(key, missing), new.get(key, missing), prefix + (key,), missing))
+        return changes
+    if old != new or type(old) is not type(new):
+        return [(prefix, old, new)]
+    return []
+
+
+def _notify(name: str, old, new):
+    """
+    Сообщает подписчикам файла настроек об изменённых параметрах.
+    Подписчик вызывается для каждого изменения внутри своего пути
+    (или выше него, если заменили целую секцию). Под блокировкой кэша
+    уведомление откладывается до её освобождения.
+    """
+    if _cache_lock.defer((name, old, new)):
+        return
+    with _subscribers_lock:
+        subscribers = list(_subscribers.get(name, ()))
+    if not subscribers:
+        return
+    changes = _diff(old, new)
+    for sub in subscribers:
+        size = len(sub.path)
+        for path, old_value, new_value in changes:
+            if path[:size] != sub.path and sub.path[:len(path)] != path:
+                continue
+            change = SettingsChange(name, ".".join(map(str, path)), old_value, new_value)
+            _call_subscriber(sub, change)
+
+
+def _call_subscriber(sub: Subscription, change: SettingsChange):
+    from logging import getLogger
+    try:
+        if not asyncio.iscoroutinefunction(sub.callback):
+            sub.callback(change)
+            return
+        loop = sub.loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                getLogger("settings").warning(
+                    f"Некуда запланировать асинхронного подписчика {sub.callback.__qualname__} на '{sub.name}'"
+                )
+                return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is running:
+            loop.create_task(sub.callback(change))
+        else:
+            asyncio.run_coroutine_threadsafe(sub.callback(change), loop)
+    except Exception as e:
+        getLogger("settings").error(f"Ошибка в подписчике настроек '{sub.name}' ({change.path}): {e}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ТРАНЗАКЦИИ
+# ═══════════════════════════════════════════════════════════════════════════════
+# Telegram бот и Playerok бот работают в разных потоках и оба делают
+# get → изменить → set. Транзакция запоминает версию файла в кэше и при сохранении
+# сверяет её: если файл успели изменить, свои изменения накладываются поверх свежей
+# версии, а конфликт возникает только при изменении одного и того же параметра.
+
+_MISSING = object()
+
+
+def _merge(base, ours, theirs):
+    """
+    Накладывает изменения `ours` относительно `base` на `theirs`.
+
+    :raises SettingsConflictError: Если один и тот же параметр изменён по-разному.
+    """
+    if not (isinstance(base, dict) and isinstance(ours, dict) and isinstance(theirs, dict)):
+        if ours == theirs or theirs == base:
+            return copy_json(ours)
+        if ours == base:
+            return theirs
+        raise SettingsConflictError("Файл настроек изменён параллельно и не может быть объединён")
+    our_changes = _diff(base, ours, missing=_MISSING)
+    their_paths = [path for path, _, _ in _diff(base, theirs, missing=_MISSING)]
+    merged = copy_json(theirs)
+    for path, _, new in our_changes:
+        for their_path in their_paths:
+            size = min(len(path), len(their_path))
+            if path[:size] == their_path[:size] and _get_path(theirs, path) != new:
+                raise SettingsConflictError(f"Параметр «{'.'.join(map(str, path))}» изменён параллельно")
+        node = merged
+        for key in path[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+        if new is _MISSING:
+            node.pop(path[-1], None)
+        else:
+            node[path[-1]] = copy_json(new)
+    return merged
+
+
+def _get_path(value, path: tuple):
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+class SettingsTransaction:
+    """
+    Транзакция над файлом настроек (см. `Settings.transaction`).
+
+    :param file: Файл настроек.
+    :type file: `settings.SettingsFile`
+    """
+
+    def __init__(self, file: SettingsFile):
+        self.file = file
+        self.value = None
+        self._base = None
+        self._version = None
+
+    def __enter__(self) -> dict | list:
+        with _cache_lock:
+            self._base = _load_cached(self.file)
+            self._version = _cache[self.file.path].version
+        self.value = copy_json(self._base)
+        return self.value
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        with _cache_lock:
+            current = _load_cached(self.file)
+            if _cache[self.file.path].version != self._version:
+                self.value = _merge(self._base, self.value, current)
+            if self.value != current:
+                _store_cached(self.file, self.value)
+        return False
+
 
 def validate_config(config, default):
     """
@@ -265,7 +704,7 @@ def restore_config(config: dict, default: dict):
     return config
     
 
-def get_json(path: str, default: dict, need_restore: bool = True) -> dict:
+def get_json(path: str, default: dict, need_restore: bool = True, schema: SchemaNode | None = None) -> dict:
     """
     Получает данные файла настроек.
     Создаёт файл настроек, если его нет.
@@ -279,23 +718,23 @@ def get_json(path: str, default: dict, need_restore: bool = True) -> dict:
 
     :param need_restore: Нужно ли сделать проверку на целостность конфига.
     :type need_restore: `bool`
+
+    :param schema: Скомпилированная схема шаблона, _опционально_.
+    :type schema: `settings_schema.SchemaNode` or `None`
     """
     folder_path = os.path.dirname(path)
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = json_codec.load_file(path)
         if need_restore:
-            new_config = restore_config(config, default)
-            if config != new_config:
+            new_config, changed = (schema or compile_schema(default)).repair(config)
+            if changed:
                 config = new_config
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, indent=4, ensure_ascii=False)
+                file_writer.write_file(path, json_codec.dumps(config, json_codec.PRETTY_SETTINGS))
     except:
         config = default
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        file_writer.write_file(path, json_codec.dumps(config, json_codec.PRETTY_SETTINGS))
     finally:
         return config
     
@@ -303,6 +742,7 @@ def get_json(path: str, default: dict, need_restore: bool = True) -> dict:
 def set_json(path: str, new: dict):
     """
     Устанавливает новые данные в файл настроек.
+    Файл записывается атомарно (через временный файл) и проверяется по контрольной сумме.
 
     :param path: Путь к json файлу.
     :type path: `str`
@@ -311,11 +751,13 @@ def set_json(path: str, new: dict):
     :type new: `dict`
     """
     import stat
-    from logging import getLogger
-    logger = getLogger("settings")
+    import logging
+    logger = logging.getLogger("settings")
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     try:
-        logger.debug(f"[set_json] Начало записи в {path}")
+        if debug:
+            logger.debug(f"[set_json] Начало записи в {path}")
         
         if os.path.exists(path):
             if not os.access(path, os.W_OK):
@@ -331,28 +773,14 @@ def set_json(path: str, new: dict):
                         f"Выполните: sudo chown -R $USER:$USER {dir_path}"
                     )
         
-        logger.debug(f"[set_json] Данные для записи: {json.dumps(new, ensure_ascii=False)[:200]}...")
-        
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(new, f, indent=4, ensure_ascii=False)
-            f.flush()
-            os.fsync(f.fileno())
-        
-        os.chmod(path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+        content = json_codec.dumps(new, json_codec.PRETTY_SETTINGS)
+        if debug:
+            logger.debug(f"[set_json] Данные для записи: {content[:200].decode('utf-8', 'ignore')}...")
         
-        logger.debug(f"[set_json] Запись завершена, файл синхронизирован")
+        digest = file_writer.write_file(path, content)
         
-        with open(path, 'r', encoding='utf-8') as f:
-            verify = json.load(f)
-        
-        logger.debug(f"[set_json] Проверка: данные прочитаны обратно из файла")
-        
-        if verify != new:
-            logger.error(f"[set_json] ОШИБКА! Данные в файле не совпадают с записанными!")
-            logger.error(f"[set_json] Ожидалось: {json.dumps(new, ensure_ascii=False)[:200]}...")
-            logger.error(f"[set_json] Получено: {json.dumps(verify, ensure_ascii=False)[:200]}...")
-        else:
-            logger.debug(f"[set_json] Проверка пройдена: данные совпадают")
+        if debug:
+            logger.debug(f"[set_json] Запись завершена, контрольная сумма совпадает: {digest[:12]}")
             
     except PermissionError as e:
         logger.error(f"[set_json] ОШИБКА ПРАВ ДОСТУПА: {e}")
@@ -371,7 +799,7 @@ class Settings:
     def get(name: str, data: list[SettingsFile] = DATA) -> dict | None:
         try: 
             file = [file for file in data if file.name == name][0]
-            return get_json(file.path, file.default, file.need_restore)
+            return copy_json(_load_cached(file))
         except Exception as e:
             from logging import getLogger
             getLogger("settings").error(f"Ошибка чтения настроек '{name}': {e}")
@@ -381,9 +809,307 @@ class Settings:
     def set(name: str, new: list | dict, data: list[SettingsFile] = DATA):
         try: 
             file = [file for file in data if file.name == name][0]
-            set_json(file.path, new)
+            _store_cached(file, new)
             from logging import getLogger
             getLogger("settings").debug(f"Настройки '{name}' сохранены в {file.path}")
         except Exception as e:
             from logging import getLogger
-            getLogger("settings").error(f"Ошибка сохранения настроек '{name}': {e}", exc_info=True)
\ No newline at end of file
+            getLogger("settings").error(f"Ошибка сохранения настроек '{name}': {e}", exc_info=True)
+
+    @staticmethod
+    def update(name: str, path: str | list | tuple, value, data: list[SettingsFile] = DATA) -> bool:
+        """
+        Изменяет один параметр файла настроек, не трогая остальные.
+        Недостающие промежуточные секции создаются.
+
+            Settings.update("config", "playerok.auto_raise_items.enabled", True)
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param path: Путь к параметру через точку или списком ключей.
+        :type path: `str` or `list` or `tuple`
+
+        :param value: Новое значение.
+
+        :return: True, если параметр сохранён.
+        :rtype: `bool`
+        """
+        try:
+            keys = _split_path(path)
+            if not keys:
+                raise ValueError("Пустой путь к параметру")
+            file = [file for file in data if file.name == name][0]
+            with _cache_lock:
+                new = copy_json(_load_cached(file))
+                node = new
+                for key in keys[:-1]:
+                    if not isinstance(node.get(key), dict):
+                        node[key] = {}
+                    node = node[key]
+                node[keys[-1]] = copy_json(value)
+                _store_cached(file, new)
+            return True
+        except Exception as e:
+            from logging import getLogger
+            getLogger("settings").error(f"Ошибка изменения параметра '{path}' в настройках '{name}': {e}")
+            return False
+
+    @staticmethod
+    def get_item(name: str, key: str | int, default=None, data: list[SettingsFile] = DATA):
+        """
+        Получает одну запись файла настроек (ключ словаря или индекс списка).
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка.
+        :type key: `str` or `int`
+
+        :param default: Значение, если записи нет.
+
+        :return: Копия значения записи.
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            value = _load_cached(file)
+            if isinstance(value, list):
+                return copy_json(value[int(key)])
+            return copy_json(value[key]) if key in value else default
+        except (IndexError, ValueError):
+            return default
+        except Exception as e:
+            from logging import getLogger
+            getLogger("settings").error(f"Ошибка чтения записи '{key}' настроек '{name}': {e}")
+            return default
+
+    @staticmethod
+    def set_item(name: str, key: str | int, value, data: list[SettingsFile] = DATA) -> bool:
+        """
+        Добавляет или заменяет одну запись файла настроек.
+        При хранении в SQLite перезаписывается только эта запись.
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка (индекс, равный длине списка, добавляет запись в конец).
+        :type key: `str` or `int`
+
+        :param value: Значение записи.
+
+        :return: True, если запись сохранена.
+        :rtype: `bool`
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            return _store_item(file, key, value)
+        except Exception as e:
+            from logging import getLogger
+            getLogger("settings").error(f"Ошибка сохранения записи '{key}' настроек '{name}': {e}", exc_info=True)
+            return False
+
+    @staticmethod
+    def delete_item(name: str, key: str | int, data: list[SettingsFile] = DATA) -> bool:
+        """
+        Удаляет одну запись файла настроек.
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка.
+        :type key: `str` or `int`
+
+        :return: True, если запись была удалена.
+        :rtype: `bool`
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            return _store_item(file, key, None, delete=True)
+        except Exception as e:
+            from logging import getLogger
+            getLogger("settings").error(f"Ошибка удаления записи '{key}' настроек '{name}': {e}", exc_info=True)
+            return False
+
+    @staticmethod
+    def version(name: str, data: list[SettingsFile] = DATA) -> int:
+        """
+        Возвращает номер версии файла настроек в кэше.
+        Номер меняется при каждом изменении файла (в том числе внешнем).
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :return: Номер версии.
+        :rtype: `int`
+        """
+        file = [file for file in data if file.name == name][0]
+        with _cache_lock:
+            _load_cached(file)
+            return _cache[file.path].version
+
+    @staticmethod
+    def transaction(name: str, data: list[SettingsFile] = DATA) -> SettingsTransaction:
+        """
+        Открывает транзакцию над файлом настроек.
+        Внутри блока можно свободно изменять полученные данные, при выходе они сохраняются.
+        Если файл успели изменить в другом потоке, изменения объединяются по параметрам;
+        при изменении одного параметра с обеих сторон выбрасывается `SettingsConflictError`.
+
+            with Settings.transaction("config") as config:
+                config["playerok"]["auto_raise_items"]["enabled"] = True
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :return: Транзакция (контекстный менеджер).
+        :rtype: `settings.SettingsTransaction`
+        """
+        file = [file for file in data if file.name == name][0]
+        return SettingsTransaction(file)
+
+    @staticmethod
+    def modify(name: str, func: callable, retries: int = 5, data: list[SettingsFile] = DATA):
+        """
+        Изменяет файл настроек функцией с оптимистичными повторами:
+        если файл успели изменить, пока работала функция, она вызывается заново
+        на свежей версии (не более `retries` раз).
+
+            Settings.modify("config", lambda config: config["telegram"]["bot"]["signed_users"].append(user_id))
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param func: Функция, изменяющая данные на месте или возвращающая новые данные.
+        :type func: `callable`
+
+        :param retries: Количество повторов при параллельном изменении.
+        :type retries: `int`
+
+        :return: Сохранённые данные.
+
+        :raises SettingsConflictError: Если не удалось сохранить за отведённые повторы.
+        """
+        file = [file for file in data if file.name == name][0]
+        for _ in range(retries + 1):
+            with _cache_lock:
+                base = _load_cached(file)
+                version = _cache[file.path].version
+            value = copy_json(base)
+            result = func(value)
+            if result is not None:
+                value = result
+            with _cache_lock:
+                _load_cached(file)
+                if _cache[file.path].version == version:
+                    _store_cached(file, value)
+                    return copy_json(value)
+        raise SettingsConflictError(f"Не удалось сохранить настройки '{name}': файл постоянно изменяется")
+
+    @staticmethod
+    def subscribe(name: str, path: str | list | tuple, callback: callable,
+                  loop: asyncio.AbstractEventLoop | None = None) -> Subscription:
+        """
+        Подписывает на изменения параметров файла настроек.
+        Колбэк получает `settings.SettingsChange` для каждого изменённого параметра внутри пути.
+        Обычная функция вызывается в потоке, который изменил настройки;
+        корутина планируется в переданный loop (по умолчанию - в loop, из которого подписались).
+
+            Settings.subscribe("config", "playerok.auto_raise_items", on_auto_raise_changed)
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :param path: Путь к параметру или секции. Пустая строка - весь файл.
+        :type path: `str` or `list` or `tuple`
+
+        :param callback: Функция или корутина `callback(change)`.
+        :type callback: `callable`
+
+        :param loop: Event loop для асинхронного колбэка, _опционально_.
+        :type loop: `asyncio.AbstractEventLoop` or `None`
+
+        :return: Подписка (нужна для отписки).
+        :rtype: `settings.Subscription`
+        """
+        if loop is None and asyncio.iscoroutinefunction(callback):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        sub = Subscription(name, _split_path(path), callback, loop)
+        with _subscribers_lock:
+            _subscribers.setdefault(name, []).append(sub)
+        return sub
+
+    @staticmethod
+    def unsubscribe(sub: Subscription):
+        """
+        Отменяет подписку на изменения настроек.
+
+        :param sub: Подписка, полученная из `Settings.subscribe`.
+        :type sub: `settings.Subscription`
+        """
+        with _subscribers_lock:
+            subs = _subscribers.get(sub.name, [])
+            if sub in subs:
+                subs.remove(sub)
+
+    @staticmethod
+    def view(name: str, data: list[SettingsFile] = DATA):
+        """
+        Возвращает неизменяемое представление файла настроек с доступом через атрибуты.
+        Представление строится один раз на версию файла и может свободно передаваться
+        между потоками. Для изменения настроек используйте `Settings.get`/`Settings.set`.
+
+        :param name: Название файла настроек.
+        :type name: `str`
+
+        :return: Представление настроек или `None` при ошибке.
+        :rtype: `settings_schema.SettingsView` or `None`
+        """
+        try:
+            file = [file for file in data if file.name == name][0]
+            with _cache_lock:
+                value = _load_cached(file)
+                entry = _cache[file.path]
+                if entry.view is None:
+                    schema = SCHEMAS.get(file.name)
+                    entry.view = schema.view(value) if schema and isinstance(value, dict) else freeze(value)
+                return entry.view
+        except Exception as e:
+            from logging import getLogger
+            getLogger("settings").error(f"Ошибка чтения настроек '{name}': {e}")
+            return None
+
+    @staticmethod
+    def invalidate(name: str | None = None, data: list[SettingsFile] = DATA):
+        """
+        Сбрасывает кэш настроек.
+
+        :param name: Название файла настроек. Если не указано - сбрасывается весь кэш.
+        :type name: `str` or `None`
+        """
+        with _cache_lock:
+            if name is None:
+                file_writer.flush()
+                _cache.clear()
+                return
+            for file in data:
+                if file.name == name:
+                    file_writer.flush(file.path)
+                    _cache.pop(file.path, None)
+
+    @staticmethod
+    def cache_info() -> dict:
+        """
+        Возвращает статистику кэша настроек.
+
+        :return: Словарь с количеством попаданий, промахов и файлов в кэше.
+        :rtype: `dict`
+        """
+        with _cache_lock:
+            return {
+                "hits": _cache_stats["hits"],
+                "misses": _cache_stats["misses"],
+                "entries": len(_cache)
+            }
\ No newline at end of file
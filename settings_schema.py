@@ -0,0 +1,185 @@
+"""
+Скомпилированные схемы файлов настроек для Seal Playerok Bot.
+Стандартные шаблоны из `settings.py` один раз компилируются в дерево узлов,
+которое проверяет и восстанавливает загруженный файл за один проход
+и строит неизменяемые представления с доступом через атрибуты:
+
+    config = Settings.view("config")
+    config.playerok.auto_raise_items.interval_hours
+"""
+import keyword
+from types import MappingProxyType
+
+from file_writer import copy_json
+
+
+class SettingsView:
+    """
+    Базовый класс неизменяемых представлений настроек.
+    Конкретные классы со слотами под ключи шаблона создаются при компиляции схемы.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Представление настроек «{type(self).__name__}» нельзя изменять")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Представление настроек «{type(self).__name__}» нельзя изменять")
+
+    def __getitem__(self, key: str):
+        try:
+            return object.__getattribute__(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={self[key]!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def _asdict(self) -> dict:
+        """Возвращает изменяемую копию представления в виде словаря."""
+        return {key: _thaw(self[key]) for key in self.__slots__}
+
+
+class SchemaNode:
+    """
+    Узел схемы, построенный из словаря стандартного шаблона.
+
+    :param default: Словарь стандартного шаблона.
+    :type default: `dict`
+
+    :param name: Имя узла (используется в имени класса представления).
+    :type name: `str`
+    """
+    __slots__ = ("default", "children", "view_class")
+
+    def __init__(self, default: dict, name: str = "Settings"):
+        self.default = default
+        self.children: dict[str, SchemaNode] = {
+            key: SchemaNode(value, f"{name}_{key}")
+            for key, value in default.items()
+            if isinstance(value, dict) and value
+        }
+        self.view_class = None
+        keys = tuple(default.keys())
+        if all(isinstance(key, str) and key.isidentifier() and not keyword.iskeyword(key) for key in keys):
+            self.view_class = type(f"{name}View", (SettingsView,), {"__slots__": keys})
+
+    def validate(self, config) -> bool:
+        """
+        Проверяет структуру данных на соответствие шаблону.
+
+        :param config: Проверяемые данные.
+        :type config: `dict`
+
+        :return: True если структура валидна, иначе False.
+        :rtype: `bool`
+        """
+        if not isinstance(config, dict):
+            return False
+        for key, value in self.default.items():
+            if key not in config or type(config[key]) is not type(value):
+                return False
+            child = self.children.get(key)
+            if child is not None and not child.validate(config[key]):
+                return False
+        return True
+
+    def repair(self, config: dict) -> tuple[dict, bool]:
+        """
+        Восстанавливает недостающие параметры из шаблона за один проход.
+        Возвращает новый словарь, исходный не изменяется. Лишние параметры
+        и параметры с другим типом сохраняются, как и в `settings.restore_config`.
+
+        :param config: Загруженные данные.
+        :type config: `dict`
+
+        :return: Восстановленные данные и флаг, были ли изменения.
+        :rtype: `tuple[dict, bool]`
+        """
+        result = {}
+        changed = False
+        for key, value in config.items():
+            child = self.children.get(key)
+            if child is not None and isinstance(value, dict):
+                value, child_changed = child.repair(value)
+                changed = changed or child_changed
+            else:
+                value = copy_json(value)
+            result[key] = value
+        for key, value in self.default.items():
+            if key not in result:
+                result[key] = copy_json(value)
+                changed = True
+        return result, changed
+
+    def view(self, config: dict):
+        """
+        Строит неизменяемое представление данных.
+        Списки превращаются в кортежи, словари вне шаблона - в `MappingProxyType`.
+
+        :param config: Данные, прошедшие `repair`.
+        :type config: `dict`
+
+        :return: Представление с доступом через атрибуты.
+        :rtype: `settings_schema.SettingsView` or `types.MappingProxyType`
+        """
+        if self.view_class is None or not all(key in config for key in self.default):
+            return freeze(config)
+        view = object.__new__(self.view_class)
+        for key in self.view_class.__slots__:
+            value = config[key]
+            child = self.children.get(key)
+            if child is not None and isinstance(value, dict):
+                value = child.view(value)
+            else:
+                value = freeze(value)
+            object.__setattr__(view, key, value)
+        return view
+
+
+_schemas: dict[int, SchemaNode] = {}
+
+
+def compile_schema(default: dict, name: str = "Settings") -> SchemaNode:
+    """
+    Компилирует схему из стандартного шаблона (один раз на шаблон).
+
+    :param default: Стандартный шаблон файла.
+    :type default: `dict`
+
+    :param name: Имя схемы.
+    :type name: `str`
+
+    :return: Корневой узел схемы.
+    :rtype: `settings_schema.SchemaNode`
+    """
+    schema = _schemas.get(id(default))
+    if schema is None or schema.default is not default:
+        schema = _schemas[id(default)] = SchemaNode(default, name)
+    return schema
+
+
+def freeze(value):
+    """
+    Делает неизменяемую копию JSON-совместимых данных:
+    словари превращаются в `MappingProxyType`, списки - в кортежи.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, SettingsView):
+        return value._asdict()
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
@@ -0,0 +1,345 @@
+"""
+Хранилище настроек и данных в SQLite для Seal Playerok Bot.
+Включается переменной окружения SEAL_STORAGE_BACKEND=sqlite.
+
+Каждый файл настроек или данных хранится как набор записей (ключ словаря
+или индекс списка → JSON значения), поэтому одну запись можно прочитать
+или изменить, не перезаписывая весь файл. База работает в режиме WAL.
+
+Перенос из JSON и обратно:
+    python sqlite_storage.py import
+    python sqlite_storage.py export [папка]
+"""
+import os
+import sqlite3
+import threading
+from logging import getLogger
+
+# Импорт путей из центрального модуля
+import paths
+import json_codec
+
+
+logger = getLogger("seal.sqlite_storage")
+
+BACKEND_ENV = "SEAL_STORAGE_BACKEND"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS records (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_position ON records (name, position);
+"""
+
+
+class SqliteStorage:
+    """
+    Хранилище документов (файлов настроек и данных) в SQLite.
+
+    :param path: Путь к файлу базы данных.
+    :type path: `str`
+    """
+
+    def __init__(self, path: str = paths.STORAGE_DB_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+    def version(self, name: str) -> int | None:
+        """
+        Возвращает номер версии документа (растёт при каждом изменении).
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :return: Версия или `None`, если документа нет.
+        :rtype: `int` or `None`
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM documents WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, name: str) -> dict | list | None:
+        """
+        Собирает документ целиком.
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :return: Данные документа или `None`, если документа нет.
+        :rtype: `dict` or `list` or `None`
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT kind FROM documents WHERE name = ?", (name,)).fetchone()
+            if not row:
+                return None
+            rows = self._conn.execute(
+                "SELECT key, value FROM records WHERE name = ? ORDER BY position", (name,)
+            ).fetchall()
+        if row[0] == "list":
+            return [json_codec.loads(value) for _, value in rows]
+        return {key: json_codec.loads(value) for key, value in rows}
+
+    def save(self, name: str, value: dict | list) -> int:
+        """
+        Полностью заменяет документ.
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :param value: Новые данные.
+        :type value: `dict` or `list`
+
+        :return: Новая версия документа.
+        :rtype: `int`
+        """
+        if isinstance(value, list):
+            kind, items = "list", [(str(i), item) for i, item in enumerate(value)]
+        else:
+            kind, items = "dict", list(value.items())
+        rows = [(name, str(key), i, json_codec.dumps(item).decode("utf-8")) for i, (key, item) in enumerate(items)]
+        with self._lock:
+            with self._transaction():
+                self._conn.execute("DELETE FROM records WHERE name = ?", (name,))
+                self._conn.executemany("INSERT INTO records (name, key, position, value) VALUES (?, ?, ?, ?)", rows)
+                return self._bump(name, kind)
+
+    def get_item(self, name: str, key: str | int, default=None):
+        """
+        Получает одну запись документа.
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка.
+        :type key: `str` or `int`
+
+        :param default: Значение, если записи нет.
+
+        :return: Значение записи.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM records WHERE name = ? AND key = ?", (name, str(key))
+            ).fetchone()
+        return json_codec.loads(row[0]) if row else default
+
+    def set_item(self, name: str, key: str | int, value, kind: str = "dict") -> int:
+        """
+        Добавляет или заменяет одну запись документа.
+        Новая запись встаёт в конец документа.
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка.
+        :type key: `str` or `int`
+
+        :param value: Значение записи.
+
+        :param kind: Тип документа, если его ещё нет (`dict` или `list`).
+        :type kind: `str`
+
+        :return: Новая версия документа.
+        :rtype: `int`
+        """
+        data = json_codec.dumps(value).decode("utf-8")
+        with self._lock:
+            with self._transaction():
+                updated = self._conn.execute(
+                    "UPDATE records SET value = ? WHERE name = ? AND key = ?", (data, name, str(key))
+                ).rowcount
+                if not updated:
+                    self._conn.execute(
+                        "INSERT INTO records (name, key, position, value) VALUES (?, ?, "
+                        "(SELECT COALESCE(MAX(position), -1) + 1 FROM records WHERE name = ?), ?)",
+                        (name, str(key), name, data)
+                    )
+                return self._bump(name, kind)
+
+    def delete_item(self, name: str, key: str | int) -> bool:
+        """
+        Удаляет одну запись документа.
+        У документов-списков индексы остальных записей сдвигаются.
+
+        :param name: Название документа.
+        :type name: `str`
+
+        :param key: Ключ словаря или индекс списка.
+        :type key: `str` or `int`
+
+        :return: True, если запись была удалена.
+        :rtype: `bool`
+        """
+        with self._lock:
+            with self._transaction():
+                row = self._conn.execute(
+                    "SELECT position FROM records WHERE name = ? AND key = ?", (name, str(key))
+                ).fetchone()
+                if not row:
+                    return False
+                self._conn.execute("DELETE FROM records WHERE name = ? AND key = ?", (name, str(key)))
+                kind = self._conn.execute("SELECT kind FROM documents WHERE name = ?", (name,)).fetchone()
+                if kind and kind[0] == "list":
+                    rows = self._conn.execute(
+                        "SELECT key, value FROM records WHERE name = ? AND position > ? ORDER BY position",
+                        (name, row[0])
+                    ).fetchall()
+                    self._conn.execute("DELETE FROM records WHERE name = ? AND position > ?", (name, row[0]))
+                    self._conn.executemany(
+                        "INSERT INTO records (name, key, position, value) VALUES (?, ?, ?, ?)",
+                        [(name, str(row[0] + i), row[0] + i, value) for i, (_, value) in enumerate(rows)]
+                    )
+                self._bump(name, kind[0] if kind else "dict")
+                return True
+
+    def count(self, name: str) -> int:
+        """Возвращает количество записей документа."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records WHERE name = ?", (name,)).fetchone()[0]
+
+    def _bump(self, name: str, kind: str) -> int:
+        self._conn.execute(
+            "INSERT INTO documents (name, kind, version) VALUES (?, ?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            (name, kind)
+        )
+        return self._conn.execute("SELECT version FROM documents WHERE name = ?", (name,)).fetchone()[0]
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+_storage: SqliteStorage | None = None
+_storage_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """Выбрано ли хранилище SQLite (переменная окружения SEAL_STORAGE_BACKEND=sqlite)."""
+    return os.environ.get(BACKEND_ENV, "json").strip().lower() == "sqlite"
+
+
+def get_storage() -> SqliteStorage | None:
+    """
+    Возвращает общее хранилище SQLite.
+    При первом открытии пустой базы в неё переносятся существующие JSON файлы.
+
+    :return: Хранилище или `None`, если используется JSON.
+    :rtype: `sqlite_storage.SqliteStorage` or `None`
+    """
+    global _storage
+    if not is_enabled():
+        return None
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                storage = SqliteStorage()
+                with storage._lock:
+                    empty = storage._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+                if empty:
+                    import_json(storage, _all_files())
+                _storage = storage
+    return _storage
+
+
+def import_json(storage: SqliteStorage, files: list) -> int:
+    """
+    Переносит JSON файлы в SQLite. Документы, которые уже есть в базе, не трогаются.
+    Исходные JSON файлы остаются на месте.
+
+    :param storage: Хранилище.
+    :type storage: `sqlite_storage.SqliteStorage`
+
+    :param files: Файлы настроек и данных (объекты с полями `name` и `path`).
+    :type files: `list`
+
+    :return: Количество перенесённых файлов.
+    :rtype: `int`
+    """
+    imported = 0
+    for file in files:
+        if storage.version(file.name) is not None or not os.path.exists(file.path):
+            continue
+        try:
+            value = json_codec.load_file(file.path)
+            storage.save(file.name, value)
+            imported += 1
+            logger.info(f"Файл {file.path} перенесён в SQLite")
+        except Exception as e:
+            logger.error(f"Не удалось перенести {file.path} в SQLite: {e}")
+    return imported
+
+
+def export_json(storage: SqliteStorage, files: list, folder: str | None = None) -> int:
+    """
+    Выгружает документы из SQLite обратно в JSON файлы.
+
+    :param storage: Хранилище.
+    :type storage: `sqlite_storage.SqliteStorage`
+
+    :param files: Файлы настроек и данных (объекты с полями `name` и `path`).
+    :type files: `list`
+
+    :param folder: Папка для выгрузки. Если не указана - файлы пишутся на свои места.
+    :type folder: `str` or `None`
+
+    :return: Количество выгруженных файлов.
+    :rtype: `int`
+    """
+    import file_writer
+    exported = 0
+    for file in files:
+        value = storage.load(file.name)
+        if value is None:
+            continue
+        path = os.path.join(folder, os.path.basename(file.path)) if folder else file.path
+        file_writer.write_file(path, json_codec.dumps(value, pretty=True))
+        exported += 1
+    return exported
+
+
+def _all_files() -> list:
+    import settings
+    import data
+    return settings.DATA + data.DATA
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    storage = SqliteStorage()
+    if command == "import":
+        print(f"Перенесено файлов: {import_json(storage, _all_files())}")
+    elif command == "export":
+        print(f"Выгружено файлов: {export_json(storage, _all_files(), sys.argv[2] if len(sys.argv) > 2 else None)}")
+    else:
+        print("Использование: python sqlite_storage.py import | export [папка]")
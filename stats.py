@@ -0,0 +1,420 @@
+"""
+Статистика сделок и заработка для Seal Playerok Bot.
+
+Каждое событие сделки дописывается одной строкой в журнал `stats_journal.log`
+и сразу учитывается в агрегатах по часам, дням и месяцам (`stats_rollups.json`).
+Фоновый уплотнитель периодически сохраняет агрегаты, переносит журнал
+в архив `stats_history.log` и очищает его, поэтому запись события не зависит
+от размера истории магазина, а просмотр статистики читает только агрегаты.
+Из архива удаляются события старше `DAYS_RETENTION` дней, когда он вырастает
+больше `HISTORY_TRIM_SIZE`.
+
+Итоги из `stats.json` старого формата один раз переносятся в общие агрегаты,
+сам файл не изменяется.
+"""
+import os
+import time
+import threading
+from logging import getLogger
+
+# Импорт путей из центрального модуля
+import paths
+import json_codec
+import file_writer
+
+
+logger = getLogger("seal.stats")
+
+STATS_VERSION = 1
+COMPACT_INTERVAL = 300     # Период фонового уплотнения журнала (сек)
+COMPACT_THRESHOLD = 1000   # Уплотнять раньше, если в журнале столько событий
+HOURS_RETENTION = 24 * 14  # Сколько последних часов хранить в почасовых агрегатах
+DAYS_RETENTION = 731       # Сколько последних дней хранить в подневных агрегатах и в архиве событий
+HISTORY_TRIM_SIZE = 64 * 1024 * 1024  # С какого размера архива (байт) удалять из него старые события
+LEGACY_TOTALS = {          # Итоги stats.json старого формата: {поле старого формата: поле агрегата}
+    "deals_completed": "completed",
+    "deals_refunded": "refunded",
+    "earned_money": "earnings",
+    "refunded_money": "refunded_amount",
+}
+
+PERIODS = {
+    "hour": "%Y-%m-%d %H",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+
+def _empty_bucket() -> dict:
+    return {"deals": 0, "earnings": 0.0, "completed": 0, "refunded": 0, "refunded_amount": 0.0}
+
+
+def _fold(bucket: dict, status: str, amount: float):
+    bucket["deals"] += 1
+    if status == "completed":
+        bucket["completed"] += 1
+        bucket["earnings"] = round(bucket["earnings"] + amount, 2)
+    elif status == "refunded":
+        bucket["refunded"] += 1
+        bucket["refunded_amount"] = round(bucket["refunded_amount"] + amount, 2)
+
+
+class StatsJournal:
+    """
+    Журнал событий сделок с агрегатами по периодам.
+
+    :param stats_path: Путь к файлу агрегатов.
+    :type stats_path: `str`
+
+    :param journal_path: Путь к журналу событий.
+    :type journal_path: `str`
+
+    :param history_path: Путь к архиву событий.
+    :type history_path: `str`
+
+    :param legacy_path: Путь к файлу статистики старого формата.
+    :type legacy_path: `str`
+    """
+
+    def __init__(self, stats_path: str = paths.STATS_ROLLUPS_FILE,
+                 journal_path: str = paths.STATS_JOURNAL_FILE,
+                 history_path: str = paths.STATS_HISTORY_FILE,
+                 legacy_path: str = paths.STATS_FILE):
+        self.stats_path = stats_path
+        self.journal_path = journal_path
+        self.history_path = history_path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._dirty = False  # Есть изменения, не сохранённые уплотнением
+        self._journal_events = 0
+        self._seq = 0
+        self._rollups = self._new_rollups()
+        self._load()
+
+    def record(self, deal_id: str, amount: float, status: str = "completed",
+               item: str | None = None, timestamp: float | None = None) -> dict:
+        """
+        Записывает событие сделки в журнал и учитывает его в агрегатах.
+
+        :param deal_id: ID сделки.
+        :type deal_id: `str`
+
+        :param amount: Сумма сделки.
+        :type amount: `float`
+
+        :param status: Статус сделки (`completed`, `refunded` и т.п.).
+        :type status: `str`
+
+        :param item: Название или ID товара.
+        :type item: `str` or `None`
+
+        :param timestamp: Время события, по умолчанию - сейчас.
+        :type timestamp: `float` or `None`
+
+        :return: Записанное событие.
+        :rtype: `dict`
+        """
+        with self._lock:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "ts": time.time() if timestamp is None else float(timestamp),
+                "deal": str(deal_id),
+                "item": item,
+                "amount": float(amount),
+                "status": status
+            }
+            with open(self.journal_path, "ab") as f:
+                f.write(json_codec.dumps(event) + b"\n")
+            self._journal_events += 1
+            self._apply(event)
+            self._dirty = True
+            if self._journal_events >= COMPACT_THRESHOLD:
+                _wake_compactor()
+            return event
+
+    def get_rollups(self, period: str = "day", limit: int | None = None) -> list[tuple[str, dict]]:
+        """
+        Возвращает агрегаты за период, от старых к новым.
+
+        :param period: Период: `hour`, `day` или `month`.
+        :type period: `str`
+
+        :param limit: Сколько последних периодов вернуть.
+        :type limit: `int` or `None`
+
+        :return: Список пар (период, агрегат).
+        :rtype: `list[tuple[str, dict]]`
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Неизвестный период: {period}")
+        with self._lock:
+            items = sorted(self._rollups[period].items())
+            if limit is not None:
+                items = items[-limit:] if limit > 0 else []
+            return [(key, dict(bucket)) for key, bucket in items]
+
+    def get_summary(self, now: float | None = None) -> dict:
+        """
+        Возвращает сводку для просмотра статистики: за сегодня, 7 дней, текущий месяц и всё время.
+
+        :param now: Текущее время, по умолчанию - сейчас.
+        :type now: `float` or `None`
+
+        :return: Словарь с агрегатами `day`, `week`, `month`, `total`.
+        :rtype: `dict`
+        """
+        now = time.time() if now is None else now
+        week_keys = {time.strftime(PERIODS["day"], time.localtime(now - i * 86400)) for i in range(7)}
+        with self._lock:
+            days = self._rollups["day"]
+            week = _empty_bucket()
+            for key in week_keys:
+                if key in days:
+                    for field, value in days[key].items():
+                        week[field] += value
+            week["earnings"] = round(week["earnings"], 2)
+            week["refunded_amount"] = round(week["refunded_amount"], 2)
+            return {
+                "day": dict(days.get(time.strftime(PERIODS["day"], time.localtime(now)), _empty_bucket())),
+                "week": week,
+                "month": dict(self._rollups["month"].get(time.strftime(PERIODS["month"], time.localtime(now)), _empty_bucket())),
+                "total": dict(self._rollups["total"])
+            }
+
+    def compact(self) -> bool:
+        """
+        Сохраняет агрегаты, переносит журнал в архив и очищает его.
+        Номер последнего учтённого события хранится в агрегатах,
+        поэтому при сбое посреди уплотнения события не будут учтены дважды.
+        Если с прошлого уплотнения ничего не изменилось, ничего не пишется.
+
+        :return: True, если что-то было сохранено.
+        :rtype: `bool`
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._prune()
+            raw = b""
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "rb") as f:
+                    raw = f.read()
+            if raw:
+                with open(self.history_path, "ab") as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._rollups["last_seq"] = self._seq
+            file_writer.write_file(self.stats_path, json_codec.dumps(self._rollups, json_codec.PRETTY_DATA))
+            if raw:
+                with open(self.journal_path, "wb"):
+                    pass
+            self._journal_events = 0
+            self._dirty = False
+            self._trim_history()
+            return True
+
+    @property
+    def journal_size(self) -> int:
+        """Количество событий в журнале с последнего уплотнения."""
+        return self._journal_events
+
+    def _new_rollups(self) -> dict:
+        return {"version": STATS_VERSION, "last_seq": 0, "total": _empty_bucket(),
+                **{period: {} for period in PERIODS}}
+
+    def _apply(self, event: dict):
+        local = time.localtime(event["ts"])
+        for period, fmt in PERIODS.items():
+            key = time.strftime(fmt, local)
+            bucket = self._rollups[period].get(key)
+            if bucket is None:
+                bucket = self._rollups[period][key] = _empty_bucket()
+            _fold(bucket, event["status"], event["amount"])
+        _fold(self._rollups["total"], event["status"], event["amount"])
+
+    def _prune(self):
+        for period, retention in (("hour", HOURS_RETENTION), ("day", DAYS_RETENTION)):
+            buckets = self._rollups[period]
+            if len(buckets) > retention:
+                for key in sorted(buckets)[:len(buckets) - retention]:
+                    del buckets[key]
+
+    def _trim_history(self):
+        # Архив переписывается целиком (атомарно), поэтому только когда он вырос
+        # и в его начале действительно есть события старше срока хранения
+        try:
+            if os.path.getsize(self.history_path) < HISTORY_TRIM_SIZE:
+                return
+        except OSError:
+            return
+        cutoff = time.time() - DAYS_RETENTION * 86400
+        with open(self.history_path, "rb") as f:
+            first = f.readline()
+            try:
+                if json_codec.loads(first)["ts"] >= cutoff:
+                    return
+            except Exception:
+                pass
+            kept = [first] if first.endswith(b"\n") and _event_ts(first) >= cutoff else []
+            kept.extend(line for line in f if line.endswith(b"\n") and _event_ts(line) >= cutoff)
+        file_writer.write_file(self.history_path, b"".join(kept))
+        logger.info(f"Из архива статистики удалены события старше {DAYS_RETENTION} дней")
+
+    def _load_legacy(self):
+        # Итоги stats.json старого формата учитываются один раз: дальше агрегаты хранятся отдельно.
+        # Агрегаты, которые раньше хранились в stats.json (или были отложены в stats.json.legacy),
+        # подхватываются как есть
+        for path in (f"{self.legacy_path}.legacy", self.legacy_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                legacy = json_codec.load_file(path)
+            except Exception as e:
+                logger.error(f"Не удалось прочитать {path}: {e}")
+                continue
+            if not isinstance(legacy, dict):
+                continue
+            if legacy.get("version") == STATS_VERSION and isinstance(legacy.get("total"), dict):
+                self._rollups = legacy
+            else:
+                total = self._rollups["total"]
+                for old_field, field in LEGACY_TOTALS.items():
+                    try:
+                        value = legacy.get(old_field) or 0
+                        total[field] += round(float(value), 2) if field.endswith(("earnings", "amount")) else int(value)
+                    except (TypeError, ValueError):
+                        continue
+                total["deals"] = total["completed"] + total["refunded"]
+            self._dirty = True
+            logger.info(f"Статистика перенесена из {path} в {self.stats_path}")
+            return
+
+    def _load(self):
+        rollups = None
+        if os.path.exists(self.stats_path):
+            try:
+                rollups = json_codec.load_file(self.stats_path)
+            except Exception as e:
+                logger.error(f"Не удалось прочитать {self.stats_path}: {e}")
+            if not (isinstance(rollups, dict) and rollups.get("version") == STATS_VERSION):
+                # Испорченный файл не перезаписываем: агрегаты собираются заново из архива
+                corrupt_path = f"{self.stats_path}.corrupt"
+                os.replace(self.stats_path, corrupt_path)
+                logger.warning(f"Агрегаты статистики перенесены в {corrupt_path} и будут собраны из архива")
+                rollups = None
+        if rollups is not None:
+            self._rollups = rollups
+        else:
+            self._load_legacy()
+            self._rebuild_from_history()
+        self._seq = self._rollups["last_seq"]
+        self._replay(self.journal_path, count=True)
+
+    def _rebuild_from_history(self):
+        # Без сохранённых агрегатов события архива учитываются заново, а нумерация
+        # продолжается с последнего номера в архиве, а не с нуля
+        self._seq = self._rollups["last_seq"]
+        self._replay(self.history_path)
+        self._rollups["last_seq"] = self._seq
+
+    def _replay(self, path: str, count: bool = False):
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    event = json_codec.loads(line)
+                except Exception:
+                    continue  # Недописанная строка при сбое
+                if count:
+                    self._journal_events += 1
+                # Уже учтено в агрегатах (или записано в архив дважды при сбое)
+                if event["seq"] <= self._seq or event["seq"] <= self._rollups["last_seq"]:
+                    continue
+                self._seq = event["seq"]
+                self._apply(event)
+                self._dirty = True
+
+
+def _event_ts(line: bytes) -> float:
+    try:
+        return float(json_codec.loads(line)["ts"])
+    except Exception:
+        return 0.0
+
+
+_journal: StatsJournal | None = None
+_journal_lock = threading.Lock()
+_compactor: threading.Thread | None = None
+_compactor_wake = threading.Event()
+
+
+def get_stats_journal() -> StatsJournal:
+    """
+    Возвращает общий журнал статистики.
+
+    :return: Журнал статистики.
+    :rtype: `stats.StatsJournal`
+    """
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                os.makedirs(paths.BOT_DATA_DIR, exist_ok=True)
+                _journal = StatsJournal()
+    return _journal
+
+
+def record_deal(deal_id: str, amount: float, status: str = "completed",
+                item: str | None = None, timestamp: float | None = None) -> dict:
+    """Записывает событие сделки в общий журнал статистики. См. `StatsJournal.record`."""
+    return get_stats_journal().record(deal_id, amount, status, item, timestamp)
+
+
+def get_rollups(period: str = "day", limit: int | None = None) -> list[tuple[str, dict]]:
+    """Возвращает агрегаты общего журнала статистики. См. `StatsJournal.get_rollups`."""
+    return get_stats_journal().get_rollups(period, limit)
+
+
+def get_summary() -> dict:
+    """Возвращает сводку общего журнала статистики. См. `StatsJournal.get_summary`."""
+    return get_stats_journal().get_summary()
+
+
+def _wake_compactor():
+    _compactor_wake.set()
+
+
+def _run_compactor(interval: float):
+    while True:
+        _compactor_wake.wait(interval)
+        _compactor_wake.clear()
+        try:
+            get_stats_journal().compact()
+        except Exception as e:
+            logger.error(f"Ошибка при уплотнении журнала статистики: {e}")
+
+
+def start_compactor(interval: float = COMPACT_INTERVAL):
+    """
+    Запускает фоновый поток уплотнения журнала статистики.
+
+    :param interval: Период уплотнения в секундах.
+    :type interval: `float`
+    """
+    global _compactor
+    if _compactor is not None and _compactor.is_alive():
+        return
+    _compactor = threading.Thread(target=_run_compactor, args=(interval,), name="seal-stats-compactor", daemon=True)
+    _compactor.start()
+
+
+def flush():
+    """Уплотняет журнал статистики, если он был открыт (вызывается при завершении работы)."""
+    if _journal is not None:
+        try:
+            _journal.compact()
+        except Exception as e:
+            logger.error(f"Ошибка при уплотнении журнала статистики: {e}")
@@ -0,0 +1,328 @@
+"""
+Запросы к истории сделок для Seal Playerok Bot.
+
+История событий из журнала статистики (`stats_history.log` и `stats_journal.log`)
+загружается лениво в колонки NumPy: время, сумма, код товара, код статуса.
+Группировки, перцентили и ряды по периодам считаются векторно,
+поэтому запросы вроде «заработок по товарам за 90 дней» остаются быстрыми
+на сотнях тысяч сделок.
+"""
+import os
+import time
+import threading
+from logging import getLogger
+
+import numpy as np
+
+# Импорт путей из центрального модуля
+import paths
+import json_codec
+
+
+logger = getLogger("seal.stats_query")
+
+BUCKETS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 86400 * 7,
+}
+
+
+class _Columns:
+    """Колонки событий одного файла журнала."""
+
+    def __init__(self):
+        self.seq = np.empty(0, dtype=np.int64)
+        self.ts = np.empty(0, dtype=np.float64)
+        self.amount = np.empty(0, dtype=np.float64)
+        self.item = np.empty(0, dtype=np.int32)
+        self.status = np.empty(0, dtype=np.int8)
+
+
+class DealHistory:
+    """
+    Колоночное представление истории сделок.
+
+    :param history_path: Путь к архиву событий.
+    :type history_path: `str`
+
+    :param journal_path: Путь к журналу событий с последнего уплотнения.
+    :type journal_path: `str`
+    """
+
+    def __init__(self, history_path: str = paths.STATS_HISTORY_FILE,
+                 journal_path: str = paths.STATS_JOURNAL_FILE):
+        self.history_path = history_path
+        self.journal_path = journal_path
+        self.items: list[str | None] = []
+        self.statuses: list[str] = []
+        self._item_codes: dict[str | None, int] = {}
+        self._status_codes: dict[str, int] = {}
+        self._history = _Columns()
+        self._history_offset = 0
+        self._history_inode = None
+        self._journal_stamp = None
+        self._columns = _Columns()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.refresh().ts)
+
+    def refresh(self) -> _Columns:
+        """
+        Подгружает новые события. Архив дочитывается с последней позиции,
+        журнал (он небольшой) перечитывается целиком, только если изменился.
+
+        :return: Текущие колонки.
+        :rtype: `stats_query._Columns`
+        """
+        with self._lock:
+            changed = False
+            if os.path.exists(self.history_path):
+                st = os.stat(self.history_path)
+                size = st.st_size
+                if size < self._history_offset or st.st_ino != self._history_inode:
+                    # Архив пересоздан (например, из него удалены старые события) - читаем заново
+                    self._history, self._history_offset = _Columns(), 0
+                    self._history_inode = st.st_ino
+                    changed = True
+                if size > self._history_offset:
+                    with open(self.history_path, "rb") as f:
+                        f.seek(self._history_offset)
+                        raw = f.read()
+                    # Недописанную последнюю строку оставляем на следующий раз
+                    raw = raw[:raw.rfind(b"\n") + 1]
+                    self._history_offset += len(raw)
+                    # После сбоя посреди уплотнения журнал мог попасть в архив дважды
+                    self._history = _unique(_concat(self._history, self._parse(raw)))
+                    changed = True
+            stamp = _file_stamp(self.journal_path)
+            if changed or stamp != self._journal_stamp:
+                journal = _Columns()
+                if stamp is not None:
+                    with open(self.journal_path, "rb") as f:
+                        journal = self._parse(f.read())
+                self._journal_stamp = stamp
+                # После сбоя посреди уплотнения события журнала могут уже быть в архиве
+                self._columns = _unique(_concat(self._history, journal))
+            return self._columns
+
+    def mask(self, since: float | None = None, until: float | None = None,
+             status: str | None = "completed", items: list[str] | None = None) -> np.ndarray:
+        """
+        Строит маску событий по условиям.
+
+        :param since: Начало периода (timestamp), включительно.
+        :type since: `float` or `None`
+
+        :param until: Конец периода (timestamp), не включительно.
+        :type until: `float` or `None`
+
+        :param status: Статус сделок, `None` - любой.
+        :type status: `str` or `None`
+
+        :param items: Товары, `None` - любые.
+        :type items: `list[str]` or `None`
+
+        :return: Булева маска по всем событиям.
+        :rtype: `numpy.ndarray`
+        """
+        columns = self.refresh()
+        result = np.ones(len(columns.ts), dtype=bool)
+        if since is not None:
+            result &= columns.ts >= since
+        if until is not None:
+            result &= columns.ts < until
+        if status is not None:
+            code = self._status_codes.get(status)
+            if code is None:
+                return np.zeros(len(columns.ts), dtype=bool)
+            result &= columns.status == code
+        if items is not None:
+            codes = [self._item_codes[item] for item in items if item in self._item_codes]
+            result &= np.isin(columns.item, codes)
+        return result
+
+    def sum_by_item(self, since: float | None = None, until: float | None = None,
+                    status: str | None = "completed") -> dict[str | None, float]:
+        """
+        Считает сумму сделок по каждому товару.
+
+        :return: Словарь {товар: сумма}, отсортированный по убыванию суммы.
+        :rtype: `dict`
+        """
+        columns = self.refresh()
+        mask = self.mask(since, until, status)
+        sums = np.bincount(columns.item[mask], weights=columns.amount[mask], minlength=len(self.items))
+        order = np.argsort(-sums, kind="stable")
+        return {self.items[i]: round(float(sums[i]), 2) for i in order if sums[i]}
+
+    def count_by_item(self, since: float | None = None, until: float | None = None,
+                      status: str | None = "completed") -> dict[str | None, int]:
+        """
+        Считает количество сделок по каждому товару.
+
+        :return: Словарь {товар: количество}, отсортированный по убыванию.
+        :rtype: `dict`
+        """
+        columns = self.refresh()
+        counts = np.bincount(columns.item[self.mask(since, until, status)], minlength=len(self.items))
+        order = np.argsort(-counts, kind="stable")
+        return {self.items[i]: int(counts[i]) for i in order if counts[i]}
+
+    def total(self, since: float | None = None, until: float | None = None,
+              status: str | None = "completed", items: list[str] | None = None) -> tuple[int, float]:
+        """
+        Считает количество и сумму сделок.
+
+        :return: Кортеж (количество, сумма).
+        :rtype: `tuple[int, float]`
+        """
+        columns = self.refresh()
+        mask = self.mask(since, until, status, items)
+        return int(mask.sum()), round(float(columns.amount[mask].sum()), 2)
+
+    def percentiles(self, q: tuple[float, ...] = (50, 90, 99), since: float | None = None,
+                    until: float | None = None, status: str | None = "completed",
+                    items: list[str] | None = None) -> dict[float, float]:
+        """
+        Считает перцентили суммы сделки.
+
+        :param q: Перцентили от 0 до 100.
+        :type q: `tuple[float, ...]`
+
+        :return: Словарь {перцентиль: сумма}. Пустой, если сделок нет.
+        :rtype: `dict[float, float]`
+        """
+        columns = self.refresh()
+        amounts = columns.amount[self.mask(since, until, status, items)]
+        if not len(amounts):
+            return {}
+        return {p: round(float(v), 2) for p, v in zip(q, np.percentile(amounts, q))}
+
+    def series(self, bucket: str = "day", since: float | None = None, until: float | None = None,
+               status: str | None = "completed", items: list[str] | None = None) -> list[tuple[float, int, float]]:
+        """
+        Строит ряд количества и суммы сделок по периодам (в местном времени).
+        Периоды без сделок в ряд не попадают.
+
+        :param bucket: Период: `hour`, `day`, `week` или `month`.
+        :type bucket: `str`
+
+        :return: Список кортежей (начало периода, количество, сумма), от старых к новым.
+        :rtype: `list[tuple[float, int, float]]`
+        """
+        columns = self.refresh()
+        mask = self.mask(since, until, status, items)
+        ts, amount = columns.ts[mask], columns.amount[mask]
+        if not len(ts):
+            return []
+        local = ts + _utc_offsets(ts)
+        if bucket == "month":
+            months = local.astype("datetime64[s]").astype("datetime64[M]")
+            keys, inverse = np.unique(months, return_inverse=True)
+            local_starts = keys.astype("datetime64[s]").astype(np.int64)
+        elif bucket in BUCKETS:
+            size = BUCKETS[bucket]
+            keys, inverse = np.unique(np.floor_divide(local, size).astype(np.int64), return_inverse=True)
+            local_starts = keys * size
+        else:
+            raise ValueError(f"Неизвестный период: {bucket}")
+        # Смещение на начало периода может отличаться от смещения его сделок
+        # (переход на летнее время внутри периода), поэтому уточняется вторым проходом
+        starts = local_starts - _utc_offsets(local_starts - _utc_offsets(local_starts))
+        counts = np.bincount(inverse, minlength=len(keys))
+        sums = np.bincount(inverse, weights=amount, minlength=len(keys))
+        return [(float(s), int(c), round(float(v), 2)) for s, c, v in zip(starts, counts, sums)]
+
+    def _code(self, codes: dict, values: list, value) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _parse(self, raw: bytes) -> _Columns:
+        seq, ts, amount, item, status = [], [], [], [], []
+        for line in raw.splitlines():
+            try:
+                event = json_codec.loads(line)
+            except Exception:
+                continue
+            seq.append(event["seq"])
+            ts.append(event["ts"])
+            amount.append(event["amount"])
+            item.append(self._code(self._item_codes, self.items, event.get("item")))
+            status.append(self._code(self._status_codes, self.statuses, event["status"]))
+        columns = _Columns()
+        columns.seq = np.array(seq, dtype=np.int64)
+        columns.ts = np.array(ts, dtype=np.float64)
+        columns.amount = np.array(amount, dtype=np.float64)
+        columns.item = np.array(item, dtype=np.int32)
+        columns.status = np.array(status, dtype=np.int8)
+        return columns
+
+
+def _file_stamp(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _concat(a: _Columns, b: _Columns) -> _Columns:
+    result = _Columns()
+    for field in ("seq", "ts", "amount", "item", "status"):
+        setattr(result, field, np.concatenate((getattr(a, field), getattr(b, field))))
+    return result
+
+
+def _take(columns: _Columns, mask: np.ndarray) -> _Columns:
+    result = _Columns()
+    for field in ("seq", "ts", "amount", "item", "status"):
+        setattr(result, field, getattr(columns, field)[mask])
+    return result
+
+
+def _utc_offsets(ts: np.ndarray) -> np.ndarray:
+    # Смещение местного времени от UTC на момент каждой метки. Переходы на
+    # летнее время приходятся на границы часов, поэтому localtime вызывается
+    # один раз на каждый встреченный час, а не на каждую сделку
+    hours, inverse = np.unique(np.floor_divide(ts, 3600).astype(np.int64), return_inverse=True)
+    offsets = np.array([time.localtime(int(h) * 3600).tm_gmtoff for h in hours], dtype=np.int64)
+    return offsets[inverse.reshape(-1)]
+
+
+def _unique(columns: _Columns) -> _Columns:
+    # Повторы ищутся по всему массиву, а не только по последнему номеру:
+    # дважды записанный кусок журнала может оказаться в середине архива.
+    # Повтор - совпадение и номера, и времени: номер сам по себе мог быть выдан
+    # повторно (например, после потери файла агрегатов в старых версиях)
+    seq, ts = columns.seq, columns.ts
+    if len(seq) < 2 or bool(np.all(seq[1:] > seq[:-1])):
+        return columns
+    order = np.lexsort((ts, seq))
+    seq, ts = seq[order], ts[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (seq[1:] != seq[:-1]) | (ts[1:] != ts[:-1])
+    return _take(columns, np.sort(order[first]))
+
+
+_history: DealHistory | None = None
+_history_lock = threading.Lock()
+
+
+def get_deal_history() -> DealHistory:
+    """
+    Возвращает общую историю сделок. События загружаются при первом запросе.
+
+    :return: История сделок.
+    :rtype: `stats_query.DealHistory`
+    """
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = DealHistory()
+    return _history
@@ -0,0 +1,403 @@
+"""
+Склад товаров авто-выдачи (ключи, аккаунты) для Seal Playerok Bot.
+
+У каждого правила из `auto_deliveries.json` свой склад в `bot_data/stock/`:
+- `{rule_id}.stock` - товары, по одному JSON-значению на строку, только дописывается;
+- `{rule_id}.cursor` - позиция первого невыданного товара.
+
+Выдача читает одну строку с позиции курсора и атомарно сохраняет новый курсор,
+поэтому стоит O(1) и не перезаписывает ни склад, ни настройки. Выданные товары
+остаются в файле: по ним проверяются дубликаты при загрузке новых.
+В самом `auto_deliveries.json` у правила остаётся только ссылка `"stock": rule_id`.
+
+Товары из старого формата (поле `goods` в правиле) переносятся на склады явно:
+
+    python stock.py migrate
+"""
+import os
+import re
+import sys
+import uuid
+import hashlib
+import threading
+from logging import getLogger
+from typing import Iterable
+
+# Импорт путей из центрального модуля
+import paths
+import json_codec
+import file_writer
+from settings import Settings as sett
+
+
+logger = getLogger("seal.stock")
+
+IMPORT_CHUNK = 1000  # Сколько товаров дописывать за одну запись при загрузке
+RULE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")  # ID правила - часть имени файла
+
+
+class StockStore:
+    """
+    Склад товаров одного правила авто-выдачи.
+
+    :param rule_id: ID правила.
+    :type rule_id: `str`
+
+    :param folder: Папка складов.
+    :type folder: `str`
+
+    :raises ValueError: Если ID правила нельзя использовать в имени файла.
+    """
+
+    def __init__(self, rule_id: str, folder: str = paths.STOCK_DIR):
+        self.rule_id = validate_rule_id(rule_id)
+        self.path = os.path.join(folder, f"{self.rule_id}.stock")
+        self.cursor_path = os.path.join(folder, f"{self.rule_id}.cursor")
+        self.total = 0
+        self.offset = 0
+        self.dispensed = 0
+        self._hashes: set[bytes] | None = None
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+
+    @property
+    def remaining(self) -> int:
+        """Количество невыданных товаров."""
+        return self.total - self.dispensed
+
+    def pop(self, count: int = 1) -> list[str] | None:
+        """
+        Выдаёт товары и сразу сохраняет курсор.
+        Если товаров меньше, чем нужно, ничего не выдаётся.
+
+        :param count: Количество товаров.
+        :type count: `int`
+
+        :return: Список товаров или `None`, если товаров не хватает.
+        :rtype: `list[str]` or `None`
+        """
+        with self._lock:
+            if count < 1 or self.remaining < count:
+                return None
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                items = [json_codec.loads(f.readline()) for _ in range(count)]
+                offset = f.tell()
+            self._commit(offset, self.dispensed + count)
+            after = self.remaining
+        _check_low_stock(self, after + count, after)
+        return items
+
+    def add(self, items: Iterable[str]) -> int:
+        """
+        Дописывает товары в конец склада, пропуская пустые и уже бывшие на складе
+        (в том числе выданные). Итератор читается потоково.
+
+        :param items: Товары.
+        :type items: `Iterable[str]`
+
+        :return: Количество добавленных товаров.
+        :rtype: `int`
+        """
+        added = 0
+        with self._lock:
+            hashes = self._load_hashes()
+            self._repair_tail()
+            with open(self.path, "ab") as f:
+                chunk = []
+                for item in items:
+                    item = str(item).strip()
+                    if not item:
+                        continue
+                    digest = _hash(item)
+                    if digest in hashes:
+                        continue
+                    hashes.add(digest)
+                    chunk.append(json_codec.dumps(item) + b"\n")
+                    if len(chunk) >= IMPORT_CHUNK:
+                        f.write(b"".join(chunk))
+                        added += len(chunk)
+                        chunk = []
+                if chunk:
+                    f.write(b"".join(chunk))
+                    added += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            self.total += added
+        if added:
+            logger.info(f"На склад правила {self.rule_id} добавлено товаров: {added}")
+        return added
+
+    def import_file(self, path: str, encoding: str = "utf-8") -> int:
+        """
+        Загружает товары из текстового файла, по одному на строку.
+        Файл читается потоково, поэтому подходит для сотен тысяч ключей.
+        Сначала файл целиком проверяется на кодировку, поэтому битый файл
+        не загружается частично и не портит ключи заменой символов.
+
+        :param path: Путь к файлу.
+        :type path: `str`
+
+        :param encoding: Кодировка файла.
+        :type encoding: `str`
+
+        :return: Количество добавленных товаров.
+        :rtype: `int`
+
+        :raises UnicodeDecodeError: Если файл не в указанной кодировке.
+        """
+        with open(path, "r", encoding=encoding) as f:
+            for _ in f:
+                pass
+        with open(path, "r", encoding=encoding) as f:
+            return self.add(f)
+
+    def get_stats(self) -> dict:
+        """
+        Возвращает счётчики склада.
+
+        :return: Словарь с количеством всех, выданных и оставшихся товаров.
+        :rtype: `dict`
+        """
+        return {"total": self.total, "dispensed": self.dispensed, "remaining": self.remaining}
+
+    def _commit(self, offset: int, dispensed: int):
+        file_writer.write_file(self.cursor_path, json_codec.dumps({"offset": offset, "dispensed": dispensed}))
+        self.offset, self.dispensed = offset, dispensed
+
+    def _load(self):
+        if os.path.exists(self.cursor_path):
+            try:
+                cursor = json_codec.load_file(self.cursor_path)
+                self.offset, self.dispensed = int(cursor["offset"]), int(cursor["dispensed"])
+            except Exception as e:
+                logger.error(f"Не удалось прочитать курсор склада {self.rule_id}: {e}")
+        self.total = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    self.total += block.count(b"\n")
+
+    def _load_hashes(self) -> set[bytes]:
+        if self._hashes is None:
+            self._hashes = set()
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    for line in f:
+                        if line.endswith(b"\n"):
+                            self._hashes.add(_hash(json_codec.loads(line)))
+        return self._hashes
+
+    def _repair_tail(self):
+        # Недописанная при сбое последняя строка отрезается
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if not size:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            position = size
+            while position > 0:
+                step = min(4096, position)
+                f.seek(position - step)
+                block = f.read(step)
+                index = block.rfind(b"\n")
+                if index != -1:
+                    position = position - step + index + 1
+                    break
+                position -= step
+            f.truncate(position)
+
+
+def validate_rule_id(rule_id: str) -> str:
+    """
+    Проверяет, что ID правила можно использовать в имени файла склада.
+
+    :param rule_id: ID правила.
+    :type rule_id: `str`
+
+    :return: ID правила.
+    :rtype: `str`
+
+    :raises ValueError: Если ID содержит что-то кроме латиницы, цифр, `_` и `-`.
+    """
+    rule_id = str(rule_id)
+    if not RULE_ID_PATTERN.fullmatch(rule_id):
+        raise ValueError(f"Недопустимый ID склада: {rule_id!r}")
+    return rule_id
+
+
+def _hash(item: str) -> bytes:
+    return hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+
+
+_stores: dict[str, StockStore] = {}
+_stores_lock = threading.Lock()
+_low_stock_callbacks: list[callable] = []
+low_stock_events = 0
+
+
+def get_stock(rule_id: str) -> StockStore:
+    """
+    Возвращает склад правила авто-выдачи.
+
+    :param rule_id: ID правила.
+    :type rule_id: `str`
+
+    :return: Склад.
+    :rtype: `stock.StockStore`
+
+    :raises ValueError: Если ID правила нельзя использовать в имени файла.
+    """
+    rule_id = validate_rule_id(rule_id)
+    with _stores_lock:
+        store = _stores.get(rule_id)
+        if store is None:
+            store = _stores[rule_id] = StockStore(rule_id)
+        return store
+
+
+def on_low_stock(callback: callable):
+    """
+    Регистрирует функцию `callback(store)`, которая вызывается, когда после выдачи
+    на складе осталось `playerok.auto_deliveries.low_stock_threshold` товаров или меньше.
+
+    :param callback: Функция.
+    :type callback: `callable`
+    """
+    _low_stock_callbacks.append(callback)
+
+
+def get_low_stock() -> list[tuple[str, int]]:
+    """
+    Возвращает склады правил, на которых осталось мало товаров.
+
+    :return: Список пар (ID правила, остаток).
+    :rtype: `list[tuple[str, int]]`
+    """
+    threshold = _get_threshold()
+    result = []
+    for rule in sett.get("auto_deliveries") or []:
+        if not isinstance(rule, dict) or not rule.get("stock"):
+            continue
+        try:
+            remaining = get_stock(rule["stock"]).remaining
+        except ValueError as e:
+            logger.warning(f"Правило авто-выдачи пропущено: {e}")
+            continue
+        if remaining <= threshold:
+            result.append((rule["stock"], remaining))
+    return result
+
+
+def migrate_auto_deliveries() -> int:
+    """
+    Переносит товары, хранившиеся прямо в правилах `auto_deliveries.json` (поле `goods`),
+    на склады. В правиле остаётся ссылка `"stock": rule_id`.
+    Вызывается явно (`python stock.py migrate`), повторный запуск безопасен.
+
+    Товары сначала сохраняются во временные файлы `{rule_id}.import`, затем
+    записываются настройки, и только после успешной записи товары попадают на склады.
+    Если перенос прервался, следующий запуск доделает его.
+
+    :return: Количество перенесённых правил.
+    :rtype: `int`
+    """
+    _finish_imports()
+    planned: dict[int, str] = {}
+    for index, rule in enumerate(sett.get("auto_deliveries") or []):
+        if not isinstance(rule, dict) or "goods" not in rule:
+            continue
+        rule_id = rule.get("stock")
+        if rule_id is None or not RULE_ID_PATTERN.fullmatch(str(rule_id)):
+            rule_id = uuid.uuid4().hex[:12]
+        _write_import(str(rule_id), rule.get("goods") or [])
+        planned[index] = str(rule_id)
+    if not planned:
+        return 0
+
+    def migrate(rules: list):
+        for index, rule_id in planned.items():
+            if index < len(rules) and isinstance(rules[index], dict) and "goods" in rules[index]:
+                rules[index].pop("goods")
+                rules[index]["stock"] = rule_id
+
+    try:
+        sett.modify("auto_deliveries", migrate)
+        file_writer.flush(paths.AUTO_DELIVERIES_FILE, strict=True)
+    except Exception:
+        for rule_id in planned.values():
+            _remove_import(rule_id)
+        raise
+    migrated = _finish_imports()
+    logger.info(f"Товары {migrated} правил авто-выдачи перенесены на склады")
+    return migrated
+
+
+def _import_path(rule_id: str) -> str:
+    return os.path.join(paths.STOCK_DIR, f"{rule_id}.import")
+
+
+def _write_import(rule_id: str, goods: list):
+    content = b"".join(json_codec.dumps(str(item)) + b"\n" for item in goods)
+    os.makedirs(paths.STOCK_DIR, exist_ok=True)
+    file_writer.write_file(_import_path(rule_id), content)
+
+
+def _remove_import(rule_id: str):
+    try:
+        os.remove(_import_path(rule_id))
+    except FileNotFoundError:
+        pass
+
+
+def _finish_imports() -> int:
+    # Временный файл переносится на склад, только если настройки уже ссылаются
+    # на склад без товаров в правиле - иначе запись настроек не состоялась
+    if not os.path.isdir(paths.STOCK_DIR):
+        return 0
+    committed = {
+        str(rule["stock"]) for rule in sett.get("auto_deliveries") or []
+        if isinstance(rule, dict) and rule.get("stock") and "goods" not in rule
+    }
+    finished = 0
+    for name in os.listdir(paths.STOCK_DIR):
+        rule_id, ext = os.path.splitext(name)
+        if ext != ".import":
+            continue
+        if rule_id in committed:
+            with open(_import_path(rule_id), "rb") as f:
+                get_stock(rule_id).add(json_codec.loads(line) for line in f if line.endswith(b"\n"))
+            finished += 1
+        _remove_import(rule_id)
+    return finished
+
+
+def _get_threshold() -> int:
+    config = sett.get("config")
+    return int(config["playerok"]["auto_deliveries"].get("low_stock_threshold", 5))
+
+
+def _check_low_stock(store: StockStore, before: int, after: int):
+    global low_stock_events
+    threshold = _get_threshold()
+    if not (before > threshold >= after):
+        return
+    low_stock_events += 1
+    logger.warning(f"На складе правила {store.rule_id} осталось товаров: {after}")
+    for callback in list(_low_stock_callbacks):
+        try:
+            callback(store)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике заканчивающегося склада: {e}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        print("Использование: python stock.py migrate")
+        sys.exit(2)
+    print(f"Перенесено правил: {migrate_auto_deliveries()}")
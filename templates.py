@@ -0,0 +1,185 @@
+"""
+Шаблоны сообщений из `messages.json` для Seal Playerok Bot.
+
+Каждое сообщение один раз склеивается из строк вместе с водяным знаком
+(`playerok.watermark`) и проверяется: неизвестные подстановки вроде `{usrname}`
+попадают в лог при загрузке, а не при отправке. Готовые шаблоны хранятся,
+пока не изменятся `messages.json` или `config.json`: изменения из бота приходят
+через `Settings.subscribe`, а правки файлов вручную замечаются по `Settings.version`
+не чаще раза в `VERSION_CHECK_INTERVAL` секунд. На каждое событие остаётся
+только подстановка значений.
+"""
+import string
+import threading
+import time
+from logging import getLogger
+
+from settings import Settings as sett
+
+
+logger = getLogger("seal.templates")
+
+VERSION_CHECK_INTERVAL = 1.0  # Как часто сверять версии файлов настроек (сек)
+
+# Подстановки, доступные во всех сообщениях
+COMMON_PLACEHOLDERS = frozenset({
+    "username", "chat_id",
+    "deal_id", "deal_item_name", "deal_amount", "deal_price", "deal_status",
+    "item_name", "item_price",
+})
+# Подстановки, доступные только в отдельных сообщениях
+MESSAGE_PLACEHOLDERS = {
+    "cmd_error": frozenset({"error"}),
+}
+
+
+class _SafeDict(dict):
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+class Template:
+    """
+    Скомпилированный шаблон сообщения.
+
+    :param name: Название сообщения.
+    :type name: `str`
+
+    :param text: Текст шаблона.
+    :type text: `str`
+
+    :param enabled: Включено ли сообщение.
+    :type enabled: `bool`
+    """
+
+    def __init__(self, name: str, text: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self.placeholders: frozenset[str] = frozenset()
+        self.errors: list[str] = []
+        self._text = text
+        try:
+            self.placeholders = frozenset(
+                field.split(".")[0].split("[")[0]
+                for _, field, _, _ in string.Formatter().parse(text) if field
+            )
+            if not self.placeholders:
+                self._text = text.format()
+        except ValueError as e:
+            # Непарная фигурная скобка - отправляем текст как есть
+            self.errors.append(f"ошибка в шаблоне: {e}")
+            self._text = text.replace("{{", "{").replace("}}", "}")
+        allowed = COMMON_PLACEHOLDERS | MESSAGE_PLACEHOLDERS.get(name, frozenset())
+        unknown = sorted(self.placeholders - allowed)
+        if unknown:
+            self.errors.append(f"неизвестные подстановки: {', '.join('{' + p + '}' for p in unknown)}")
+        self._static = not self.placeholders
+
+    def render(self, **values) -> str:
+        """
+        Подставляет значения в шаблон. Отсутствующие подстановки остаются как есть.
+
+        :return: Готовый текст сообщения.
+        :rtype: `str`
+        """
+        if self._static:
+            return self._text
+        return self._text.format_map(_SafeDict(values))
+
+
+class TemplateRenderer:
+    """Шаблоны всех сообщений, пересобираемые при изменении настроек."""
+
+    def __init__(self):
+        self._templates: dict[str, Template] = {}
+        self._versions = None
+        self._checked_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        self.builds = 0
+        sett.subscribe("messages", "", self._on_changed)
+        sett.subscribe("config", "playerok.watermark", self._on_changed)
+
+    def get(self, name: str) -> Template | None:
+        """
+        Возвращает шаблон сообщения.
+
+        :param name: Название сообщения в `messages.json`.
+        :type name: `str`
+
+        :return: Шаблон или `None`, если такого сообщения нет.
+        :rtype: `templates.Template` or `None`
+        """
+        return self._ensure_built().get(name)
+
+    def render(self, name: str, **values) -> str | None:
+        """
+        Собирает текст сообщения с водяным знаком.
+
+        :param name: Название сообщения в `messages.json`.
+        :type name: `str`
+
+        :return: Текст или `None`, если сообщение выключено или его нет.
+        :rtype: `str` or `None`
+        """
+        template = self._ensure_built().get(name)
+        if template is None or not template.enabled:
+            return None
+        return template.render(**values)
+
+    def get_errors(self) -> dict[str, list[str]]:
+        """
+        Возвращает ошибки шаблонов, найденные при загрузке.
+
+        :return: Словарь {сообщение: список ошибок}.
+        :rtype: `dict[str, list[str]]`
+        """
+        return {name: list(t.errors) for name, t in self._ensure_built().items() if t.errors}
+
+    def _on_changed(self, change):
+        self._dirty = True
+
+    def _ensure_built(self) -> dict[str, Template]:
+        now = time.monotonic()
+        if not self._dirty and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return self._templates
+        with self._lock:
+            versions = (sett.version("messages"), sett.version("config"))
+            self._checked_at = now
+            if versions == self._versions and not self._dirty:
+                return self._templates
+            self._dirty = False
+            watermark = sett.view("config").playerok.watermark
+            suffix = f"\n{watermark.value}" if watermark.enabled and watermark.value else ""
+            suffix = suffix.replace("{", "{{").replace("}", "}}")
+            templates = {}
+            for name, message in (sett.get("messages") or {}).items():
+                if not isinstance(message, dict) or "text" not in message:
+                    continue
+                lines = message["text"]
+                text = "\n".join(lines) if isinstance(lines, list) else str(lines)
+                template = templates[name] = Template(name, text + suffix, bool(message.get("enabled", True)))
+                for error in template.errors:
+                    logger.warning(f"Сообщение {name}: {error}")
+            self._templates = templates
+            self._versions = versions
+            self.builds += 1
+            return templates
+
+
+_renderer = TemplateRenderer()
+
+
+def get_template_renderer() -> TemplateRenderer:
+    """
+    Возвращает общие шаблоны сообщений.
+
+    :return: Шаблоны сообщений.
+    :rtype: `templates.TemplateRenderer`
+    """
+    return _renderer
+
+
+def render(name: str, **values) -> str | None:
+    """Собирает текст сообщения с водяным знаком. См. `TemplateRenderer.render`."""
+    return _renderer.render(name, **values)
@@ -0,0 +1,68 @@
+"""
+Регрессионный тест истории сделок: повторно выданные номера событий
+не должны скрывать новые сделки, а дважды записанный кусок журнала - учитываться дважды.
+
+Запуск: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec
+import stats
+import stats_query
+
+
+def _line(seq: int, ts: float, amount: float) -> bytes:
+    event = {"seq": seq, "ts": ts, "deal": f"d{seq}-{ts}", "item": "a", "amount": amount, "status": "completed"}
+    return json_codec.dumps(event) + b"\n"
+
+
+class DealHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.folder = self._folder.name
+        self.history_path = os.path.join(self.folder, "stats_history.log")
+        self.journal_path = os.path.join(self.folder, "stats_journal.log")
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def test_reused_seq_keeps_new_deals(self):
+        with open(self.history_path, "wb") as f:
+            f.write(b"".join(_line(seq, 1000 + seq, 100) for seq in (1, 2, 3)))
+            f.write(_line(1, 5000, 500))
+        history = stats_query.DealHistory(self.history_path, self.journal_path)
+        self.assertEqual(history.total(), (4, 800.0))
+
+    def test_duplicated_chunk_counted_once(self):
+        with open(self.history_path, "wb") as f:
+            f.write(b"".join(_line(seq, 1000 + seq, 100) for seq in (1, 2, 3, 2, 3, 4)))
+        history = stats_query.DealHistory(self.history_path, self.journal_path)
+        self.assertEqual(history.total(), (4, 400.0))
+
+    def test_corrupt_rollups_keep_seq_monotonic(self):
+        rollups_path = os.path.join(self.folder, "stats_rollups.json")
+        legacy_path = os.path.join(self.folder, "stats.json")
+        args = (rollups_path, self.journal_path, self.history_path, legacy_path)
+        journal = stats.StatsJournal(*args)
+        for i in range(3):
+            journal.record(f"d{i}", 100)
+        journal.compact()
+        with open(rollups_path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        journal = stats.StatsJournal(*args)
+        self.assertEqual(journal.record("d9", 500)["seq"], 4)
+        journal.compact()
+        self.assertEqual(journal.get_summary()["total"]["earnings"], 800.0)
+        self.assertTrue(os.path.exists(f"{rollups_path}.corrupt"))
+        history = stats_query.DealHistory(self.history_path, self.journal_path)
+        self.assertEqual(history.total(), (4, 800.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,6 +16,9 @@ from logging import getLogger
 
 # Импорт путей из центрального модуля
 import paths
+import file_writer
+import stats
+import event_journal
 
 
 logger = getLogger("seal.utils")
@@ -35,6 +38,10 @@ def get_main_loop():
 
 def shutdown():
     """Завершает работу программы (завершает все задачи основного loop`а)."""
+    stats.flush()
+    event_journal.flush()
+    file_writer.flush()
+    paths.checkpoint_hot_files()
     for task in asyncio.all_tasks(_main_loop):
         task.cancel()
     _main_loop.call_soon_threadsafe(_main_loop.stop)
@@ -46,6 +53,10 @@ def restart():
         from logging import getLogger
         logger = getLogger("seal.restart")
         logger.info("Перезапуск бота...")
+        stats.flush()
+        event_journal.flush()
+        file_writer.flush()
+        paths.checkpoint_hot_files()
         
         python = sys.executable
         os.execv(python, [python] + sys.argv)
@@ -415,4 +426,26 @@ def run_forever_in_thread(func: callable, args: list = [], kwargs: dict = {}):
         finally:
             loop.close()
 
-    Thread(target=run, daemon=True).start()
\ No newline at end of file
+    Thread(target=run, daemon=True).start()
+
+
+def start_checkpointing(interval: float = paths.CHECKPOINT_INTERVAL):
+    """
+    Запускает поток, периодически копирующий файлы быстрого уровня хранения в надёжный.
+    Если быстрый уровень не вынесен отдельно (SEAL_HOT_DIR не задан), поток не запускается.
+
+    :param interval: Период копирования в секундах.
+    :type interval: `float`
+    """
+    if paths.HOT_DIR == paths.STORAGE_DIR:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                paths.checkpoint_hot_files()
+            except Exception as e:
+                logger.error(f"{Fore.LIGHTRED_EX}Ошибка при сохранении файлов быстрого хранилища: {Fore.WHITE}{e}")
+
+    Thread(target=run, name="seal-checkpoints", daemon=True).start()
\ No newline at end of file